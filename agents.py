@@ -0,0 +1,39 @@
+"""The OpenAI tools agents used by the graphs.
+
+langchain.agents takes seconds to import, so it is only loaded inside these
+functions, when a graph is built.
+"""
+from typing import TYPE_CHECKING
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables import Runnable
+
+if TYPE_CHECKING:
+    from langchain.agents import AgentExecutor
+
+
+def create_tools_agent(
+    llm: BaseChatModel, tools: list, prompt: ChatPromptTemplate
+) -> Runnable:
+    """An agent runnable that can request several tool calls in a single model turn."""
+    from langchain.agents import create_openai_tools_agent
+
+    return create_openai_tools_agent(llm, tools, prompt)
+
+
+def create_agent(llm: BaseChatModel, tools: list, system_prompt: str) -> "AgentExecutor":
+    """An executor running a tools agent on the "messages" of the state until it answers."""
+    from langchain.agents import AgentExecutor
+
+    prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", system_prompt),
+            MessagesPlaceholder(variable_name="messages"),
+            MessagesPlaceholder(variable_name="agent_scratchpad"),
+        ]
+    )
+    agent = create_tools_agent(llm, tools, prompt)
+    # Streaming the agent runnable would bypass the LLM cache, astream_events still
+    # streams the model's tokens on a cache miss.
+    return AgentExecutor(agent=agent, tools=tools, stream_runnable=False)  # type: ignore
@@ -0,0 +1,170 @@
+"""Deterministic stand-ins for the OpenAI model and the paid tools, for benchmarks."""
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from langchain.tools import StructuredTool
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import BaseModel, Field
+
+from tools.packing import CHARACTERS_PER_TOKEN
+
+# A valid 1x1 PNG, so image paths pass the router's file checks.
+PNG_BYTES = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082"
+)
+ANSWER_CHARACTERS = 160
+
+
+class FakeChatModel(BaseChatModel):
+    """Answers like an OpenAI tools/functions model after a fixed latency.
+
+    An agent calls each tool it was given once, in order, with the arguments from
+    tool_arguments, then answers with the tool outputs. A supervisor routes to
+    every member that has not spoken yet, then to FINISH. With streaming, answers
+    arrive a token of CHARACTERS_PER_TOKEN characters every token_latency seconds,
+    otherwise in one chunk.
+    """
+
+    latency: float = 0.05
+    streaming: bool = False
+    token_latency: float = 0.0
+    answer_characters: int = ANSWER_CHARACTERS
+    tool_arguments: dict[str, Callable[[], dict]] = {}
+    members: list[str] = []
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    def bind_functions(self, functions: list, function_call: str | None = None, **kwargs):
+        return self.bind(
+            functions=functions,
+            function_call={"name": function_call} if function_call else None,
+        )
+
+    def respond(self, messages: list[BaseMessage], **kwargs: Any) -> AIMessage:
+        self.calls += 1
+        if kwargs.get("functions"):
+            return self.route(messages, kwargs["functions"][0])
+        called = {
+            call["function"]["name"]
+            for message in messages
+            for call in message.additional_kwargs.get("tool_calls", [])
+        }
+        for tool in kwargs.get("tools", []):
+            name = tool["function"]["name"]
+            if name not in called:
+                arguments = self.tool_arguments[name]()
+                tool_call = {
+                    "id": f"call_{self.calls}_{name}",
+                    "type": "function",
+                    "function": {"name": name, "arguments": json.dumps(arguments)},
+                }
+                return AIMessage(content="", additional_kwargs={"tool_calls": [tool_call]})
+        outputs = [str(message.content) for message in messages if isinstance(message, ToolMessage)]
+        answer = "Result: " + " | ".join(outputs)
+        return AIMessage(content=(answer + " ").ljust(self.answer_characters, "."))
+
+    def route(self, messages: list[BaseMessage], function: dict) -> AIMessage:
+        spoken = {message.name for message in messages}
+        pending = [member for member in self.members if member not in spoken]
+        parallel = function["parameters"]["properties"]["next"].get("type") == "array"
+        if parallel:
+            route = pending or ["FINISH"]
+        else:
+            route = pending[0] if pending else "FINISH"
+        function_call = {"name": function["name"], "arguments": json.dumps({"next": route})}
+        return AIMessage(content="", additional_kwargs={"function_call": function_call})
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self.respond(messages, **kwargs))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self.respond(messages, **kwargs))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        message = self.respond(messages, **kwargs)
+        content = str(message.content)
+        if not content or not self.streaming:
+            chunk = AIMessageChunk(content=content, additional_kwargs=message.additional_kwargs)
+            yield ChatGenerationChunk(message=chunk)
+            return
+        for start in range(0, len(content), CHARACTERS_PER_TOKEN):
+            await asyncio.sleep(self.token_latency)
+            text = content[start : start + CHARACTERS_PER_TOKEN]
+            generation_chunk = ChatGenerationChunk(message=AIMessageChunk(content=text))
+            if run_manager:
+                await run_manager.on_llm_new_token(text, chunk=generation_chunk)
+            yield generation_chunk
+
+
+class SearchInput(BaseModel):
+    query: str = Field(description="Search query.")
+
+
+class ImageInput(BaseModel):
+    image_description: str = Field(description="A detailed description of the desired image.")
+
+
+class MarkdownInput(BaseModel):
+    markdown_text: str = Field(description="Markdown text to convert to PDF.")
+
+
+def fake_tool(
+    name: str, description: str, args_schema: type[BaseModel], work: Callable, latency: float
+) -> StructuredTool:
+    """A tool with sync and async paths that waits latency seconds, then does work."""
+
+    def run(**kwargs: Any) -> str:
+        time.sleep(latency)
+        return work(**kwargs)
+
+    async def arun(**kwargs: Any) -> str:
+        await asyncio.sleep(latency)
+        return work(**kwargs)
+
+    return StructuredTool.from_function(
+        func=run, coroutine=arun, name=name, description=description, args_schema=args_schema
+    )
+
+
+def fake_search_tool(result_urls: Callable[[], list[str]], latency: float) -> StructuredTool:
+    def search(query: str) -> str:
+        return json.dumps([{"url": url, "content": f"About {query}."} for url in result_urls()])
+
+    return fake_tool(
+        "tavily_search_results_json", "Search the web.", SearchInput, search, latency
+    )
+
+
+def fake_image_tool(directory: Path, latency: float) -> StructuredTool:
+    def generate_image(image_description: str) -> str:
+        image_path = directory / f"image_{time.perf_counter_ns()}.png"
+        image_path.write_bytes(PNG_BYTES)
+        return str(image_path)
+
+    return fake_tool(
+        "generate_image", "Generate an image.", ImageInput, generate_image, latency
+    )
+
+
+def fake_pdf_tool(directory: Path, latency: float) -> StructuredTool:
+    def markdown_to_pdf_file(markdown_text: str) -> str:
+        pdf_path = directory / f"document_{time.perf_counter_ns()}.pdf"
+        pdf_path.write_text(markdown_text, encoding="utf-8")
+        return str(pdf_path)
+
+    return fake_tool(
+        "markdown_to_pdf_file", "Convert markdown to PDF.", MarkdownInput,
+        markdown_to_pdf_file, latency,
+    )
@@ -0,0 +1,179 @@
+"""Offline throughput and latency percentiles of every graph under concurrent runs.
+
+The graphs are built with FakeChatModel and fake search, image and PDF tools. The
+real weather and research tools are used, pointed at a local stub server, so no
+network access or API keys are needed. Compare the numbers between commits to
+catch orchestration regressions.
+
+Run from the repository root with:
+    python -m benchmarks.graphs [--runs 50] [--concurrency 10] [--llm-latency 0.05]
+"""
+import os
+
+# Dummy keys and offline settings, set before the repository modules read them.
+for key in ["OPENAI_API_KEY", "TAVILY_API_KEY", "WEATHER_API_KEY", "LANGCHAIN_API_KEY"]:
+    os.environ.setdefault(key, "benchmark")
+os.environ["LANGCHAIN_TRACING_V2"] = "false"
+os.environ.setdefault("WEB_CACHE_ENABLED", "False")
+os.environ.setdefault("WEATHER_CACHE_TTL", "0")
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import contextlib  # noqa: E402
+import io  # noqa: E402
+import math  # noqa: E402
+import tempfile  # noqa: E402
+import time  # noqa: E402
+from pathlib import Path  # noqa: E402
+
+from aiohttp import web  # noqa: E402
+from langchain_core.messages import HumanMessage  # noqa: E402
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder  # noqa: E402
+
+import multi_agent  # noqa: E402
+import simple_langgraph  # noqa: E402
+import tools.weather  # noqa: E402
+import web_research  # noqa: E402
+from benchmarks.fakes import (  # noqa: E402
+    FakeChatModel,
+    fake_image_tool,
+    fake_pdf_tool,
+    fake_search_tool,
+)
+from benchmarks.stub_server import serve  # noqa: E402
+from tools.fetch import SESSION_POOL  # noqa: E402
+from tools.web import research  # noqa: E402
+
+
+GRAPHS = ["weather", "travel", "travel_sequential", "research"]
+PAGES_PER_SEARCH = 4
+PAGE = (
+    "<html><head><title>Jaws</title></head><body><article>"
+    + "<p>Jaws is a 1975 thriller film directed by Steven Spielberg.</p>" * 200
+    + "</article></body></html>"
+)
+WEATHER = {
+    "location": {"name": "Seoul", "region": "", "country": "South Korea"},
+    "current": {"temp_c": 21.0, "condition": {"text": "Sunny"}},
+}
+# The same shape as the hwchase17/openai-functions-agent hub prompt.
+AGENT_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        ("system", "You are a helpful assistant"),
+        MessagesPlaceholder(variable_name="chat_history", optional=True),
+        ("human", "{input}"),
+        MessagesPlaceholder(variable_name="agent_scratchpad"),
+    ]
+)
+
+
+def stub_app(latency: float) -> web.Application:
+    """The weather API and the research pages, each answering after latency seconds."""
+
+    async def weather(request: web.Request) -> web.Response:
+        await asyncio.sleep(latency)
+        return web.json_response(WEATHER)
+
+    async def page(request: web.Request) -> web.Response:
+        await asyncio.sleep(latency)
+        return web.Response(text=PAGE, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/v1/current.json", weather)
+    app.router.add_get("/page/{name}", page)
+    return app
+
+
+def build_graph(name: str, base_url: str, directory: Path, llm_latency: float, tool_latency: float):
+    """The compiled graph, a function returning the input of one run, and its model."""
+    page_urls = [f"{base_url}/page/{index}" for index in range(PAGES_PER_SEARCH)]
+    tool_arguments = {
+        "get_weather": lambda: {"location": "Seoul, South Korea"},
+        "generate_image": lambda: {"image_description": "Seoul in the sun."},
+        "tavily_search_results_json": lambda: {"query": "Jaws"},
+        "markdown_to_pdf_file": lambda: {"markdown_text": "# Travel plan"},
+        "research": lambda: {"research_urls": page_urls, "query": "Jaws"},
+    }
+    llm = FakeChatModel(
+        latency=llm_latency, tool_arguments=tool_arguments, members=multi_agent.MEMBERS
+    )
+    image_tool = fake_image_tool(directory, tool_latency)
+    search_tool = fake_search_tool(lambda: page_urls, tool_latency)
+
+    if name == "weather":
+        graph = simple_langgraph.build_weather_app(
+            llm=llm, tools=[tools.weather.get_weather, image_tool], prompt=AGENT_PROMPT
+        )
+        return graph, lambda: {"input": "Show me the weather in Seoul.", "chat_history": []}, llm
+    if name in ("travel", "travel_sequential"):
+        graph = multi_agent.build_travel_agent_graph(
+            llm=llm,
+            search_tool=search_tool,
+            image_tool=image_tool,
+            pdf_tool=fake_pdf_tool(directory, tool_latency),
+            parallel=name == "travel",
+        )
+        return graph, lambda: {"messages": [HumanMessage(content="Paris for three days")]}, llm
+    graph = web_research.build_research_graph(
+        llm=llm, search_tool=search_tool, research_tool=research
+    )
+    return graph, lambda: {"messages": [HumanMessage(content="Jaws")]}, llm
+
+
+def percentile(values: list[float], percent: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+async def benchmark_graph(graph, make_input, runs: int, concurrency: int) -> tuple[float, list[float]]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def run_once() -> None:
+        async with semaphore:
+            start_time = time.perf_counter()
+            await graph.ainvoke(make_input(), {"recursion_limit": 50})
+            latencies.append(time.perf_counter() - start_time)
+
+    start_time = time.perf_counter()
+    await asyncio.gather(*(run_once() for _ in range(runs)))
+    return time.perf_counter() - start_time, latencies
+
+
+async def main(arguments: argparse.Namespace) -> None:
+    print(
+        f"{arguments.runs} runs per graph, {arguments.concurrency} concurrent,"
+        f" {arguments.llm_latency * 1000:.0f} ms per LLM call,"
+        f" {arguments.tool_latency * 1000:.0f} ms per tool call"
+    )
+    async with serve(stub_app(arguments.tool_latency)) as base_url:
+        tools.weather.WEATHER_API_URL = f"{base_url}/v1/current.json"
+        with tempfile.TemporaryDirectory() as directory:
+            web_research.OUTPUT_DIRECTORY = Path(directory)
+            for name in arguments.graphs:
+                graph, make_input, llm = build_graph(
+                    name, base_url, Path(directory), arguments.llm_latency, arguments.tool_latency
+                )
+                # The graphs print every step, keep the report readable.
+                with contextlib.redirect_stdout(io.StringIO()):
+                    elapsed, latencies = await benchmark_graph(
+                        graph, make_input, arguments.runs, arguments.concurrency
+                    )
+                print(
+                    f"{name:>18}: {arguments.runs / elapsed:7.1f} runs/s,"
+                    f" p50 {percentile(latencies, 50) * 1000:7.0f} ms,"
+                    f" p95 {percentile(latencies, 95) * 1000:7.0f} ms,"
+                    f" p99 {percentile(latencies, 99) * 1000:7.0f} ms,"
+                    f" {llm.calls / arguments.runs:4.1f} LLM calls per run"
+                )
+        await SESSION_POOL.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--tool-latency", type=float, default=0.02)
+    parser.add_argument("--graphs", nargs="+", choices=GRAPHS, default=GRAPHS)
+    asyncio.run(main(parser.parse_args()))
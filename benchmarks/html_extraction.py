@@ -0,0 +1,63 @@
+"""Compare the BeautifulSoup parse_html with the streaming TextExtractor.
+
+Runs over a corpus of saved HTML pages (by default the raw pages in the web cache,
+or pass a directory of .html files) and reports output agreement and timing.
+Falls back to a large synthetic article if the corpus is empty.
+
+Run from the repository root with: python -m benchmarks.html_extraction [directory]
+"""
+import sys
+import time
+from difflib import SequenceMatcher
+from pathlib import Path
+
+from tools.html_text import extract_text
+from tools.web import parse_html_soup
+from tools.web_cache import CACHE_DIRECTORY
+
+
+def synthetic_page() -> str:
+    section = (
+        "<header><h1>Site</h1></header><nav><a href='#'>Home</a></nav>"
+        "<script>var x = 1;</script><style>p { color: red; }</style>"
+        "<p>The  great white shark is a <b>species</b> of large mackerel shark.</p>"
+        "<img src='shark.png'><aside>Related articles</aside><footer>Footer</footer>"
+    )
+    return f"<html><head><title>Shark</title></head><body>{section * 2_000}</body></html>"
+
+
+def load_corpus(directory: Path) -> list[tuple[str, str]]:
+    pages = [(path.name, path.read_text(encoding="utf-8")) for path in directory.glob("*.html")]
+    return pages or [("synthetic.html", synthetic_page())]
+
+
+def time_extractor(extractor, pages: list[tuple[str, str]]) -> tuple[list[str], float]:
+    start_time = time.perf_counter()
+    outputs = [extractor(html) for _, html in pages]
+    return outputs, time.perf_counter() - start_time
+
+
+def main(directory: Path):
+    pages = load_corpus(directory)
+    total_megabytes = sum(len(html) for _, html in pages) / 1_000_000
+    print(f"Corpus: {len(pages)} pages, {total_megabytes:.1f} MB")
+
+    soup_outputs, soup_time = time_extractor(parse_html_soup, pages)
+    streaming_outputs, streaming_time = time_extractor(extract_text, pages)
+
+    identical = 0
+    for (name, _), old, new in zip(pages, soup_outputs, streaming_outputs):
+        if old == new:
+            identical += 1
+        else:
+            similarity = SequenceMatcher(None, old, new).ratio()
+            print(f"  {name}: outputs differ (similarity {similarity:.3f})")
+
+    print(f"Identical outputs: {identical}/{len(pages)}")
+    print(f"BeautifulSoup html.parser: {soup_time:.3f} seconds")
+    print(f"Streaming extractor:       {streaming_time:.3f} seconds")
+    print(f"Speed-up: {soup_time / max(streaming_time, 1e-9):.1f}x")
+
+
+if __name__ == "__main__":
+    main(Path(sys.argv[1]) if len(sys.argv) > 1 else CACHE_DIRECTORY)
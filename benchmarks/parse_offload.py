@@ -0,0 +1,65 @@
+"""Throughput of fetch + parse for N concurrent URLs with each parse executor.
+
+Pages are served by a local aiohttp fixture server with a small artificial latency.
+Parsing uses the BeautifulSoup extractor so the CPU cost is clearly visible.
+
+Run from the repository root with: python -m benchmarks.parse_offload [N]
+"""
+import asyncio
+import sys
+import time
+
+from aiohttp import web
+
+from benchmarks.stub_server import serve
+from tools.fetch import SessionPool
+from tools.parse_pool import PARSE_WORKERS, ParsePool
+from tools.web import parse_html_soup
+
+
+SERVER_LATENCY = 0.05
+PAGE = (
+    "<html><body>"
+    + "<div><p>Lorem ipsum <b>dolor</b> sit amet.</p><nav>Menu</nav></div>" * 1_000
+    + "</body></html>"
+)
+
+
+def fixture_app() -> web.Application:
+    async def page(request: web.Request) -> web.Response:
+        await asyncio.sleep(SERVER_LATENCY)
+        return web.Response(text=PAGE, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/wiki/{name}", page)
+    return app
+
+
+async def fetch_and_parse(session_pool: SessionPool, parse_pool: ParsePool, url: str):
+    async with session_pool.get(url) as response:
+        html_content = await response.text()
+    return await parse_pool.run(parse_html_soup, html_content)
+
+
+async def main(number_of_urls: int):
+    async with serve(fixture_app()) as base_url:
+        urls = [f"{base_url}/wiki/page_{i}" for i in range(number_of_urls)]
+        session_pool = SessionPool()
+        print(f"{number_of_urls} URLs, {len(PAGE) / 1_000:.0f} kB each, {PARSE_WORKERS} workers")
+
+        for kind in ["inline", "thread", "process"]:
+            parse_pool = ParsePool(kind=kind)
+            parse_pool.get_executor()  # Keep worker start-up out of the measurement.
+            start_time = time.perf_counter()
+            await asyncio.gather(
+                *(fetch_and_parse(session_pool, parse_pool, url) for url in urls)
+            )
+            elapsed = time.perf_counter() - start_time
+            parse_pool.shutdown()
+            print(f"{kind:>8}: {elapsed:.3f} seconds, {number_of_urls / elapsed:.1f} URLs/s")
+
+        await session_pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 24))
@@ -0,0 +1,65 @@
+"""Throughput of rendering a batch of markdown documents with each PDF renderer.
+
+"pdfkit" starts a new wkhtmltopdf process per document, the experimental "pool"
+keeps PDF_RENDER_WORKERS processes running, fed from a job queue. Run it against a
+real wkhtmltopdf, found through WKHTMLTOPDF_PATH or the PATH, to check that the
+pool's job protocol holds before setting PDF_RENDERER=pool.
+
+Run from the repository root with: python -m benchmarks.pdf_render [N]
+"""
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from tools.pdf import generate_html_text
+from tools.pdf_render import PDF_RENDER_WORKERS, get_renderer
+
+
+DOCUMENT = """
+# Report {index}
+A short research summary with a table and a list.
+
+| City | Temperature |
+| ---- | ----------- |
+| Paris | 18 |
+| Tokyo | 22 |
+
+- First finding with **bold** text.
+- Second finding with *emphasis*.
+
+""" + "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 40
+
+
+def render_batch(kind: str, documents: list[str], output_directory: Path) -> float:
+    renderer = get_renderer(kind)
+    html_texts = [generate_html_text(document) for document in documents]
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(PDF_RENDER_WORKERS) as executor:
+        list(
+            executor.map(
+                renderer.render,
+                html_texts,
+                [output_directory / f"{kind}_{i}.pdf" for i in range(len(html_texts))],
+            )
+        )
+    elapsed = time.perf_counter() - start_time
+    renderer.shutdown()
+    return elapsed
+
+
+def main(number_of_documents: int) -> None:
+    documents = [DOCUMENT.format(index=i) for i in range(number_of_documents)]
+    print(f"{number_of_documents} documents, {PDF_RENDER_WORKERS} workers")
+    with tempfile.TemporaryDirectory() as directory:
+        for kind in ["pdfkit", "pool"]:
+            elapsed = render_batch(kind, documents, Path(directory))
+            print(
+                f"{kind:>6}: {elapsed:6.2f}s, "
+                f"{number_of_documents / elapsed:6.1f} documents/s"
+            )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,129 @@
+"""Throughput against a rate-limited fake provider, with and without RateLimiter.
+
+The provider admits requests against request and token buckets holding one second
+of its quota and answers 429 otherwise. Without the limiter, clients retry with
+exponential backoff the way the OpenAI client does: at most two retries, starting
+at 0.5 seconds. With the limiter, clients wait for the shared buckets before
+sending. One client in eight is interactive, pausing a second between calls,
+and the rest are batch work, to show the priority classes.
+
+Run from the repository root with: python -m benchmarks.rate_limit
+"""
+import asyncio
+import random
+import statistics
+import time
+
+from tools.rate_limit import Priority, RateLimiter, TokenBucket
+
+
+REQUESTS_PER_MINUTE = 600
+TOKENS_PER_MINUTE = 600_000
+PROVIDER_LATENCY = 0.2
+CLIENTS = 40
+DURATION = 10.0
+INTERACTIVE_PAUSE = 1.0
+MAX_RETRIES = 2
+INITIAL_BACKOFF = 0.5
+
+
+class RateLimitExceeded(Exception):
+    pass
+
+
+class FakeProvider:
+    def __init__(self) -> None:
+        self.requests = TokenBucket(REQUESTS_PER_MINUTE, burst_seconds=1)
+        self.tokens = TokenBucket(TOKENS_PER_MINUTE, burst_seconds=1)
+        self.rejected = 0
+
+    async def call(self, tokens: int) -> None:
+        now = time.monotonic()
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        if self.requests.level < 1 or self.tokens.level < tokens:
+            self.rejected += 1
+            raise RateLimitExceeded()
+        self.requests.level -= 1
+        self.tokens.level -= tokens
+        await asyncio.sleep(PROVIDER_LATENCY)
+
+
+async def call_with_retries(provider: FakeProvider, tokens: int) -> bool:
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            await provider.call(tokens)
+            return True
+        except RateLimitExceeded:
+            if attempt < MAX_RETRIES:
+                await asyncio.sleep(INITIAL_BACKOFF * 2**attempt * random.uniform(0.75, 1.25))
+    return False
+
+
+async def run_client(
+    provider: FakeProvider,
+    limiter: RateLimiter | None,
+    priority: Priority,
+    deadline: float,
+    results: list[tuple[Priority, bool, int, float]],
+) -> None:
+    while time.monotonic() < deadline:
+        tokens = random.randint(500, 1500)
+        start_time = time.monotonic()
+        if limiter is not None:
+            await limiter.aacquire(tokens, priority)
+        succeeded = await call_with_retries(provider, tokens)
+        results.append((priority, succeeded, tokens, time.monotonic() - start_time))
+        if priority == Priority.INTERACTIVE:
+            await asyncio.sleep(INTERACTIVE_PAUSE)
+
+
+async def benchmark(use_limiter: bool) -> None:
+    random.seed(0)
+    provider = FakeProvider()
+    limiter = None
+    if use_limiter:
+        limiter = RateLimiter(REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE, burst_seconds=1)
+    results: list[tuple[Priority, bool, int, float]] = []
+    start_time = time.monotonic()
+    deadline = start_time + DURATION
+    await asyncio.gather(
+        *(
+            run_client(
+                provider,
+                limiter,
+                Priority.INTERACTIVE if index % 8 == 0 else Priority.BATCH,
+                deadline,
+                results,
+            )
+            for index in range(CLIENTS)
+        )
+    )
+    elapsed = time.monotonic() - start_time
+    completed = [result for result in results if result[1]]
+    print(f"{'RateLimiter' if use_limiter else 'retries only':>14}:", end=" ")
+    print(
+        f"{len(completed) / elapsed:5.1f} calls/s,"
+        f" {sum(result[2] for result in completed) / elapsed:6.0f} tokens/s,"
+        f" {provider.rejected:4d} 429s, {len(results) - len(completed):3d} failed calls"
+    )
+    for priority in (Priority.INTERACTIVE, Priority.BATCH):
+        latencies = [result[3] for result in completed if result[0] == priority]
+        if latencies:
+            print(
+                f"{priority.name.lower():>14}: p50 {statistics.median(latencies):5.2f}s,"
+                f" max {max(latencies):5.2f}s over {len(latencies)} calls"
+            )
+
+
+async def main() -> None:
+    print(
+        f"Quota {REQUESTS_PER_MINUTE / 60:.0f} requests/s and {TOKENS_PER_MINUTE / 60:.0f}"
+        f" tokens/s, {CLIENTS} clients for {DURATION:.0f}s"
+    )
+    await benchmark(use_limiter=False)
+    await benchmark(use_limiter=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
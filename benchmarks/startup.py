@@ -0,0 +1,72 @@
+"""Cold-start time of the entry points: module import and first graph build.
+
+Every measurement runs in a fresh interpreter, with dummy API keys so nothing is
+sent anywhere. The weather graph is only built if its hub prompt is already in
+cache/hub, to avoid a network call.
+
+Run from the repository root with: python -m benchmarks.startup [repetitions]
+"""
+import os
+
+# Dummy keys and offline settings, inherited by every measured interpreter.
+for key in ["OPENAI_API_KEY", "TAVILY_API_KEY", "WEATHER_API_KEY", "LANGCHAIN_API_KEY"]:
+    os.environ.setdefault(key, "benchmark")
+os.environ["LANGCHAIN_TRACING_V2"] = "false"
+os.environ["CHECKPOINTS_ENABLED"] = "False"
+
+import statistics  # noqa: E402
+import subprocess  # noqa: E402
+import sys  # noqa: E402
+from pathlib import Path  # noqa: E402
+
+from llm import HUB_CACHE_DIRECTORY  # noqa: E402
+from simple_langgraph import AGENT_PROMPT  # noqa: E402
+
+
+ROOT_DIRECTORY = Path(__file__).parent.parent
+CHILD = """
+import time
+start = time.perf_counter()
+import {module}
+imported = time.perf_counter()
+{build}
+print(imported - start, time.perf_counter() - imported)
+"""
+CASES = [
+    ("tools.fetch", ""),
+    ("tools.web", ""),
+    ("multi_agent", "multi_agent.get_travel_agent_graph()"),
+    ("web_research", "web_research.get_research_graph()"),
+    ("simple_langgraph", "simple_langgraph.get_weather_app()"),
+]
+
+
+def measure(module: str, build: str) -> tuple[float, float]:
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD.format(module=module, build=build)],
+        cwd=ROOT_DIRECTORY,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    import_seconds, build_seconds = map(float, output.split()[-2:])
+    return import_seconds, build_seconds
+
+
+def main(repetitions: int) -> None:
+    hub_prompt_cached = (HUB_CACHE_DIRECTORY / f"{AGENT_PROMPT.replace('/', '__')}.json").is_file()
+    print(f"Median of {repetitions} fresh interpreters")
+    for module, build in CASES:
+        if module == "simple_langgraph" and not hub_prompt_cached:
+            build = ""
+        timings = [measure(module, build) for _ in range(repetitions)]
+        import_seconds = statistics.median(timing[0] for timing in timings)
+        line = f"{module:>18}: import {import_seconds:5.2f}s"
+        if build:
+            build_seconds = statistics.median(timing[1] for timing in timings)
+            line += f", first build {build_seconds:5.2f}s"
+        print(line)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
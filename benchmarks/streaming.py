@@ -0,0 +1,91 @@
+"""Time to the first byte of a research article, streamed against whole node outputs.
+
+The research graph runs offline with a FakeChatModel streaming one token every
+--token-latency seconds, and the research tool pointed at a local stub server.
+Before streaming, the article was first seen when the research node finished.
+
+Run from the repository root with: python -m benchmarks.streaming [--token-latency 0.01]
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from benchmarks.graphs import stub_app  # Sets the dummy keys first.
+
+from langchain_core.messages import HumanMessage  # noqa: E402
+
+import web_research  # noqa: E402
+from benchmarks.fakes import FakeChatModel, fake_search_tool  # noqa: E402
+from benchmarks.stub_server import serve  # noqa: E402
+from checkpointer import thread_config  # noqa: E402
+from streaming import stream_graph  # noqa: E402
+from tools.fetch import SESSION_POOL  # noqa: E402
+from tools.web import research  # noqa: E402
+
+
+ARTICLE_CHARACTERS = 4000
+PAGES_PER_SEARCH = 4
+
+
+async def watch_file(path: Path, start_time: float) -> float:
+    while not path.is_file() or path.stat().st_size == 0:
+        await asyncio.sleep(0.005)
+    return time.perf_counter() - start_time
+
+
+async def main(arguments: argparse.Namespace) -> None:
+    async with serve(stub_app(0.02)) as base_url:
+        page_urls = [f"{base_url}/page/{index}" for index in range(PAGES_PER_SEARCH)]
+        llm = FakeChatModel(
+            latency=arguments.llm_latency,
+            streaming=True,
+            token_latency=arguments.token_latency,
+            answer_characters=ARTICLE_CHARACTERS,
+            tool_arguments={
+                "tavily_search_results_json": lambda: {"query": "Jaws"},
+                "research": lambda: {"research_urls": page_urls, "query": "Jaws"},
+            },
+        )
+        graph = web_research.build_research_graph(
+            llm=llm, search_tool=fake_search_tool(lambda: page_urls, 0.02), research_tool=research
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            web_research.OUTPUT_DIRECTORY = Path(directory)
+            thread_id = str(uuid.uuid4())
+            start_time = time.perf_counter()
+            file_watcher = asyncio.create_task(
+                watch_file(Path(directory) / f"{thread_id}.md.part", start_time)
+            )
+            first_token, node_output = None, None
+            async for event in stream_graph(
+                graph, {"messages": [HumanMessage(content="Jaws")]}, thread_config(thread_id)
+            ):
+                elapsed = time.perf_counter() - start_time
+                if event.name != web_research.RESEARCH_AGENT_NAME:
+                    continue
+                if event.kind == "token" and first_token is None:
+                    first_token = elapsed
+                elif event.kind == "node":
+                    node_output = elapsed
+            total = time.perf_counter() - start_time
+            first_file_byte = await file_watcher
+        await SESSION_POOL.close()
+
+    print(
+        f"{arguments.token_latency * 1000:.0f} ms per token,"
+        f" {arguments.llm_latency * 1000:.0f} ms to the first token of each LLM call"
+    )
+    print(f"  whole research node output: {node_output:6.2f}s")
+    print(f"  first streamed token:       {first_token:6.2f}s")
+    print(f"  first byte in article draft: {first_file_byte:5.2f}s")
+    print(f"  whole run:                  {total:6.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--token-latency", type=float, default=0.01)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,58 @@
+"""Compare a fresh aiohttp session per URL against the shared SessionPool.
+
+Run from the repository root with: python -m benchmarks.web_session_pool
+"""
+import asyncio
+import time
+
+import aiohttp
+from aiohttp import web
+
+from benchmarks.stub_server import serve
+from tools.fetch import SessionPool
+
+
+NUMBER_OF_URLS = 200
+PAGE = "<html><body>" + "<p>Lorem ipsum dolor sit amet.</p>" * 200 + "</body></html>"
+
+
+def fixture_app() -> web.Application:
+    async def page(request: web.Request) -> web.Response:
+        return web.Response(text=PAGE, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/wiki/{name}", page)
+    return app
+
+
+async def fetch_fresh_session(url: str) -> str:
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url) as response:
+            return await response.text()
+
+
+async def fetch_pooled(pool: SessionPool, url: str) -> str:
+    async with pool.get(url) as response:
+        return await response.text()
+
+
+async def main():
+    async with serve(fixture_app()) as base_url:
+        urls = [f"{base_url}/wiki/page_{i}" for i in range(NUMBER_OF_URLS)]
+
+        start_time = time.perf_counter()
+        await asyncio.gather(*(fetch_fresh_session(url) for url in urls))
+        fresh_time = time.perf_counter() - start_time
+
+        pool = SessionPool()
+        start_time = time.perf_counter()
+        await asyncio.gather(*(fetch_pooled(pool, url) for url in urls))
+        pooled_time = time.perf_counter() - start_time
+        await pool.close()
+
+    print(f"{NUMBER_OF_URLS} URLs, fresh session per URL: {fresh_time:.3f} seconds")
+    print(f"{NUMBER_OF_URLS} URLs, shared session pool:  {pooled_time:.3f} seconds")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,208 @@
+import base64
+import functools
+import json
+import pickle
+import sqlite3
+import sys
+import threading
+import uuid
+import zlib
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from decouple import config
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+from langchain_core.pydantic_v1 import PrivateAttr
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    Checkpoint,
+    CheckpointAt,
+    CheckpointTuple,
+)
+from langgraph.pregel import Pregel
+
+
+CHECKPOINT_PATH = Path(__file__).parent / "cache" / "checkpoints.sqlite3"
+CHECKPOINTS_ENABLED = config("CHECKPOINTS_ENABLED", default=True, cast=bool)
+# Only the latest checkpoint is needed to resume, older ones are kept for inspection.
+CHECKPOINT_HISTORY = config("CHECKPOINT_HISTORY", default=10, cast=int)
+
+
+def encode_value(value: Any) -> Any:
+    """Convert channel values to JSON, storing messages as their dict form.
+
+    Values JSON can't represent, like agent actions, fall back to pickle.
+    """
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, BaseMessage):
+        return {"__message__": message_to_dict(value)}
+    if isinstance(value, list):
+        return [encode_value(item) for item in value]
+    if isinstance(value, tuple):
+        return {"__tuple__": [encode_value(item) for item in value]}
+    if isinstance(value, dict) and all(isinstance(key, str) for key in value):
+        return {key: encode_value(item) for key, item in value.items()}
+    return {"__pickle__": base64.b64encode(pickle.dumps(value)).decode("ascii")}
+
+
+def decode_value(value: Any) -> Any:
+    if isinstance(value, list):
+        return [decode_value(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if "__message__" in value:
+        return messages_from_dict([value["__message__"]])[0]
+    if "__tuple__" in value:
+        return tuple(decode_value(item) for item in value["__tuple__"])
+    if "__pickle__" in value:
+        return pickle.loads(base64.b64decode(value["__pickle__"]))
+    return {key: decode_value(item) for key, item in value.items()}
+
+
+def dump_checkpoint(checkpoint: Checkpoint) -> bytes:
+    data = {**checkpoint, "channel_values": encode_value(checkpoint["channel_values"])}
+    return zlib.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+
+
+def load_checkpoint(blob: bytes) -> Checkpoint:
+    data = json.loads(zlib.decompress(blob))
+    return Checkpoint(
+        v=data["v"],
+        ts=data["ts"],
+        channel_values=decode_value(data["channel_values"]),
+        channel_versions=defaultdict(int, data["channel_versions"]),
+        versions_seen=defaultdict(
+            lambda: defaultdict(int),
+            {node: defaultdict(int, seen) for node, seen in data["versions_seen"].items()},
+        ),
+    )
+
+
+def thread_config(thread_id: str) -> RunnableConfig:
+    return {"configurable": {"thread_id": thread_id}}
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver):
+    """Durable graph checkpoints in SQLite, saved after every step.
+
+    Checkpoints are compressed JSON rather than pickles of whole message objects,
+    and only the latest CHECKPOINT_HISTORY checkpoints of each thread are kept.
+    """
+
+    path: str = str(CHECKPOINT_PATH)
+    history: int = CHECKPOINT_HISTORY
+    at: CheckpointAt = CheckpointAt.END_OF_STEP
+
+    _connection: sqlite3.Connection = PrivateAttr()
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS checkpoints (
+                thread_id TEXT NOT NULL,
+                thread_ts TEXT NOT NULL,
+                parent_ts TEXT,
+                checkpoint BLOB NOT NULL,
+                PRIMARY KEY (thread_id, thread_ts)
+            )"""
+        )
+        self._connection.commit()
+
+    @staticmethod
+    def _tuple(thread_id: str, thread_ts: str, parent_ts, blob: bytes) -> CheckpointTuple:
+        parent_config = None
+        if parent_ts:
+            parent_config = {"configurable": {"thread_id": thread_id, "thread_ts": parent_ts}}
+        return CheckpointTuple(
+            {"configurable": {"thread_id": thread_id, "thread_ts": thread_ts}},
+            load_checkpoint(blob),
+            parent_config,
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        thread_ts = config["configurable"].get("thread_ts")
+        with self._lock:
+            if thread_ts:
+                row = self._connection.execute(
+                    "SELECT thread_id, thread_ts, parent_ts, checkpoint FROM checkpoints"
+                    " WHERE thread_id = ? AND thread_ts = ?",
+                    (thread_id, thread_ts),
+                ).fetchone()
+            else:
+                row = self._connection.execute(
+                    "SELECT thread_id, thread_ts, parent_ts, checkpoint FROM checkpoints"
+                    " WHERE thread_id = ? ORDER BY thread_ts DESC LIMIT 1",
+                    (thread_id,),
+                ).fetchone()
+        return self._tuple(*row) if row else None
+
+    def list(self, config: RunnableConfig) -> Iterator[CheckpointTuple]:
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT thread_id, thread_ts, parent_ts, checkpoint FROM checkpoints"
+                " WHERE thread_id = ? ORDER BY thread_ts DESC",
+                (config["configurable"]["thread_id"],),
+            ).fetchall()
+        for row in rows:
+            yield self._tuple(*row)
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        blob = dump_checkpoint(checkpoint)
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?)",
+                (thread_id, checkpoint["ts"], config["configurable"].get("thread_ts"), blob),
+            )
+            self._connection.execute(
+                "DELETE FROM checkpoints WHERE thread_id = ? AND thread_ts NOT IN"
+                " (SELECT thread_ts FROM checkpoints WHERE thread_id = ?"
+                " ORDER BY thread_ts DESC LIMIT ?)",
+                (thread_id, thread_id, self.history),
+            )
+            self._connection.commit()
+        return {"configurable": {"thread_id": thread_id, "thread_ts": checkpoint["ts"]}}
+
+
+@functools.lru_cache(maxsize=None)
+def get_checkpointer() -> Optional[SQLiteCheckpointSaver]:
+    if not CHECKPOINTS_ENABLED:
+        return None
+    return SQLiteCheckpointSaver()
+
+
+def prepare_run(
+    graph: Pregel, input: dict, thread_id: Optional[str] = None
+) -> tuple[Optional[dict], RunnableConfig]:
+    """The input and config to run a graph on a thread, resuming it if unfinished.
+
+    A thread whose last checkpoint still has nodes to run continues from there
+    with None as input, so completed nodes are not run again. A finished thread is
+    not reused: its state would be the starting point of the new run, appending to
+    its messages, so the run gets a fresh thread ID instead. Read the thread ID
+    to use from the returned config.
+    """
+    run_config = thread_config(thread_id or str(uuid.uuid4()))
+    if graph.checkpointer is not None and thread_id is not None:
+        state = graph.get_state(run_config)
+        if state.next:
+            return None, run_config
+        if graph.checkpointer.get_tuple(run_config) is not None:
+            return input, thread_config(str(uuid.uuid4()))
+    return input, run_config
+
+
+def thread_id_argument() -> Optional[str]:
+    """The thread ID given as a script's first argument, if any.
+
+    Passing the thread ID of a failed run resumes it from its last completed node.
+    """
+    return sys.argv[1] if len(sys.argv) > 1 else None
@@ -1,6 +1,16 @@
+import asyncio
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from decouple import config
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
+from llm import get_llm
+from openai import RateLimitError
 from setup_environment import set_environment_variables
 
 set_environment_variables("Simple LangChain test")
@@ -11,7 +21,7 @@ french_german_prompt = ChatPromptTemplate.from_template(
 )
 
 
-llm = ChatOpenAI(model="gpt-3.5-turbo-0125")
+llm = get_llm()
 output_parser = StrOutputParser()
 
 french_german_chain = french_german_prompt | llm | output_parser  # LCEL
@@ -56,4 +66,138 @@ def run_chain(word: str) -> str:
     return answer
 
 
-run_chain("strawberries")
+BATCH_CONCURRENCY = config("BATCH_CONCURRENCY", default=16, cast=int)
+MAX_RETRIES = 6
+
+
+class RateLimitBackoff:
+    """Shared backpressure for all batch workers.
+
+    After a rate-limit error every worker pauses until the backoff period is over,
+    which doubles with each consecutive error and resets after a success.
+    """
+
+    def __init__(self, base_delay: float = 1.0, max_delay: float = 60.0) -> None:
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.consecutive_errors = 0
+        self.resume_at = 0.0
+
+    async def call(self, chain, input: dict) -> str:
+        for attempt in range(MAX_RETRIES):
+            delay = self.resume_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                result = await chain.ainvoke(input)
+            except RateLimitError:
+                if attempt == MAX_RETRIES - 1:
+                    raise
+                self.consecutive_errors += 1
+                delay = min(self.base_delay * 2**self.consecutive_errors, self.max_delay)
+                self.resume_at = max(
+                    self.resume_at, time.monotonic() + delay * random.uniform(0.5, 1.0)
+                )
+                continue
+            self.consecutive_errors = 0
+            return result
+        raise RuntimeError("unreachable")
+
+
+def read_words(path: Path | str) -> Iterator[str]:
+    with open(path, "r", encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                yield line.strip()
+
+
+async def run_batch(
+    words: Iterable[str], output_path: Path | str, concurrency: int = BATCH_CONCURRENCY
+) -> int:
+    """Run the draft-then-review chain for many words and stream results to JSONL.
+
+    Both stages have their own pool of `concurrency` workers connected by bounded
+    queues, so a word is reviewed as soon as its draft lands while reading the input
+    only as fast as the workers can keep up. Returns the number of lines written.
+    """
+    draft_queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    review_queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    result_queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    backoff = RateLimitBackoff()
+
+    async def produce():
+        for word in words:
+            await draft_queue.put(word)
+        for _ in range(concurrency):
+            await draft_queue.put(None)
+
+    async def draft_worker():
+        while (word := await draft_queue.get()) is not None:
+            try:
+                initial_answer = await backoff.call(french_german_chain, {"word": word})
+            except Exception as error:
+                await result_queue.put({"word": word, "error": repr(error)})
+                continue
+            await review_queue.put((word, initial_answer))
+
+    async def review_worker():
+        while (item := await review_queue.get()) is not None:
+            word, initial_answer = item
+            question = f"Please tell me the french and german words for {word} with an example sentence for each."
+            try:
+                answer = await backoff.call(
+                    check_answer_chain,
+                    {"question": question, "initial_answer": initial_answer},
+                )
+            except Exception as error:
+                await result_queue.put({"word": word, "error": repr(error)})
+                continue
+            await result_queue.put(
+                {"word": word, "initial_answer": initial_answer, "answer": answer}
+            )
+
+    async def run_stage(workers: list, next_queue: asyncio.Queue, sentinels: int):
+        await asyncio.gather(*workers)
+        for _ in range(sentinels):
+            await next_queue.put(None)
+
+    async def write_results(file) -> int:
+        written = 0
+        while (result := await result_queue.get()) is not None:
+            file.write(json.dumps(result, ensure_ascii=False) + "\n")
+            file.flush()
+            written += 1
+        return written
+
+    # Opened up front, so a bad output path fails before any chain call.
+    with open(output_path, "a", encoding="utf-8") as file:
+        writer = asyncio.ensure_future(write_results(file))
+        tasks = [
+            asyncio.ensure_future(produce()),
+            asyncio.ensure_future(
+                run_stage([draft_worker() for _ in range(concurrency)], review_queue, concurrency)
+            ),
+            asyncio.ensure_future(
+                run_stage([review_worker() for _ in range(concurrency)], result_queue, 1)
+            ),
+            writer,
+        ]
+        try:
+            # If the writer fails, the workers would block on the full result queue.
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return writer.result()
+
+
+if __name__ == "__main__":
+    # Batch mode: python langchain_basics.py words.txt results.jsonl
+    if len(sys.argv) > 2:
+        lines_written = asyncio.run(run_batch(read_words(sys.argv[1]), sys.argv[2]))
+        print(f"Wrote {lines_written} results to {sys.argv[2]}")
+    else:
+        run_chain("strawberries")
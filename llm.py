@@ -0,0 +1,277 @@
+import functools
+import hashlib
+import json
+import math
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Optional, Sequence
+
+from decouple import config
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatResult
+from langchain_core.prompts import BasePromptTemplate
+
+from tools.packing import estimate_tokens
+from tools.rate_limit import get_rate_limiter
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
+
+LLM_MODEL = "gpt-3.5-turbo-0125"
+
+LLM_CACHE_PATH = Path(__file__).parent / "cache" / "llm_cache.sqlite3"
+LLM_CACHE_ENABLED = config("LLM_CACHE_ENABLED", default=True, cast=bool)
+LLM_CACHE_TTL = config("LLM_CACHE_TTL", default=7 * 24 * 60 * 60, cast=int)
+LLM_CACHE_MAX_ENTRIES = config("LLM_CACHE_MAX_ENTRIES", default=10_000, cast=int)
+# Semantic lookups embed every prompt, so they cost an embedding call per miss.
+LLM_CACHE_SEMANTIC = config("LLM_CACHE_SEMANTIC", default=False, cast=bool)
+LLM_CACHE_SIMILARITY = config("LLM_CACHE_SIMILARITY", default=0.97, cast=float)
+LLM_CACHE_SEMANTIC_CANDIDATES = 500
+
+HUB_CACHE_DIRECTORY = Path(__file__).parent / "cache" / "hub"
+
+# Completion tokens reserved for a call until the API reports what it used.
+COMPLETION_TOKENS_ESTIMATE = 500
+
+Embedder = Callable[[str], Sequence[float]]
+
+
+def normalize_prompt(prompt: str) -> str:
+    return " ".join(prompt.split())
+
+
+def cosine_similarity(a: Sequence[float], b: Sequence[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class SQLiteLLMCache(BaseCache):
+    """LLM response cache in SQLite with a TTL and LRU size eviction.
+
+    Lookups match exactly on the normalized prompt and the model string (model name
+    and call parameters, including bound tools). If an embedder is given, a miss
+    falls back to the most similar cached prompt for the same model string.
+    Only invoke/generate calls use the cache, stream and astream skip it, so agents
+    are built with stream_runnable=False.
+    """
+
+    def __init__(
+        self,
+        path: Path | str = LLM_CACHE_PATH,
+        ttl: int = LLM_CACHE_TTL,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        embedder: Optional[Embedder] = None,
+        similarity_threshold: float = LLM_CACHE_SIMILARITY,
+    ) -> None:
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.embedder = embedder
+        self.similarity_threshold = similarity_threshold
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(path), check_same_thread=False)
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                llm_string TEXT NOT NULL,
+                response TEXT NOT NULL,
+                embedding TEXT,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed_at)"
+        )
+        self._connection.commit()
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        content = f"{llm_string}\x00{normalize_prompt(prompt)}"
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,)
+            )
+            row = self._connection.execute(
+                "SELECT key, response FROM llm_cache WHERE key = ?",
+                (self._key(prompt, llm_string),),
+            ).fetchone()
+            self._connection.commit()
+        if row is None and self.embedder is not None:
+            # The embedder calls an API, so it runs without holding the lock.
+            embedding = self.embedder(normalize_prompt(prompt))
+            row = self._lookup_similar(embedding, llm_string)
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._connection.execute(
+                "UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, row[0])
+            )
+            self._connection.commit()
+        return [loads(generation) for generation in json.loads(row[1])]
+
+    def _lookup_similar(
+        self, embedding: Sequence[float], llm_string: str
+    ) -> Optional[tuple]:
+        with self._lock:
+            candidates = self._connection.execute(
+                "SELECT key, response, embedding FROM llm_cache"
+                " WHERE llm_string = ? AND embedding IS NOT NULL"
+                " ORDER BY accessed_at DESC LIMIT ?",
+                (llm_string, LLM_CACHE_SEMANTIC_CANDIDATES),
+            ).fetchall()
+        best_row, best_similarity = None, self.similarity_threshold
+        for key, response, stored_embedding in candidates:
+            similarity = cosine_similarity(embedding, json.loads(stored_embedding))
+            if similarity >= best_similarity:
+                best_row, best_similarity = (key, response), similarity
+        return best_row
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        response = json.dumps([dumps(generation) for generation in return_val])
+        embedding = None
+        if self.embedder is not None:
+            embedding = json.dumps(list(self.embedder(normalize_prompt(prompt))))
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (self._key(prompt, llm_string), llm_string, response, embedding, now, now),
+            )
+            (count,) = self._connection.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+            if count > self.max_entries:
+                self._connection.execute(
+                    "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache"
+                    " ORDER BY accessed_at LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+                self.evictions += count - self.max_entries
+            self._connection.commit()
+
+    def clear(self, **kwargs) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM llm_cache")
+            self._connection.commit()
+
+
+@functools.lru_cache(maxsize=None)
+def get_llm_cache() -> Optional[SQLiteLLMCache]:
+    if not LLM_CACHE_ENABLED:
+        return None
+    embedder = None
+    if LLM_CACHE_SEMANTIC:
+        from langchain_openai import OpenAIEmbeddings
+
+        embedder = OpenAIEmbeddings().embed_query
+    return SQLiteLLMCache(embedder=embedder)
+
+
+def estimate_call_tokens(
+    messages: list[BaseMessage], max_tokens: Optional[int], **kwargs: Any
+) -> int:
+    """A rough count of the tokens a call uses, from the prompt and bound tools."""
+    texts = [str(message.content) for message in messages]
+    texts += [
+        json.dumps(message.additional_kwargs)
+        for message in messages
+        if message.additional_kwargs
+    ]
+    texts += [json.dumps(kwargs[key]) for key in ("tools", "functions") if key in kwargs]
+    prompt_tokens = sum(estimate_tokens(text) for text in texts)
+    return prompt_tokens + (max_tokens or COMPLETION_TOKENS_ESTIMATE)
+
+
+def used_tokens(result: ChatResult) -> Optional[int]:
+    usage = (result.llm_output or {}).get("token_usage") or {}
+    return usage.get("total_tokens")
+
+
+@functools.lru_cache(maxsize=None)
+def rate_limited_chat_openai() -> type["ChatOpenAI"]:
+    """ChatOpenAI that waits for the shared OpenAI rate limiter before each API call.
+
+    Cache hits don't reach these methods, so they don't count against the limits.
+    """
+    from langchain_openai import ChatOpenAI
+
+    class RateLimitedChatOpenAI(ChatOpenAI):
+        # Serialize and name runs as ChatOpenAI, so the LLM cache keys stay the same.
+        @classmethod
+        def lc_id(cls) -> list[str]:
+            return ChatOpenAI.lc_id()
+
+        def get_name(self, suffix: Optional[str] = None, *, name: Optional[str] = None) -> str:
+            return super().get_name(suffix, name=name or self.name or ChatOpenAI.__name__)
+
+        def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+            estimate = estimate_call_tokens(messages, self.max_tokens, **kwargs)
+            get_rate_limiter("openai", self.model_name).acquire(estimate)
+            yield from super()._stream(messages, stop, run_manager, **kwargs)
+
+        async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+            estimate = estimate_call_tokens(messages, self.max_tokens, **kwargs)
+            await get_rate_limiter("openai", self.model_name).aacquire(estimate)
+            async for chunk in super()._astream(messages, stop, run_manager, **kwargs):
+                yield chunk
+
+        def _generate(self, messages, stop=None, run_manager=None, stream=None, **kwargs):
+            if stream if stream is not None else self.streaming:
+                # Streamed calls are limited in _stream.
+                return super()._generate(messages, stop, run_manager, stream, **kwargs)
+            limiter = get_rate_limiter("openai", self.model_name)
+            estimate = estimate_call_tokens(messages, self.max_tokens, **kwargs)
+            limiter.acquire(estimate)
+            result = super()._generate(messages, stop, run_manager, stream, **kwargs)
+            limiter.settle(estimate, used_tokens(result) or estimate)
+            return result
+
+        async def _agenerate(self, messages, stop=None, run_manager=None, stream=None, **kwargs):
+            if stream if stream is not None else self.streaming:
+                return await super()._agenerate(messages, stop, run_manager, stream, **kwargs)
+            limiter = get_rate_limiter("openai", self.model_name)
+            estimate = estimate_call_tokens(messages, self.max_tokens, **kwargs)
+            await limiter.aacquire(estimate)
+            result = await super()._agenerate(messages, stop, run_manager, stream, **kwargs)
+            limiter.settle(estimate, used_tokens(result) or estimate)
+            return result
+
+    return RateLimitedChatOpenAI
+
+
+@functools.lru_cache(maxsize=None)
+def get_llm(model: str = LLM_MODEL, **kwargs) -> "ChatOpenAI":
+    """Shared, rate-limited ChatOpenAI instances for every graph, backed by the LLM cache."""
+    return rate_limited_chat_openai()(model=model, cache=get_llm_cache(), **kwargs)
+
+
+@functools.lru_cache(maxsize=None)
+def pull_prompt(name: str) -> BasePromptTemplate:
+    """A LangChain hub prompt, pulled once and then loaded from cache/hub.
+
+    Delete the cached file to pull the latest version again.
+    """
+    path = HUB_CACHE_DIRECTORY / f"{name.replace('/', '__')}.json"
+    if path.is_file():
+        return loads(path.read_text(encoding="utf-8"))
+    from langchain import hub
+
+    prompt = hub.pull(name)
+    HUB_CACHE_DIRECTORY.mkdir(parents=True, exist_ok=True)
+    path.write_text(dumps(prompt), encoding="utf-8")
+    return prompt
@@ -0,0 +1,102 @@
+import re
+from typing import Sequence
+
+from decouple import config
+from langchain_core.messages import BaseMessage
+
+from tools.packing import CHARACTERS_PER_TOKEN, estimate_tokens
+
+
+MESSAGES_KEEP_LAST = config("MESSAGES_KEEP_LAST", default=4, cast=int)
+MESSAGES_MAX_TOKENS = config("MESSAGES_MAX_TOKENS", default=6_000, cast=int)
+EXCERPT_CHARACTERS = 300
+MAX_REFERENCES = 10
+REFERENCE_PATTERN = re.compile(
+    r"https?://[^\s()\[\]<>'\"`]+|[^\s()\[\]<>'\"`]+\.(?:png|pdf|md)\b", re.IGNORECASE
+)
+
+
+def message_tokens(messages: Sequence[BaseMessage]) -> int:
+    return sum(estimate_tokens(str(message.content)) for message in messages)
+
+
+def references(content: str) -> list[str]:
+    """URLs and file paths in the content, so elided text can still be pointed to."""
+    return list(dict.fromkeys(REFERENCE_PATTERN.findall(content)))[:MAX_REFERENCES]
+
+
+def elision_note(content: str, excerpt_characters: int, index: int) -> str:
+    note = f" [... {len(content) - excerpt_characters} characters of message {index} elided"
+    if elided_references := references(content[excerpt_characters:]):
+        note += "; references: " + ", ".join(elided_references)
+    return note + "]"
+
+
+def elide(message: BaseMessage, index: int, max_characters: int) -> BaseMessage:
+    """Shorten a message to an excerpt, noting what was cut and the references in it.
+
+    The excerpt and the note together fit in max_characters, unless the note alone
+    doesn't.
+    """
+    content = message.content
+    if not isinstance(content, str) or len(content) <= max_characters:
+        return message
+    excerpt_characters = max_characters
+    while True:
+        excerpt = content[:excerpt_characters]
+        excerpt = excerpt.rsplit(" ", 1)[0] if " " in excerpt else excerpt
+        note = elision_note(content, len(excerpt), index)
+        if len(excerpt) + len(note) <= max_characters or not excerpt:
+            return message.copy(update={"content": excerpt + note})
+        excerpt_characters = max(0, min(len(excerpt) - 1, max_characters - len(note)))
+
+
+def compact_messages(
+    messages: Sequence[BaseMessage],
+    keep_last: int = MESSAGES_KEEP_LAST,
+    max_tokens: int = MESSAGES_MAX_TOKENS,
+) -> list[BaseMessage]:
+    """A bounded view of the conversation to send to an LLM.
+
+    The first message (the user's request) and the last keep_last messages are kept
+    verbatim. Older outputs are dropped if the same member produced a later one and
+    shortened to an excerpt otherwise. If the view is still above max_tokens, the
+    oldest messages are shortened further, and the user's request last of all. The
+    state itself keeps the full history.
+    """
+    messages = list(messages)
+    if len(messages) <= keep_last + 1 and message_tokens(messages) <= max_tokens:
+        return messages
+
+    recent_start = max(1, len(messages) - keep_last)
+    latest_index = {message.name: index for index, message in enumerate(messages)}
+    compacted = messages[:1]
+    for index in range(1, recent_start):
+        message = messages[index]
+        if message.name and latest_index[message.name] != index:
+            content = f"[Earlier output of {message.name} elided, see their latest output.]"
+            compacted.append(message.copy(update={"content": content}))
+        else:
+            compacted.append(elide(message, index, EXCERPT_CHARACTERS))
+    compacted.extend(messages[recent_start:])
+
+    excess_tokens = message_tokens(compacted) - max_tokens
+    for index in [*range(1, len(compacted)), 0]:
+        if excess_tokens <= 0:
+            break
+        message = compacted[index]
+        size = len(str(message.content))
+        cut = max(excess_tokens * CHARACTERS_PER_TOKEN, EXCERPT_CHARACTERS)
+        target = max(EXCERPT_CHARACTERS, size - cut)
+        # Cutting less than an excerpt's worth would barely pay for the note.
+        if size - target < EXCERPT_CHARACTERS:
+            continue
+        compacted[index] = elide(message, index, target)
+        excess_tokens -= message_tokens([message]) - message_tokens([compacted[index]])
+    return compacted
+
+
+def latest_outputs(messages: Sequence[BaseMessage], members: list[str]) -> list[BaseMessage]:
+    """The user's request and the latest output of each member, in member order."""
+    latest = {message.name: message for message in messages if message.name in members}
+    return list(messages[:1]) + [latest[member] for member in members if member in latest]
@@ -0,0 +1,305 @@
+import bisect
+import json
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+from uuid import UUID
+
+from decouple import config
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+
+METRICS_ENABLED = config("METRICS_ENABLED", default=True, cast=bool)
+METRICS_DIRECTORY = Path(__file__).parent / "output"
+
+# Dollars per million prompt and completion tokens.
+MODEL_PRICES = {
+    "gpt-3.5-turbo-0125": (0.50, 1.50),
+    "gpt-4-turbo": (10.00, 30.00),
+}
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+NODE_TAG_PREFIX = "graph:step:"
+
+Labels = tuple[tuple[str, str], ...]
+
+
+@dataclass
+class Histogram:
+    count: int = 0
+    sum: float = 0.0
+    bucket_counts: list[int] = field(default_factory=lambda: [0] * len(LATENCY_BUCKETS))
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        index = bisect.bisect_left(LATENCY_BUCKETS, value)
+        if index < len(LATENCY_BUCKETS):
+            self.bucket_counts[index] += 1
+
+
+class MetricsRegistry:
+    """In-process counters and latency histograms, keyed by name and labels."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counters: dict[tuple[str, Labels], float] = {}
+        self.histograms: dict[tuple[str, Labels], Histogram] = {}
+
+    def increment(self, name: str, value: float = 1, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.histograms.setdefault(key, Histogram()).observe(seconds)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def snapshot(self) -> list[dict]:
+        with self._lock:
+            counters = [
+                {"name": name, "type": "counter", "labels": dict(labels), "value": value}
+                for (name, labels), value in self.counters.items()
+            ]
+            histograms = [
+                {
+                    "name": name,
+                    "type": "histogram",
+                    "labels": dict(labels),
+                    "count": histogram.count,
+                    "sum": histogram.sum,
+                    "buckets": dict(zip(LATENCY_BUCKETS, histogram.bucket_counts)),
+                }
+                for (name, labels), histogram in self.histograms.items()
+            ]
+        gauges = [
+            {"name": name, "type": "gauge", "labels": {"cache": cache}, "value": value}
+            for (name, cache), value in collect_cache_stats().items()
+        ]
+        return counters + histograms + gauges
+
+    def write_jsonl(self, path: Path = METRICS_DIRECTORY / "metrics.jsonl") -> None:
+        """Append every metric as one JSON line, stamped with the export time."""
+        timestamp = time.time()
+        with open(path, "a", encoding="utf-8") as file:
+            for metric in self.snapshot():
+                file.write(json.dumps({"timestamp": timestamp, **metric}) + "\n")
+
+    def to_prometheus(self) -> str:
+        """The metrics in the Prometheus text exposition format."""
+        lines = []
+        typed = set()
+        for metric in sorted(self.snapshot(), key=lambda metric: metric["name"]):
+            name = metric["name"]
+            if name not in typed:
+                lines.append(f"# TYPE {name} {metric['type']}")
+                typed.add(name)
+            labels = metric["labels"]
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{format_labels(labels)} {metric['value']}")
+                continue
+            cumulative = 0
+            for bound, count in metric["buckets"].items():
+                cumulative += count
+                lines.append(f"{name}_bucket{format_labels({**labels, 'le': str(bound)})} {cumulative}")
+            lines.append(f"{name}_bucket{format_labels({**labels, 'le': '+Inf'})} {metric['count']}")
+            lines.append(f"{name}_sum{format_labels(labels)} {metric['sum']}")
+            lines.append(f"{name}_count{format_labels(labels)} {metric['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: Path = METRICS_DIRECTORY / "metrics.prom") -> None:
+        path.write_text(self.to_prometheus(), encoding="utf-8")
+
+    def node_summary(self) -> list[tuple[str, int, float]]:
+        """(node, runs, total seconds) for every graph node, slowest first."""
+        with self._lock:
+            nodes = [
+                (dict(labels)["node"], histogram.count, histogram.sum)
+                for (name, labels), histogram in self.histograms.items()
+                if name == "graph_node_seconds"
+            ]
+        return sorted(nodes, key=lambda node: node[2], reverse=True)
+
+
+def format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in sorted(labels.items()):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def collect_cache_stats() -> dict[tuple[str, str], float]:
+    """Hit and miss counts of the caches that are loaded in this process."""
+    stats: dict[tuple[str, str], float] = {}
+    sources = []
+    if (llm := sys.modules.get("llm")) and (llm_cache := llm.get_llm_cache()):
+        sources.append(("llm", llm_cache))
+    if web_cache := sys.modules.get("tools.web_cache"):
+        sources.append(("web", web_cache.WEB_CACHE.stats))
+    if weather := sys.modules.get("tools.weather"):
+        sources.append(("weather", weather.WEATHER_CACHE))
+    if image := sys.modules.get("tools.image"):
+        sources.append(("image", image.IMAGE_STORE))
+    for cache_name, source in sources:
+        stats[("cache_hits", cache_name)] = source.hits
+        stats[("cache_misses", cache_name)] = source.misses
+    return stats
+
+
+METRICS = MetricsRegistry()
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Records graph node, LLM and tool timings into a MetricsRegistry.
+
+    Graph nodes are recognized by the graph:step tag langgraph puts on them, and
+    LLM and tool calls are attributed to the node they run in. Token counts and
+    cost are only recorded when the API reports usage, which it does not for
+    streamed responses.
+    """
+
+    # The handlers only take a lock and update dicts, so in async runs they are
+    # called on the event loop instead of in the default executor, which would
+    # cost a thread hop per event and could reorder a run's start and end.
+    run_inline = True
+
+    def __init__(self, registry: MetricsRegistry = METRICS) -> None:
+        self.registry = registry
+        self._lock = threading.Lock()
+        self._nodes: dict[UUID, str] = {}
+        self._starts: dict[UUID, tuple[float, str]] = {}
+
+    def _start(self, run_id: UUID, parent_run_id: Optional[UUID], name: str) -> None:
+        with self._lock:
+            if parent_run_id in self._nodes:
+                self._nodes[run_id] = self._nodes[parent_run_id]  # type: ignore
+            self._starts[run_id] = (time.perf_counter(), name)
+
+    def _end(self, run_id: UUID) -> tuple[float, str, str]:
+        with self._lock:
+            start_time, name = self._starts.pop(run_id, (time.perf_counter(), ""))
+            node = self._nodes.pop(run_id, "")
+        return time.perf_counter() - start_time, name, node
+
+    def on_chain_start(
+        self,
+        serialized: dict[str, Any],
+        inputs: dict[str, Any],
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        tags: Optional[list[str]] = None,
+        **kwargs: Any,
+    ) -> None:
+        name = kwargs.get("name") or ""
+        is_step = any(tag.startswith(NODE_TAG_PREFIX) for tag in tags or [])
+        # langgraph also runs its input and edge routing as steps, skip those.
+        if is_step and not name.startswith("__") and not name.endswith(":edges"):
+            with self._lock:
+                self._nodes[run_id] = name
+            name = NODE_TAG_PREFIX
+        self._start(run_id, parent_run_id, name)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        seconds, name, node = self._end(run_id)
+        if name == NODE_TAG_PREFIX:
+            self.registry.observe("graph_node_seconds", seconds, node=node)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        seconds, name, node = self._end(run_id)
+        if name == NODE_TAG_PREFIX:
+            self.registry.observe("graph_node_seconds", seconds, node=node)
+            self.registry.increment("graph_node_errors_total", node=node)
+
+    def on_chat_model_start(
+        self,
+        serialized: dict[str, Any],
+        messages: list,
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        **kwargs: Any,
+    ) -> None:
+        self._start(run_id, parent_run_id, "llm")
+
+    def on_llm_start(
+        self,
+        serialized: dict[str, Any],
+        prompts: list[str],
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        **kwargs: Any,
+    ) -> None:
+        self._start(run_id, parent_run_id, "llm")
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        seconds, _, node = self._end(run_id)
+        llm_output = response.llm_output or {}
+        model = llm_output.get("model_name", "")
+        self.registry.increment("llm_calls_total", node=node, model=model)
+        self.registry.observe("llm_seconds", seconds, node=node, model=model)
+        usage = llm_output.get("token_usage") or {}
+        if not usage:
+            return
+        prompt_tokens = usage.get("prompt_tokens", 0)
+        completion_tokens = usage.get("completion_tokens", 0)
+        self.registry.increment("llm_prompt_tokens_total", prompt_tokens, node=node, model=model)
+        self.registry.increment(
+            "llm_completion_tokens_total", completion_tokens, node=node, model=model
+        )
+        if model in MODEL_PRICES:
+            prompt_price, completion_price = MODEL_PRICES[model]
+            cost = (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1e6
+            self.registry.increment("llm_cost_dollars_total", cost, node=node, model=model)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        _, _, node = self._end(run_id)
+        self.registry.increment("llm_errors_total", node=node)
+
+    def on_tool_start(
+        self,
+        serialized: dict[str, Any],
+        input_str: str,
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        **kwargs: Any,
+    ) -> None:
+        self._start(run_id, parent_run_id, serialized.get("name", ""))
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        seconds, tool, node = self._end(run_id)
+        self.registry.observe("tool_seconds", seconds, node=node, tool=tool)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        seconds, tool, node = self._end(run_id)
+        self.registry.observe("tool_seconds", seconds, node=node, tool=tool)
+        self.registry.increment("tool_errors_total", node=node, tool=tool)
+
+
+def metrics_callbacks() -> list[BaseCallbackHandler]:
+    """Callbacks to pass in a graph's run config, empty if metrics are disabled."""
+    return [MetricsCallbackHandler()] if METRICS_ENABLED else []
+
+
+def export_metrics(registry: MetricsRegistry = METRICS) -> None:
+    """Write the metrics to output/ and print the time spent in each node."""
+    if not METRICS_ENABLED:
+        return
+    registry.write_jsonl()
+    registry.write_prometheus()
+    for node, runs, seconds in registry.node_summary():
+        print(f"{node:>24}: {runs:3d} runs, {seconds:8.2f}s")
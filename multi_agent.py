@@ -1,17 +1,23 @@
+import asyncio
 import functools
 import operator
-from typing import Annotated, Sequence, TypedDict
+from typing import TYPE_CHECKING, Annotated, Callable, Sequence, TypedDict
 
 from colorama import Fore, Style
-from langchain.agents import AgentExecutor, create_openai_tools_agent
-from langchain.output_parsers.openai_functions import JsonOutputFunctionsParser
-from langchain_community.tools.tavily_search import TavilySearchResults
+from decouple import config
+from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.messages import BaseMessage, HumanMessage
+from langchain_core.output_parsers.openai_functions import JsonOutputFunctionsParser
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.language_models.chat_models import BaseChatModel
-from langchain_openai import ChatOpenAI
+from langchain_core.tools import BaseTool
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph import END, StateGraph
 
+from agents import create_agent
+from checkpointer import get_checkpointer, prepare_run, thread_id_argument
+from llm import get_llm
+from message_compaction import compact_messages, latest_outputs
+from metrics import export_metrics, metrics_callbacks
 from multi_agent_prompts import (
     TEAM_SUPERVISOR_SYSTEM_PROMPT,
     TRAVEL_AGENT_SYSTEM_PROMPT,
@@ -19,11 +25,15 @@ from multi_agent_prompts import (
     VISUALIZER_SYSTEM_PROMPT,
     DESIGNER_SYSTEM_PROMPT,
 )
+from multi_agent_router import pre_route
 from setup_environment import set_environment_variables
+from streaming import agent_config, stream_graph
 from tools import generate_image, markdown_to_pdf_file
+from tools.rate_limit import Priority, request_priority
 
+if TYPE_CHECKING:
+    from langchain.agents import AgentExecutor
 
-set_environment_variables("Multi_Agent_Team")
 
 TRAVEL_AGENT_NAME = "travel_agent"
 LANGUAGE_ASSISTANT_NAME = "language_assistant"
@@ -31,36 +41,48 @@ VISUALIZER_NAME = "visualizer"
 DESIGNER_NAME = "designer"
 
 TEAM_SUPERVISOR_NAME = "team_supervisor"
+PARALLEL_TEAM_NAME = "parallel_team"
 MEMBERS = [TRAVEL_AGENT_NAME, LANGUAGE_ASSISTANT_NAME, VISUALIZER_NAME]
 OPTIONS = ["FINISH"] + MEMBERS
 
-TAVILY_TOOL = TavilySearchResults()
-LLM = ChatOpenAI(model="gpt-3.5-turbo-0125")
-
-
-def create_agent(llm: BaseChatModel, tools: list, system_prompt: str):
-    prompt_template = ChatPromptTemplate.from_messages(
-        [
-            ("system", system_prompt),
-            MessagesPlaceholder(variable_name="messages"),
-            MessagesPlaceholder(variable_name="agent_scratchpad"),
-        ]
-    )
-    agent = create_openai_tools_agent(llm, tools, prompt_template)
-    agent_executor = AgentExecutor(agent=agent, tools=tools)  # type: ignore
-    return agent_executor
+# Let the supervisor dispatch several members at once, run concurrently with asyncio.
+PARALLEL_MEMBERS = config("MULTI_AGENT_PARALLEL", default=True, cast=bool)
+# Route obvious supervisor decisions with rules and only ask the LLM when ambiguous.
+PRE_ROUTER = config("MULTI_AGENT_PRE_ROUTER", default=True, cast=bool)
 
 
 class AgentState(TypedDict):
     messages: Annotated[Sequence[BaseMessage], operator.add]
     next: str
+    team_members: list[str]
+
+
+MessageView = Callable[[Sequence[BaseMessage]], list[BaseMessage]]
+
+
+def agent_node(state: AgentState, agent, name, view: MessageView = compact_messages):
+    result = agent.invoke({**state, "messages": view(state["messages"])}, agent_config(name))
+    return {"messages": [HumanMessage(content=result["output"], name=name)]}
 
 
-def agent_node(state: AgentState, agent, name):
-    result = agent.invoke(state)
+async def async_agent_node(
+    state: AgentState, agent, name, view: MessageView = compact_messages
+):
+    result = await agent.ainvoke(
+        {**state, "messages": view(state["messages"])}, agent_config(name)
+    )
     return {"messages": [HumanMessage(content=result["output"], name=name)]}
 
 
+async def team_node(state: AgentState, agents: dict):
+    """Run all members selected by the supervisor concurrently (fan-out) and merge
+    their messages in member order (fan-in)."""
+    results = await asyncio.gather(
+        *(async_agent_node(state, agents[name], name) for name in state["team_members"])
+    )
+    return {"messages": [message for result in results for message in result["messages"]]}
+
+
 router_function_def = {
     "name": "route",
     "description": "Select the next role.",
@@ -93,57 +115,241 @@ team_supervisor_prompt_template = ChatPromptTemplate.from_messages(
 ).partial(options=", ".join(OPTIONS), members=", ".join(MEMBERS))
 
 
-team_supervisor_chain = (
-    team_supervisor_prompt_template
-    | LLM.bind_functions(functions=[router_function_def], function_call="route")
-    | JsonOutputFunctionsParser()
-)
+def create_team_supervisor_chain(llm: BaseChatModel):
+    return (
+        team_supervisor_prompt_template
+        | llm.bind_functions(functions=[router_function_def], function_call="route")  # type: ignore
+        | JsonOutputFunctionsParser()
+    )
 
 
-travel_agent = create_agent(LLM, [TAVILY_TOOL], TRAVEL_AGENT_SYSTEM_PROMPT)
-travel_agent_node = functools.partial(
-    agent_node, agent=travel_agent, name=TRAVEL_AGENT_NAME
-)
+parallel_router_function_def = {
+    "name": "route",
+    "description": "Select the next role or roles. Members whose work does not depend on each other can be selected together and will work at the same time.",
+    "parameters": {
+        "title": "routeSchema",
+        "type": "object",
+        "properties": {
+            "next": {
+                "title": "next",
+                "type": "array",
+                "items": {"enum": OPTIONS},
+            }
+        },
+        "required": ["next"],
+    },
+}
 
-language_assistant = create_agent(LLM, [TAVILY_TOOL], LANGUAGE_ASSISTANT_SYSTEM_PROMPT)
-language_assistant_node = functools.partial(
-    agent_node, agent=language_assistant, name=LANGUAGE_ASSISTANT_NAME
-)
 
-visualizer = create_agent(LLM, [generate_image], VISUALIZER_SYSTEM_PROMPT)
-visualizer_node = functools.partial(agent_node, agent=visualizer, name=VISUALIZER_NAME)
+parallel_team_supervisor_prompt_template = ChatPromptTemplate.from_messages(
+    [
+        ("system", TEAM_SUPERVISOR_SYSTEM_PROMPT),
+        MessagesPlaceholder(variable_name="messages"),
+        (
+            "system",
+            "Given the conversation above, who should act next?"
+            " Select one or more of: {options}. Or should we FINISH?",
+        ),
+    ]
+).partial(options=", ".join(MEMBERS), members=", ".join(MEMBERS))
+
 
-designer = create_agent(LLM, [markdown_to_pdf_file], DESIGNER_SYSTEM_PROMPT)
-designer_node = functools.partial(agent_node, agent=designer, name=DESIGNER_NAME)
+def to_parallel_route(route: dict) -> dict:
+    selected = route["next"] if isinstance(route["next"], list) else [route["next"]]
+    team_members = [member for member in MEMBERS if member in selected]
+    if not team_members:
+        return {"next": "FINISH", "team_members": []}
+    return {"next": PARALLEL_TEAM_NAME, "team_members": team_members}
 
 
-workflow = StateGraph(AgentState)
-workflow.add_node(TRAVEL_AGENT_NAME, travel_agent_node)
-workflow.add_node(LANGUAGE_ASSISTANT_NAME, language_assistant_node)
-workflow.add_node(VISUALIZER_NAME, visualizer_node)
-workflow.add_node(DESIGNER_NAME, designer_node)
-workflow.add_node(TEAM_SUPERVISOR_NAME, team_supervisor_chain)
+def create_parallel_team_supervisor_chain(llm: BaseChatModel):
+    return (
+        parallel_team_supervisor_prompt_template
+        | llm.bind_functions(  # type: ignore
+            functions=[parallel_router_function_def], function_call="route"
+        )
+        | JsonOutputFunctionsParser()
+        | to_parallel_route
+    )
+
 
+def team_supervisor_node(state: AgentState, chain):
+    if PRE_ROUTER:
+        route = pre_route(state["messages"], MEMBERS, VISUALIZER_NAME)
+        if route is not None:
+            return {"next": route}
+    # Every member waits on the supervisor, so its calls go ahead of theirs.
+    with request_priority(Priority.SUPERVISOR):
+        return chain.invoke(
+            {**state, "messages": compact_messages(state["messages"])}
+        )
+
+
+async def parallel_team_supervisor_node(state: AgentState, chain):
+    if PRE_ROUTER:
+        # The team node adds one message per member it ran.
+        route = pre_route(
+            state["messages"],
+            MEMBERS,
+            VISUALIZER_NAME,
+            parallel=True,
+            turn_size=len(state.get("team_members") or []),
+        )
+        if route is not None:
+            return to_parallel_route({"next": route})
+    with request_priority(Priority.SUPERVISOR):
+        return await chain.ainvoke(
+            {**state, "messages": compact_messages(state["messages"])}
+        )
+
+
+def create_team(
+    llm: BaseChatModel, search_tool: BaseTool, image_tool: BaseTool, pdf_tool: BaseTool
+) -> dict[str, "AgentExecutor"]:
+    return {
+        TRAVEL_AGENT_NAME: create_agent(llm, [search_tool], TRAVEL_AGENT_SYSTEM_PROMPT),
+        LANGUAGE_ASSISTANT_NAME: create_agent(
+            llm, [search_tool], LANGUAGE_ASSISTANT_SYSTEM_PROMPT
+        ),
+        VISUALIZER_NAME: create_agent(llm, [image_tool], VISUALIZER_SYSTEM_PROMPT),
+        DESIGNER_NAME: create_agent(llm, [pdf_tool], DESIGNER_SYSTEM_PROMPT),
+    }
 
-for member in MEMBERS:
-    workflow.add_edge(member, TEAM_SUPERVISOR_NAME)
 
-workflow.add_edge(DESIGNER_NAME, END)
+# The designer needs every member's final work in full, but none of the earlier drafts.
+designer_view = functools.partial(latest_outputs, members=MEMBERS)
 
-conditional_map = {name: name for name in MEMBERS}
-conditional_map["FINISH"] = DESIGNER_NAME
-workflow.add_conditional_edges(
-    TEAM_SUPERVISOR_NAME, lambda state: state["next"], conditional_map
-)
 
-workflow.set_entry_point(TEAM_SUPERVISOR_NAME)
+def build_sequential_graph(llm: BaseChatModel, team: dict[str, "AgentExecutor"]):
+    workflow = StateGraph(AgentState)
+    for member in MEMBERS:
+        workflow.add_node(
+            member, functools.partial(agent_node, agent=team[member], name=member)
+        )
+    workflow.add_node(
+        DESIGNER_NAME,
+        functools.partial(
+            agent_node, agent=team[DESIGNER_NAME], name=DESIGNER_NAME, view=designer_view
+        ),
+    )
+    workflow.add_node(
+        TEAM_SUPERVISOR_NAME,
+        functools.partial(team_supervisor_node, chain=create_team_supervisor_chain(llm)),
+    )
 
-travel_agent_graph = workflow.compile()
+    for member in MEMBERS:
+        workflow.add_edge(member, TEAM_SUPERVISOR_NAME)
 
+    workflow.add_edge(DESIGNER_NAME, END)
+
+    conditional_map = {name: name for name in MEMBERS}
+    conditional_map["FINISH"] = DESIGNER_NAME
+    workflow.add_conditional_edges(
+        TEAM_SUPERVISOR_NAME, lambda state: state["next"], conditional_map
+    )
 
-for chunk in travel_agent_graph.stream(
-    {"messages": [HumanMessage(content="I want to go to Paris for three days")]}
+    workflow.set_entry_point(TEAM_SUPERVISOR_NAME)
+    return workflow
+
+
+def build_parallel_graph(llm: BaseChatModel, team: dict[str, "AgentExecutor"]):
+    workflow = StateGraph(AgentState)
+    workflow.add_node(
+        PARALLEL_TEAM_NAME,
+        functools.partial(team_node, agents={member: team[member] for member in MEMBERS}),
+    )
+    workflow.add_node(
+        DESIGNER_NAME,
+        functools.partial(
+            async_agent_node,
+            agent=team[DESIGNER_NAME],
+            name=DESIGNER_NAME,
+            view=designer_view,
+        ),
+    )
+    workflow.add_node(
+        TEAM_SUPERVISOR_NAME,
+        functools.partial(
+            parallel_team_supervisor_node,
+            chain=create_parallel_team_supervisor_chain(llm),
+        ),
+    )
+
+    workflow.add_edge(PARALLEL_TEAM_NAME, TEAM_SUPERVISOR_NAME)
+    workflow.add_edge(DESIGNER_NAME, END)
+
+    workflow.add_conditional_edges(
+        TEAM_SUPERVISOR_NAME,
+        lambda state: state["next"],
+        {PARALLEL_TEAM_NAME: PARALLEL_TEAM_NAME, "FINISH": DESIGNER_NAME},
+    )
+
+    workflow.set_entry_point(TEAM_SUPERVISOR_NAME)
+    return workflow
+
+
+def build_travel_agent_graph(
+    llm: BaseChatModel | None = None,
+    search_tool: BaseTool | None = None,
+    image_tool: BaseTool = generate_image,
+    pdf_tool: BaseTool = markdown_to_pdf_file,
+    parallel: bool = PARALLEL_MEMBERS,
+    checkpointer: BaseCheckpointSaver | None = None,
 ):
+    """Compile the travel agent graph, using the real model and tools by default."""
+    from tools.search import RateLimitedTavilySearchResults
+
+    llm = llm or get_llm()
+    search_tool = search_tool or RateLimitedTavilySearchResults()
+    team = create_team(llm, search_tool, image_tool, pdf_tool)
+    build_graph = build_parallel_graph if parallel else build_sequential_graph
+    return build_graph(llm, team).compile(checkpointer=checkpointer)
+
+
+@functools.lru_cache(maxsize=None)
+def get_travel_agent_graph():
+    """The travel agent graph with the real model and tools, built on first use."""
+    return build_travel_agent_graph(checkpointer=get_checkpointer())
+
+
+def print_chunk(chunk: dict) -> None:
     if "__end__" not in chunk:
         print(chunk)
         print(f"{Fore.GREEN}#############################{Style.RESET_ALL}")
+
+
+async def run_travel_agent_graph(
+    travel_agent_graph, input, thread_id: str | None = None
+):
+    input, run_config = prepare_run(travel_agent_graph, input, thread_id)
+    print(f"Thread ID: {run_config['configurable']['thread_id']}")
+    run_config["callbacks"] = metrics_callbacks()
+    async for event in stream_graph(travel_agent_graph, input, run_config):
+        # The members write at the same time, so only the designer's tokens are shown.
+        if event.kind == "token":
+            if event.name == DESIGNER_NAME:
+                print(event.data, end="", flush=True)
+            continue
+        print_chunk({event.name: event.data})
+    export_metrics()
+
+
+test_input = {"messages": [HumanMessage(content="I want to go to Paris for three days")]}
+
+if __name__ == "__main__":
+    set_environment_variables("Multi_Agent_Team")
+    travel_agent_graph = get_travel_agent_graph()
+
+    resume_thread_id = thread_id_argument()
+
+    if PARALLEL_MEMBERS:
+        asyncio.run(run_travel_agent_graph(travel_agent_graph, test_input, resume_thread_id))
+    else:
+        test_input, run_config = prepare_run(
+            travel_agent_graph, test_input, resume_thread_id
+        )
+        print(f"Thread ID: {run_config['configurable']['thread_id']}")
+        run_config["callbacks"] = metrics_callbacks()
+        for chunk in travel_agent_graph.stream(test_input, run_config):
+            print_chunk(chunk)
+        export_metrics()
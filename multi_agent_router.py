@@ -0,0 +1,60 @@
+import re
+from pathlib import Path
+from typing import Sequence
+
+from langchain_core.messages import BaseMessage
+
+
+FINISH = "FINISH"
+MIN_OUTPUT_CHARACTERS = 100
+IMAGE_PATH_PATTERN = re.compile(r"[^\s()\[\]<>'\"`]+\.png", re.IGNORECASE)
+
+
+def has_image_path(content: str) -> bool:
+    return any(Path(match).is_file() for match in IMAGE_PATH_PATTERN.findall(content))
+
+
+def is_valid_output(message: BaseMessage, image_member: str) -> bool:
+    content = str(message.content)
+    if message.name == image_member:
+        return has_image_path(content)
+    return len(content.strip()) >= MIN_OUTPUT_CHARACTERS
+
+
+def completed_members(
+    messages: Sequence[BaseMessage], members: list[str], image_member: str
+) -> set[str]:
+    """Members whose latest output in the conversation is valid."""
+    latest: dict[str, BaseMessage] = {}
+    for message in messages:
+        if message.name in members:
+            latest[message.name] = message  # type: ignore
+    return {
+        name for name, message in latest.items() if is_valid_output(message, image_member)
+    }
+
+
+def pre_route(
+    messages: Sequence[BaseMessage],
+    members: list[str],
+    image_member: str,
+    parallel: bool = False,
+    turn_size: int = 1,
+) -> str | list[str] | None:
+    """Pick the next member(s) without an LLM call when the answer is obvious.
+
+    Routes to FINISH once every member has produced a valid output, and otherwise to
+    the first member still missing one (or all of them when parallel). Returns None
+    when an output from the last turn, the last turn_size messages, was invalid,
+    leaving the redo decision to the LLM router.
+    """
+    last_turn = list(messages)[-turn_size:] if turn_size > 0 else []
+    for message in last_turn:
+        if message.name in members and not is_valid_output(message, image_member):
+            return None
+
+    completed = completed_members(messages, members, image_member)
+    pending = [member for member in members if member not in completed]
+    if not pending:
+        return [FINISH] if parallel else FINISH
+    return pending if parallel else pending[0]
@@ -0,0 +1,234 @@
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, NamedTuple
+
+from aiohttp import web
+from decouple import Csv, config
+from langchain_core.agents import AgentAction, AgentFinish
+from langchain_core.messages import BaseMessage, HumanMessage
+
+from checkpointer import prepare_run
+from metrics import METRICS, metrics_callbacks
+from setup_environment import set_environment_variables
+from streaming import stream_graph
+from tools.fetch import SESSION_POOL
+from tools.rate_limit import Priority, request_priority
+
+
+SERVER_HOST = config("SERVER_HOST", default="127.0.0.1")
+SERVER_PORT = config("SERVER_PORT", default=8080, cast=int)
+SERVER_GRAPHS = config("SERVER_GRAPHS", default="research,travel,weather", cast=Csv())
+# Graph runs executing at the same time, each one makes LLM and tool calls.
+SERVER_WORKERS = config("SERVER_WORKERS", default=4, cast=int)
+# Runs allowed to wait for a worker before new requests get a 429.
+SERVER_QUEUE_SIZE = config("SERVER_QUEUE_SIZE", default=16, cast=int)
+# Seconds a queued run waits for a worker before it gets a 503.
+SERVER_QUEUE_TIMEOUT = config("SERVER_QUEUE_TIMEOUT", default=30.0, cast=float)
+
+logger = logging.getLogger(__name__)
+
+
+class GraphEntry(NamedTuple):
+    graph: Any
+    make_input: Callable[[str], dict]
+
+
+def messages_input(text: str) -> dict:
+    return {"messages": [HumanMessage(content=text)]}
+
+
+def weather_input(text: str) -> dict:
+    return {"input": text, "chat_history": []}
+
+
+def load_graphs(names: list[str] = SERVER_GRAPHS) -> dict[str, GraphEntry]:
+    """Compile the named graphs once, with the real model and tools."""
+    graphs = {}
+    for name in names:
+        if name == "research":
+            from web_research import get_research_graph
+
+            graphs[name] = GraphEntry(get_research_graph(), messages_input)
+        elif name == "travel":
+            from multi_agent import get_travel_agent_graph
+
+            graphs[name] = GraphEntry(get_travel_agent_graph(), messages_input)
+        elif name == "weather":
+            from simple_langgraph import get_weather_app
+
+            graphs[name] = GraphEntry(get_weather_app(), weather_input)
+        else:
+            raise ValueError(f"Unknown graph: {name}")
+    return graphs
+
+
+class RunQueue:
+    """Admission control for graph runs.
+
+    At most `workers` runs execute at once and at most `queue_size` wait for a
+    worker. A request beyond that is rejected with a 429 right away, and a queued
+    run that gets no worker within `queue_timeout` seconds is rejected with a 503.
+    """
+
+    def __init__(
+        self,
+        workers: int = SERVER_WORKERS,
+        queue_size: int = SERVER_QUEUE_SIZE,
+        queue_timeout: float = SERVER_QUEUE_TIMEOUT,
+    ) -> None:
+        self.workers = workers
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.running = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(workers)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        if self.waiting >= self.queue_size + max(0, self.workers - self.running):
+            METRICS.increment("server_rejected_total", reason="queue_full")
+            raise web.HTTPTooManyRequests(
+                text="Too many queued runs, retry later.",
+                headers={"Retry-After": str(round(self.queue_timeout))},
+            )
+        self.waiting += 1
+        acquire = asyncio.ensure_future(self._semaphore.acquire())
+        acquired = False
+        try:
+            await asyncio.wait([acquire], timeout=self.queue_timeout)
+            acquired = acquire.done()
+        finally:
+            self.waiting -= 1
+            if not acquire.done():
+                # Semaphore.acquire hands the permit on if it is cancelled after a wake-up.
+                acquire.cancel()
+            elif not acquired and not acquire.cancelled():
+                # The request was cancelled just as a worker became free.
+                self._semaphore.release()
+        if not acquired:
+            METRICS.increment("server_rejected_total", reason="queue_timeout")
+            raise web.HTTPServiceUnavailable(
+                text="No worker became free in time, retry later.",
+                headers={"Retry-After": str(round(self.queue_timeout))},
+            )
+        self.running += 1
+        try:
+            yield
+        finally:
+            self.running -= 1
+            self._semaphore.release()
+
+
+def encode_event_value(value: Any) -> Any:
+    """JSON for the values json can't encode in a node output."""
+    if isinstance(value, BaseMessage):
+        return {"type": value.type, "name": value.name, "content": value.content}
+    if isinstance(value, AgentFinish):
+        return {"output": value.return_values.get("output")}
+    if isinstance(value, AgentAction):
+        return {"tool": value.tool, "tool_input": value.tool_input}
+    return str(value)
+
+
+def server_sent_event(event: str, data: Any) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, default=encode_event_value)}\n\n".encode()
+
+
+async def health(request: web.Request) -> web.Response:
+    run_queue: RunQueue = request.app["run_queue"]
+    return web.json_response(
+        {
+            "graphs": sorted(request.app["graphs"]),
+            "workers": run_queue.workers,
+            "running": run_queue.running,
+            "waiting": run_queue.waiting,
+        }
+    )
+
+
+async def metrics(request: web.Request) -> web.Response:
+    return web.Response(text=METRICS.to_prometheus(), content_type="text/plain")
+
+
+async def run_graph(request: web.Request) -> web.StreamResponse:
+    """Run a graph and stream agent tokens and node outputs as server-sent events.
+
+    The body is JSON with an "input" text, an optional "thread_id" and an optional
+    "priority", "interactive" (the default) or "batch". Passing the thread ID of an
+    unfinished run resumes it, as in the scripts, the ID of a finished one starts a
+    new thread, reported in the "thread" event. Batch runs wait behind interactive
+    ones for the shared API rate limits.
+    """
+    name = request.match_info["graph"]
+    if name not in request.app["graphs"]:
+        raise web.HTTPNotFound(text=f"Unknown graph: {name}")
+    try:
+        body = await request.json()
+    except json.JSONDecodeError:
+        raise web.HTTPBadRequest(text="The body must be JSON.")
+    if not isinstance(body, dict) or not isinstance(body.get("input"), str) or not body["input"]:
+        raise web.HTTPBadRequest(text='The body must have a non-empty "input" text.')
+    priority = body.get("priority", "interactive")
+    if priority not in ("interactive", "batch"):
+        raise web.HTTPBadRequest(text='The "priority" must be "interactive" or "batch".')
+    graph, make_input = request.app["graphs"][name]
+
+    async with request.app["run_queue"].slot():
+        # Looking the thread up reads the checkpoint database, keep it off the loop.
+        input, run_config = await asyncio.to_thread(
+            prepare_run, graph, make_input(body["input"]), body.get("thread_id")
+        )
+        run_config["callbacks"] = metrics_callbacks()
+        response = web.StreamResponse(
+            headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"}
+        )
+        await response.prepare(request)
+        await response.write(
+            server_sent_event("thread", {"thread_id": run_config["configurable"]["thread_id"]})
+        )
+        try:
+            with request_priority(Priority[priority.upper()]):
+                async for event in stream_graph(graph, input, run_config):
+                    if event.kind == "token":
+                        data = {"agent": event.name, "text": event.data}
+                    else:
+                        data = {"node": event.name, "output": event.data}
+                    await response.write(server_sent_event(event.kind, data))
+        except ConnectionResetError:
+            # The client went away, the checkpoints let it resume the run later.
+            raise
+        except Exception as error:
+            logger.exception("Run of the %s graph failed", name)
+            METRICS.increment("server_run_errors_total", graph=name)
+            await response.write(server_sent_event("error", {"error": str(error)}))
+        else:
+            await response.write(server_sent_event("end", {}))
+        await response.write_eof()
+        return response
+
+
+async def close_sessions(app: web.Application) -> None:
+    await SESSION_POOL.close()
+
+
+def create_app(
+    graphs: dict[str, GraphEntry] | None = None, run_queue: RunQueue | None = None
+) -> web.Application:
+    """The service, compiling the SERVER_GRAPHS if no graphs are given."""
+    app = web.Application()
+    app["graphs"] = graphs if graphs is not None else load_graphs()
+    app["run_queue"] = run_queue or RunQueue()
+    app.router.add_get("/health", health)
+    app.router.add_get("/metrics", metrics)
+    app.router.add_post("/runs/{graph}", run_graph)
+    app.on_cleanup.append(close_sessions)
+    return app
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    set_environment_variables("Graph_Server")
+    # curl -N -X POST localhost:8080/runs/research -d '{"input": "Jaws"}'
+    web.run_app(create_app(), host=SERVER_HOST, port=SERVER_PORT)
@@ -1,50 +1,53 @@
+import asyncio
+import functools
 import operator
 from typing import Annotated, TypedDict, Union
 
 from colorama import Fore, Style
-from langchain import hub
-from langchain.agents import create_openai_functions_agent
-from langchain_core.agents import AgentAction, AgentActionMessageLog, AgentFinish
+from langchain_core.agents import AgentAction, AgentFinish
+from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.messages import BaseMessage
+from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables.base import Runnable
-from langchain_openai.chat_models import ChatOpenAI
+from langchain_core.tools import BaseTool
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph import END, StateGraph
 from langgraph.prebuilt.tool_executor import ToolExecutor
 
+from agents import create_tools_agent
+from checkpointer import get_checkpointer, prepare_run, thread_id_argument
+from llm import get_llm, pull_prompt
+from metrics import export_metrics, metrics_callbacks
 from setup_environment import set_environment_variables
+from streaming import agent_config
 from tools import generate_image, get_weather
+from tools.fetch import SESSION_POOL
 
 
-set_environment_variables("LangGraph Basics")
-
-LLM = ChatOpenAI(model="gpt-3.5-turbo-0125", streaming=True)
 TOOLS = [get_weather, generate_image]
-PROMPT = hub.pull("hwchase17/openai-functions-agent")
+AGENT_PROMPT = "hwchase17/openai-functions-agent"
 
 
 class AgentState(TypedDict):
     input: str
     chat_history: list[BaseMessage]
-    agent_outcome: Union[AgentAction, AgentFinish, None]
+    agent_outcome: Union[list[AgentAction], AgentFinish, None]
     intermediate_steps: Annotated[list[tuple[AgentAction, str]], operator.add]
 
 
-runnable_agent: Runnable = create_openai_functions_agent(LLM, TOOLS, PROMPT)
-
-
-def agent_node(input: AgentState):
-    agent_outcome: AgentActionMessageLog = runnable_agent.invoke(input)
+async def agent_node(input: AgentState, agent: Runnable):
+    agent_outcome = await agent.ainvoke(input, agent_config("agent"))
     return {"agent_outcome": agent_outcome}
 
 
-tool_executor = ToolExecutor(TOOLS)
-
-
-def tool_executor_node(input: AgentState):
-    agent_action = input["agent_outcome"]
-    output = tool_executor.invoke(agent_action)
-    print(f"Executed {agent_action} with output: {output}")
-    return {"intermediate_steps": [(agent_action, output)]}
+async def tool_executor_node(input: AgentState, tool_executor: ToolExecutor):
+    """Execute all tool calls of the last model turn concurrently. Synchronous tools
+    run in the default thread pool executor."""
+    agent_actions = input["agent_outcome"]
+    outputs = await tool_executor.abatch(agent_actions)  # type: ignore
+    for agent_action, output in zip(agent_actions, outputs):  # type: ignore
+        print(f"Executed {agent_action} with output: {output}")
+    return {"intermediate_steps": list(zip(agent_actions, outputs))}  # type: ignore
 
 
 def continue_or_end_test(data: AgentState):
@@ -54,25 +57,51 @@ def continue_or_end_test(data: AgentState):
         return "continue"
 
 
-workflow = StateGraph(AgentState)
+def build_weather_app(
+    llm: BaseChatModel | None = None,
+    tools: list[BaseTool] | None = None,
+    prompt: ChatPromptTemplate | None = None,
+    checkpointer: BaseCheckpointSaver | None = None,
+):
+    """Compile the weather graph, using the real model, tools and prompt by default."""
+    llm = llm or get_llm(streaming=True)
+    tools = tools or TOOLS
+    prompt = prompt or pull_prompt(AGENT_PROMPT)
+    runnable_agent = create_tools_agent(llm, tools, prompt)
 
-workflow.add_node("agent", agent_node)
-workflow.add_node("tool_executor", tool_executor_node)
+    workflow = StateGraph(AgentState)
 
-workflow.set_entry_point("agent")
+    workflow.add_node("agent", functools.partial(agent_node, agent=runnable_agent))
+    workflow.add_node(
+        "tool_executor",
+        functools.partial(tool_executor_node, tool_executor=ToolExecutor(tools)),
+    )
 
-workflow.add_edge("tool_executor", "agent")
+    workflow.set_entry_point("agent")
 
-workflow.add_conditional_edges(
-    "agent", continue_or_end_test, {"continue": "tool_executor", "END": END}
-)
+    workflow.add_edge("tool_executor", "agent")
 
-weather_app = workflow.compile()
+    workflow.add_conditional_edges(
+        "agent", continue_or_end_test, {"continue": "tool_executor", "END": END}
+    )
 
+    return workflow.compile(checkpointer=checkpointer)
 
-def call_weather_app(query: str):
+
+@functools.lru_cache(maxsize=None)
+def get_weather_app():
+    """The weather graph with the real model, tools and prompt, built on first use."""
+    return build_weather_app(checkpointer=get_checkpointer())
+
+
+async def call_weather_app(weather_app, query: str, thread_id: str | None = None):
     inputs = {"input": query, "chat_history": []}
-    output = weather_app.invoke(inputs)
+    inputs, run_config = prepare_run(weather_app, inputs, thread_id)
+    print(f"Thread ID: {run_config['configurable']['thread_id']}")
+    run_config["callbacks"] = metrics_callbacks()
+    output = await weather_app.ainvoke(inputs, run_config)
+    await SESSION_POOL.close()
+    export_metrics()
     result = output.get("agent_outcome").return_values["output"]  # type: ignore
     steps = output.get("intermediate_steps")
 
@@ -82,8 +111,16 @@ def call_weather_app(query: str):
     return result
 
 
-# call_weather_app("What is the weather in New York?")
+if __name__ == "__main__":
+    set_environment_variables("LangGraph Basics")
+    weather_app = get_weather_app()
+
+    # asyncio.run(call_weather_app(weather_app, "What is the weather in New York?"))
 
-call_weather_app(
-    "Give me a visual image displaying the current weather in Seoul, South Korea."
-)
+    asyncio.run(
+        call_weather_app(
+            weather_app,
+            "Give me a visual image displaying the current weather in Seoul, South Korea.",
+            thread_id=thread_id_argument(),
+        )
+    )
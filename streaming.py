@@ -0,0 +1,131 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, NamedTuple, Optional
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from metrics import NODE_TAG_PREFIX
+
+
+# Agent calls tagged with this have their generated tokens surfaced by stream_graph.
+STREAM_TAG = "stream_tokens"
+# Tokens written to a file are batched for this many seconds, the first goes right away.
+FILE_FLUSH_INTERVAL = 0.1
+
+
+class GraphEvent(NamedTuple):
+    kind: str  # "token" or "node"
+    name: str  # The agent that generated the token, or the node that finished.
+    data: Any
+
+
+def agent_config(name: str) -> RunnableConfig:
+    """Config for an agent call whose tokens stream_graph should surface."""
+    return {"tags": [STREAM_TAG], "metadata": {"agent": name}}
+
+
+def token_text(event: dict) -> str:
+    content = event["data"]["chunk"].content
+    return content if isinstance(content, str) else ""
+
+
+async def ainvoke_streaming(
+    agent: Runnable, input: dict, name: str, on_token: Callable[[str], None]
+) -> dict:
+    """Like agent.ainvoke, also passing every generated text chunk to on_token."""
+    root_run_id, output, finished = None, None, False
+    async for event in agent.astream_events(
+        input,
+        agent_config(name),
+        version="v1",
+        include_types=["chat_model"],
+        include_names=[agent.get_name()],
+    ):
+        root_run_id = root_run_id or event["run_id"]
+        if event["event"] == "on_chat_model_stream" and (text := token_text(event)):
+            on_token(text)
+        elif event["event"] == "on_chain_end" and event["run_id"] == root_run_id:
+            output, finished = event["data"]["output"], True
+    if not finished:
+        raise RuntimeError(f"The {name} stream ended without the agent's output.")
+    return output  # type: ignore
+
+
+async def stream_graph(
+    graph: Any, input: Optional[dict], config: RunnableConfig
+) -> AsyncIterator[GraphEvent]:
+    """Run a graph, yielding agent tokens as they are generated and node outputs.
+
+    Tokens come from the calls made with agent_config, all other model output,
+    such as tool call arguments and supervisor routes, is left out.
+    """
+    nodes = [name for name in graph.nodes if not name.startswith("__") and ":" not in name]
+    # Every run that is not left out is copied into a log of patches, which costs
+    # more than the graph itself, so only the model and node runs are kept.
+    async for event in graph.astream_events(
+        input, config, version="v1", include_types=["chat_model"], include_names=nodes
+    ):
+        if event["event"] == "on_chat_model_stream" and STREAM_TAG in event["tags"]:
+            if text := token_text(event):
+                yield GraphEvent("token", event["metadata"]["agent"], text)
+        elif (
+            event["event"] == "on_chain_end"
+            and event["name"] in nodes
+            and any(tag.startswith(NODE_TAG_PREFIX) for tag in event["tags"])
+        ):
+            yield GraphEvent("node", event["name"], event["data"].get("output"))
+
+
+class IncrementalFileWriter:
+    """Writes text to a file as it arrives, without blocking the event loop.
+
+    Text is buffered and handed to a writer thread at most every flush_interval
+    seconds, which writes and flushes it for readers. Call aclose() when done.
+    """
+
+    def __init__(self, path: Path | str, flush_interval: float = FILE_FLUSH_INTERVAL) -> None:
+        self.path = path
+        self.flush_interval = flush_interval
+        self._buffer: list[str] = []
+        self._flushed_at = 0.0
+        self._file = None
+        self._error: Optional[BaseException] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="file_writer")
+
+    def write(self, text: str) -> None:
+        self._buffer.append(text)
+        if time.monotonic() - self._flushed_at >= self.flush_interval:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._buffer:
+            self._executor.submit(self._write_text, "".join(self._buffer))
+            self._buffer = []
+        self._flushed_at = time.monotonic()
+
+    def _write_text(self, text: str) -> None:
+        if self._error is not None:
+            return
+        try:
+            if self._file is None:
+                self._file = open(self.path, "w", encoding="utf-8")
+            self._file.write(text)
+            self._file.flush()
+        except OSError as error:
+            self._error = error
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    async def aclose(self) -> None:
+        """Write what is still buffered, close the file and raise any write error."""
+        self._flush()
+        # The single writer thread runs jobs in order, so this runs after every write.
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._close_file)
+        self._executor.shutdown(wait=False)
+        if self._error is not None:
+            raise self._error
@@ -0,0 +1,14 @@
+import os
+import sys
+from pathlib import Path
+
+
+# The modules read their keys and switches at import, so set them before any import.
+for name in ("OPENAI_API_KEY", "TAVILY_API_KEY", "WEATHER_API_KEY", "LANGCHAIN_API_KEY"):
+    os.environ.setdefault(name, "test")
+os.environ.setdefault("LANGCHAIN_TRACING_V2", "false")
+os.environ.setdefault("LLM_CACHE_ENABLED", "False")
+os.environ.setdefault("CHECKPOINTS_ENABLED", "False")
+os.environ.setdefault("WEB_CACHE_ENABLED", "False")
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -0,0 +1,77 @@
+import operator
+from typing import Annotated, TypedDict
+
+import pytest
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langgraph.graph import END, StateGraph
+
+from checkpointer import SQLiteCheckpointSaver, prepare_run
+
+
+class State(TypedDict):
+    messages: Annotated[list[BaseMessage], operator.add]
+
+
+def build_graph(tmp_path, calls: list, fail_once: list):
+    def draft(state: State) -> dict:
+        calls.append("draft")
+        return {"messages": [AIMessage(content="draft")]}
+
+    def review(state: State) -> dict:
+        calls.append("review")
+        if fail_once:
+            raise RuntimeError(fail_once.pop())
+        return {"messages": [AIMessage(content="review")]}
+
+    workflow = StateGraph(State)
+    workflow.add_node("draft", draft)
+    workflow.add_node("review", review)
+    workflow.add_edge("draft", "review")
+    workflow.add_edge("review", END)
+    workflow.set_entry_point("draft")
+    return workflow.compile(
+        checkpointer=SQLiteCheckpointSaver(path=str(tmp_path / "checkpoints.sqlite3"))
+    )
+
+
+def contents(state: dict) -> list[str]:
+    return [message.content for message in state["messages"]]
+
+
+def test_an_unfinished_thread_resumes_without_rerunning_nodes(tmp_path):
+    calls = []
+    graph = build_graph(tmp_path, calls, fail_once=["API down"])
+    input, config = prepare_run(graph, {"messages": [HumanMessage(content="Jaws")]})
+    with pytest.raises(RuntimeError):
+        graph.invoke(input, config)
+    thread_id = config["configurable"]["thread_id"]
+
+    input, config = prepare_run(graph, {"messages": [HumanMessage(content="Jaws")]}, thread_id)
+    state = graph.invoke(input, config)
+
+    assert input is None and config["configurable"]["thread_id"] == thread_id
+    assert calls == ["draft", "review", "review"]
+    assert contents(state) == ["Jaws", "draft", "review"]
+
+
+def test_a_finished_thread_starts_over_on_a_fresh_thread(tmp_path):
+    graph = build_graph(tmp_path, [], fail_once=[])
+    input, config = prepare_run(graph, {"messages": [HumanMessage(content="Jaws")]})
+    graph.invoke(input, config)
+    thread_id = config["configurable"]["thread_id"]
+
+    input, config = prepare_run(graph, {"messages": [HumanMessage(content="Alien")]}, thread_id)
+    state = graph.invoke(input, config)
+
+    assert config["configurable"]["thread_id"] != thread_id
+    assert contents(state) == ["Alien", "draft", "review"]
+    finished = graph.get_state({"configurable": {"thread_id": thread_id}})
+    assert contents(finished.values) == ["Jaws", "draft", "review"]
+
+
+def test_an_unknown_thread_id_is_used_as_given(tmp_path):
+    graph = build_graph(tmp_path, [], fail_once=[])
+
+    input, config = prepare_run(graph, {"messages": []}, "my-thread")
+
+    assert input == {"messages": []} and config["configurable"]["thread_id"] == "my-thread"
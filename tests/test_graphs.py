@@ -0,0 +1,32 @@
+import asyncio
+
+import pytest
+
+import tools.weather
+import web_research
+from benchmarks import graphs
+from benchmarks.stub_server import serve
+from tools.fetch import SESSION_POOL
+
+
+@pytest.mark.parametrize("name", graphs.GRAPHS)
+def test_every_graph_runs_offline_with_the_benchmark_fakes(name, monkeypatch, tmp_path):
+    monkeypatch.setattr(web_research, "OUTPUT_DIRECTORY", tmp_path)
+
+    async def main():
+        async with serve(graphs.stub_app(0.0)) as base_url:
+            monkeypatch.setattr(tools.weather, "WEATHER_API_URL", f"{base_url}/v1/current.json")
+            try:
+                graph, make_input, llm = graphs.build_graph(name, base_url, tmp_path, 0.0, 0.0)
+                output = await graph.ainvoke(make_input(), {"recursion_limit": 50})
+            finally:
+                await SESSION_POOL.close()
+        return output, llm
+
+    output, llm = asyncio.run(main())
+
+    assert output and llm.calls > 1
+    if name == "weather":
+        assert "Result:" in output["agent_outcome"].return_values["output"]
+    else:
+        assert output["messages"][-1].content
@@ -0,0 +1,94 @@
+import asyncio
+import base64
+from types import SimpleNamespace
+
+from aiohttp import web
+
+import tools.image
+from benchmarks.fakes import PNG_BYTES
+from benchmarks.stub_server import serve
+from tools.fetch import SESSION_POOL
+from tools.image_store import ImageStore
+from tools.rate_limit import RateLimiter
+
+
+class FakeImages:
+    def __init__(self, image_url: str | None = None) -> None:
+        self.image_url = image_url
+        self.prompts = []
+
+    def response(self, prompt: str, response_format: str, **kwargs):
+        self.prompts.append(prompt)
+        if response_format == "b64_json":
+            image = SimpleNamespace(b64_json=base64.b64encode(PNG_BYTES).decode(), url=None)
+        else:
+            image = SimpleNamespace(b64_json=None, url=self.image_url)
+        return SimpleNamespace(data=[image])
+
+
+class FakeClient:
+    def __init__(self, images: FakeImages) -> None:
+        self.images = SimpleNamespace(generate=images.response)
+
+
+class FakeAsyncClient:
+    def __init__(self, images: FakeImages) -> None:
+        async def generate(**kwargs):
+            await asyncio.sleep(0.05)
+            return images.response(**kwargs)
+
+        self.images = SimpleNamespace(generate=generate)
+
+
+def use_fakes(monkeypatch, tmp_path, images: FakeImages, response_format: str) -> None:
+    monkeypatch.setattr(tools.image, "IMAGE_DIRECTORY", tmp_path)
+    monkeypatch.setattr(tools.image, "IMAGE_STORE", ImageStore(tmp_path))
+    monkeypatch.setattr(tools.image, "IMAGE_RESPONSE_FORMAT", response_format)
+    monkeypatch.setattr(tools.image, "get_rate_limiter", lambda *args: RateLimiter(0))
+    monkeypatch.setattr(tools.image, "get_client", lambda: FakeClient(images))
+    monkeypatch.setattr(tools.image, "get_async_client", lambda: FakeAsyncClient(images))
+
+
+def test_b64_images_are_saved_and_coalesced(monkeypatch, tmp_path):
+    images = FakeImages()
+    use_fakes(monkeypatch, tmp_path, images, "b64_json")
+
+    paths = asyncio.run(
+        tools.image.generate_images(["Sharks eating pizza.", "sharks  eating pizza", "A cat."])
+    )
+    sync_path = tools.image.generate_image.run("A dog.")
+
+    assert paths[0] == paths[1] != paths[2]
+    assert images.prompts == ["Sharks eating pizza.", "A cat.", "A dog."]
+    for path in paths + [sync_path]:
+        assert open(path, "rb").read() == PNG_BYTES
+    assert not list(tmp_path.glob("*.part"))
+
+
+def test_url_images_are_downloaded_from_the_server(monkeypatch, tmp_path):
+    downloads = []
+
+    async def image(request: web.Request) -> web.Response:
+        downloads.append(request.path)
+        return web.Response(body=PNG_BYTES, content_type="image/png")
+
+    async def main() -> list[str]:
+        app = web.Application()
+        app.router.add_get("/image.png", image)
+        async with serve(app) as base_url:
+            use_fakes(monkeypatch, tmp_path, FakeImages(f"{base_url}/image.png"), "url")
+            try:
+                return [
+                    await tools.image.generate_image.ainvoke({"image_description": "A cat."}),
+                    await asyncio.to_thread(tools.image.generate_image.run, "A dog."),
+                    await tools.image.async_image_downloader(f"{base_url}/missing"),
+                ]
+            finally:
+                await SESSION_POOL.close()
+
+    cat_path, dog_path, missing = asyncio.run(main())
+
+    assert open(cat_path, "rb").read() == PNG_BYTES
+    assert open(dog_path, "rb").read() == PNG_BYTES
+    assert missing == "Could not download image from URL."
+    assert downloads == ["/image.png", "/image.png"]
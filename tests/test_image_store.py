@@ -0,0 +1,103 @@
+import asyncio
+import threading
+
+from tools.image_store import ImageStore
+
+
+async def create_after(delay: float, path, calls: list) -> str:
+    calls.append(path)
+    await asyncio.sleep(delay)
+    path.write_bytes(b"png")
+    return str(path)
+
+
+def test_identical_requests_are_coalesced(tmp_path):
+    store = ImageStore(tmp_path)
+    calls = []
+
+    async def main():
+        return await asyncio.gather(
+            *(
+                store.aget_or_create("a", lambda path: create_after(0.05, path, calls))
+                for _ in range(3)
+            )
+        )
+
+    paths = asyncio.run(main())
+
+    assert len(set(paths)) == 1 and len(calls) == 1
+    assert (store.misses, store.coalesced) == (1, 2)
+
+
+def test_an_image_stored_after_get_is_not_created_again(tmp_path):
+    store = ImageStore(tmp_path)
+    store.path_for("a").write_bytes(b"png")
+
+    future, owner = store._claim("a")
+
+    assert not owner and future.result() == str(store.path_for("a"))
+    assert not store._in_flight
+
+
+def test_a_waiter_takes_over_when_the_owner_is_cancelled(tmp_path):
+    store = ImageStore(tmp_path)
+    calls = []
+
+    async def main():
+        owner = asyncio.create_task(
+            store.aget_or_create("a", lambda path: create_after(10, path, calls))
+        )
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(
+            store.aget_or_create("a", lambda path: create_after(0.01, path, calls))
+        )
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        await asyncio.gather(owner, return_exceptions=True)
+        return owner.cancelled(), await waiter
+
+    owner_cancelled, path = asyncio.run(main())
+
+    assert owner_cancelled
+    assert path == str(store.path_for("a")) and len(calls) == 2
+
+
+def test_a_cancelled_waiter_leaves_the_owner_alone(tmp_path):
+    store = ImageStore(tmp_path)
+    calls = []
+
+    async def main():
+        owner = asyncio.create_task(
+            store.aget_or_create("a", lambda path: create_after(0.05, path, calls))
+        )
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(
+            store.aget_or_create("a", lambda path: create_after(0.05, path, calls))
+        )
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        return await owner
+
+    assert asyncio.run(main()) == str(store.path_for("a"))
+    assert len(calls) == 1
+
+
+def test_eviction_runs_off_the_event_loop(tmp_path, monkeypatch):
+    store = ImageStore(tmp_path, max_bytes=4)
+    threads = []
+    evict = store.evict
+
+    def recording_evict(keep=None):
+        threads.append(threading.current_thread())
+        evict(keep)
+
+    monkeypatch.setattr(store, "evict", recording_evict)
+
+    async def main():
+        for key in ("a", "b"):
+            await store.aget_or_create(key, lambda path: create_after(0, path, []))
+
+    asyncio.run(main())
+
+    assert threads and threading.main_thread() not in threads
+    assert not store.path_for("a").exists() and store.path_for("b").exists()
@@ -0,0 +1,108 @@
+import asyncio
+import json
+import os
+
+import httpx
+import pytest
+from openai import RateLimitError
+
+import langchain_basics
+
+# The script turns tracing on when imported, keep the other tests offline.
+os.environ["LANGCHAIN_TRACING_V2"] = "false"
+
+
+def rate_limit_error() -> RateLimitError:
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(429, request=request)
+    return RateLimitError("Rate limit reached", response=response, body=None)
+
+
+class FakeChain:
+    def __init__(self, answer, latency: float = 0.01, fail_words=(), rate_limited: int = 0):
+        self.answer = answer
+        self.latency = latency
+        self.fail_words = set(fail_words)
+        self.rate_limited = rate_limited
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+
+    async def ainvoke(self, input: dict) -> str:
+        self.calls += 1
+        if self.rate_limited:
+            self.rate_limited -= 1
+            raise rate_limit_error()
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.active -= 1
+        if input.get("word") in self.fail_words:
+            raise ValueError(f"no answer for {input['word']}")
+        return self.answer(input)
+
+
+@pytest.fixture
+def chains(monkeypatch):
+    draft = FakeChain(lambda input: f"draft of {input['word']}", fail_words={"bad"})
+    review = FakeChain(lambda input: f"review of {input['initial_answer']}")
+    monkeypatch.setattr(langchain_basics, "french_german_chain", draft)
+    monkeypatch.setattr(langchain_basics, "check_answer_chain", review)
+    return draft, review
+
+
+def read_lines(path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_run_batch_writes_one_line_per_word_within_the_concurrency(chains, tmp_path):
+    draft, review = chains
+    words = [f"word{index}" for index in range(20)] + ["bad"]
+    output_path = tmp_path / "results.jsonl"
+
+    written = asyncio.run(langchain_basics.run_batch(iter(words), output_path, concurrency=4))
+
+    lines = read_lines(output_path)
+    assert written == len(lines) == len(words)
+    assert sorted(line["word"] for line in lines) == sorted(words)
+    for line in lines:
+        if line["word"] == "bad":
+            assert "no answer for bad" in line["error"]
+        else:
+            assert line["initial_answer"] == f"draft of {line['word']}"
+            assert line["answer"] == f"review of draft of {line['word']}"
+    assert 1 < draft.max_active <= 4
+    assert 1 < review.max_active <= 4
+
+
+def test_run_batch_fails_instead_of_hanging_when_results_cannot_be_written(chains, tmp_path):
+    words = [f"word{index}" for index in range(200)]
+
+    async def run(output_path):
+        return await asyncio.wait_for(
+            langchain_basics.run_batch(iter(words), output_path, concurrency=2), timeout=10
+        )
+
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(run(tmp_path / "missing" / "results.jsonl"))
+    assert chains[0].calls == 0
+
+    if os.path.exists("/dev/full"):
+        with pytest.raises(OSError):
+            asyncio.run(run("/dev/full"))
+
+
+def test_backoff_retries_rate_limit_errors():
+    chain = FakeChain(lambda input: "answer", latency=0.0, rate_limited=2)
+    backoff = langchain_basics.RateLimitBackoff(base_delay=0.01, max_delay=0.05)
+
+    assert asyncio.run(backoff.call(chain, {"word": "cat"})) == "answer"
+    assert chain.calls == 3
+    assert backoff.consecutive_errors == 0
+
+    chain = FakeChain(lambda input: "answer", rate_limited=langchain_basics.MAX_RETRIES)
+    with pytest.raises(RateLimitError):
+        asyncio.run(backoff.call(chain, {"word": "cat"}))
+    assert chain.calls == langchain_basics.MAX_RETRIES
@@ -0,0 +1,91 @@
+import asyncio
+
+from langchain_core.messages import HumanMessage
+
+from agents import create_agent
+from benchmarks.fakes import FakeChatModel, fake_search_tool
+from llm import SQLiteLLMCache
+
+
+VOCABULARY = ["plan", "three", "days", "in", "paris", "weather", "seoul", "today"]
+
+
+def word_counts(text: str) -> list[float]:
+    return [float(text.lower().count(word)) for word in VOCABULARY]
+
+
+def cached_model(cache: SQLiteLLMCache) -> FakeChatModel:
+    return FakeChatModel(latency=0.0, cache=cache)
+
+
+def test_a_repeated_prompt_calls_the_model_once(tmp_path):
+    cache = SQLiteLLMCache(tmp_path / "cache.sqlite3")
+    model = cached_model(cache)
+
+    first = model.invoke("Plan three days in Paris.")
+    second = model.invoke("Plan  three   days in Paris.")
+
+    assert model.calls == 1
+    assert second.content == first.content
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_a_similar_prompt_is_a_semantic_hit(tmp_path):
+    cache = SQLiteLLMCache(
+        tmp_path / "cache.sqlite3", embedder=word_counts, similarity_threshold=0.95
+    )
+    model = cached_model(cache)
+
+    model.invoke("Plan three days in Paris.")
+    model.invoke("Plan three days in Paris!")
+    assert model.calls == 1
+
+    model.invoke("What is the weather like in Seoul today?")
+    assert model.calls == 2
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = SQLiteLLMCache(tmp_path / "cache.sqlite3", ttl=0)
+    model = cached_model(cache)
+
+    model.invoke("Plan three days in Paris.")
+    model.invoke("Plan three days in Paris.")
+
+    assert model.calls == 2
+    assert cache.hits == 0
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = SQLiteLLMCache(tmp_path / "cache.sqlite3", max_entries=2)
+    model = cached_model(cache)
+
+    for city in ("Paris", "Seoul", "Paris", "Lima"):
+        model.invoke(f"Plan three days in {city}.")
+    assert model.calls == 3
+    assert cache.evictions == 1
+
+    model.invoke("Plan three days in Paris.")  # Kept, it was used after Seoul.
+    assert model.calls == 3
+    model.invoke("Plan three days in Seoul.")
+    assert model.calls == 4
+
+
+def test_agent_calls_go_through_the_cache(tmp_path):
+    cache = SQLiteLLMCache(tmp_path / "cache.sqlite3")
+    model = FakeChatModel(
+        latency=0.0,
+        cache=cache,
+        tool_arguments={"tavily_search_results_json": lambda: {"query": "Paris"}},
+    )
+    search_tool = fake_search_tool(lambda: ["https://paris.example"], 0.0)
+    agent = create_agent(model, [search_tool], "Plan trips.")
+    input = {"messages": [HumanMessage(content="Plan three days in Paris.")]}
+
+    first = asyncio.run(agent.ainvoke(input))
+    calls = model.calls
+    second = asyncio.run(agent.ainvoke(input))
+
+    assert calls == 2  # A tool call, then the answer.
+    assert model.calls == calls
+    assert second["output"] == first["output"]
+    assert (cache.hits, cache.misses) == (2, 2)
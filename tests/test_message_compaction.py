@@ -0,0 +1,83 @@
+from langchain_core.messages import HumanMessage
+
+from message_compaction import (
+    EXCERPT_CHARACTERS,
+    compact_messages,
+    elide,
+    latest_outputs,
+    message_tokens,
+)
+
+
+def words(characters: int, word: str = "word") -> str:
+    return " ".join([word] * (characters // (len(word) + 1) + 1))[:characters]
+
+
+def message(content: str, name: str | None = None) -> HumanMessage:
+    return HumanMessage(content=content, name=name)
+
+
+def test_elide_fits_the_excerpt_and_note_in_the_limit():
+    content = words(2000) + " https://example.com/a.pdf " + words(500)
+
+    elided = elide(message(content), 3, 500)
+
+    assert len(elided.content) <= 500
+    assert elided.content.startswith("word word")
+    assert "characters of message 3 elided" in elided.content
+    assert "references: https://example.com/a.pdf" in elided.content
+    short = message("short")
+    assert elide(short, 3, 500) is short
+
+
+def test_latest_outputs_keeps_the_request_and_each_members_latest_output():
+    messages = [
+        message("Paris"),
+        message("draft", "travel_agent"),
+        message("phrases", "language_assistant"),
+        message("final", "travel_agent"),
+        message("summary", "designer"),
+    ]
+
+    view = latest_outputs(messages, ["travel_agent", "language_assistant"])
+
+    assert [m.content for m in view] == ["Paris", "final", "phrases"]
+
+
+def test_compact_messages_drops_superseded_outputs_and_excerpts_old_ones():
+    messages = [
+        message("Plan three days in Paris."),
+        message(words(5000), "travel_agent"),
+        message(words(5000), "language_assistant"),
+        message(words(5000), "travel_agent"),
+        message("recent 1", "visualizer"),
+        message("recent 2", "designer"),
+    ]
+
+    view = compact_messages(messages, keep_last=2)
+
+    assert view[0] == messages[0]
+    assert view[1].content == "[Earlier output of travel_agent elided, see their latest output.]"
+    assert len(view[2].content) <= EXCERPT_CHARACTERS
+    assert len(view[3].content) <= EXCERPT_CHARACTERS
+    assert view[4:] == messages[4:]
+
+
+def test_compact_messages_stays_under_the_token_ceiling():
+    members = ["a", "b", "c", "d", "e", "f"]
+    messages = [message("Plan three days in Paris.")]
+    messages += [message(words(15_000), member) for member in members]
+
+    view = compact_messages(messages, keep_last=4, max_tokens=6000)
+
+    assert message_tokens(view) <= 6000
+
+
+def test_compact_messages_shortens_a_huge_request_last():
+    messages = [message(words(100_000)), message("answer", "travel_agent")]
+
+    view = compact_messages(messages, keep_last=4, max_tokens=6000)
+
+    assert message_tokens(view) <= 6000
+    assert view[1] == messages[1]
+    assert "characters of message 0 elided" in view[0].content
@@ -0,0 +1,51 @@
+import asyncio
+import threading
+
+from langchain_core.messages import HumanMessage
+
+from agents import create_agent
+from benchmarks.fakes import FakeChatModel, fake_search_tool
+from metrics import MetricsCallbackHandler, MetricsRegistry
+
+
+class ThreadRecordingHandler(MetricsCallbackHandler):
+    def __init__(self, registry: MetricsRegistry) -> None:
+        super().__init__(registry)
+        self.threads: set[str] = set()
+
+    def on_chat_model_start(self, *args, **kwargs) -> None:
+        self.threads.add(threading.current_thread().name)
+        super().on_chat_model_start(*args, **kwargs)
+
+    def on_tool_start(self, *args, **kwargs) -> None:
+        self.threads.add(threading.current_thread().name)
+        super().on_tool_start(*args, **kwargs)
+
+
+def test_async_runs_record_llm_and_tool_metrics_on_the_event_loop():
+    llm = FakeChatModel(
+        latency=0.0, tool_arguments={"tavily_search_results_json": lambda: {"query": "Paris"}}
+    )
+    agent = create_agent(llm, [fake_search_tool(lambda: [], 0.0)], "Plan.")
+    registry = MetricsRegistry()
+    handler = ThreadRecordingHandler(registry)
+    input = {"messages": [HumanMessage(content="Paris")]}
+
+    async def main():
+        await asyncio.gather(
+            *(agent.ainvoke(input, {"callbacks": [handler]}) for _ in range(3))
+        )
+
+    asyncio.run(main())
+
+    assert handler.threads == {threading.main_thread().name}
+    assert not handler._starts and not handler._nodes
+    llm_calls = [
+        value for (name, _), value in registry.counters.items() if name == "llm_calls_total"
+    ]
+    tool_calls = [
+        histogram.count
+        for (name, _), histogram in registry.histograms.items()
+        if name == "tool_seconds"
+    ]
+    assert sum(llm_calls) == 6 and sum(tool_calls) == 3
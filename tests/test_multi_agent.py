@@ -0,0 +1,128 @@
+import asyncio
+import time
+
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableLambda
+
+import multi_agent
+from agents import create_agent
+from benchmarks.fakes import FakeChatModel, fake_image_tool, fake_pdf_tool, fake_search_tool
+
+
+LLM_LATENCY = 0.2
+MEMBER_TOOL_LATENCY = {
+    multi_agent.TRAVEL_AGENT_NAME: 0.1,
+    multi_agent.LANGUAGE_ASSISTANT_NAME: 0.1,
+    multi_agent.VISUALIZER_NAME: 0.4,
+}
+
+
+def create_team(tmp_path) -> dict:
+    llm = FakeChatModel(
+        latency=LLM_LATENCY,
+        members=multi_agent.MEMBERS,
+        tool_arguments={
+            "tavily_search_results_json": lambda: {"query": "Paris"},
+            "generate_image": lambda: {"image_description": "Paris"},
+            "markdown_to_pdf_file": lambda: {"markdown_text": "# Paris"},
+        },
+    )
+    team = {
+        name: create_agent(
+            llm, [fake_search_tool(lambda: ["https://paris.example"], latency)], name
+        )
+        for name, latency in MEMBER_TOOL_LATENCY.items()
+    }
+    team[multi_agent.VISUALIZER_NAME] = create_agent(
+        llm,
+        [fake_image_tool(tmp_path, MEMBER_TOOL_LATENCY[multi_agent.VISUALIZER_NAME])],
+        multi_agent.VISUALIZER_NAME,
+    )
+    team[multi_agent.DESIGNER_NAME] = create_agent(
+        llm, [fake_pdf_tool(tmp_path, 0.0)], multi_agent.DESIGNER_NAME
+    )
+    return team
+
+
+def test_team_node_takes_the_slowest_member_time_not_the_sum(tmp_path):
+    team = create_team(tmp_path)
+    state = {
+        "messages": [HumanMessage(content="Plan three days in Paris.")],
+        "next": multi_agent.PARALLEL_TEAM_NAME,
+        "team_members": multi_agent.MEMBERS,
+    }
+
+    async def timed(coroutine) -> tuple[float, dict]:
+        start_time = time.perf_counter()
+        result = await coroutine
+        return time.perf_counter() - start_time, result
+
+    async def main():
+        alone = [
+            (await timed(multi_agent.async_agent_node(state, team[name], name)))[0]
+            for name in multi_agent.MEMBERS
+        ]
+        together, result = await timed(multi_agent.team_node(state, team))
+        return alone, together, result
+
+    alone, together, result = asyncio.run(main())
+
+    assert together < max(alone) * 1.3
+    assert together < sum(alone) * 0.6
+    assert [message.name for message in result["messages"]] == multi_agent.MEMBERS
+
+
+def test_parallel_graph_keeps_every_selected_member_message(tmp_path):
+    team = create_team(tmp_path)
+    llm = FakeChatModel(latency=0.0, members=multi_agent.MEMBERS)
+    graph = multi_agent.build_parallel_graph(llm, team).compile()
+
+    state = asyncio.run(
+        graph.ainvoke({"messages": [HumanMessage(content="Plan three days in Paris.")]})
+    )
+
+    names = [message.name for message in state["messages"]]
+    assert names.count(multi_agent.DESIGNER_NAME) == 1
+    for member in multi_agent.MEMBERS:
+        assert names.count(member) == 1
+
+
+def test_the_supervisor_asks_the_llm_only_after_an_invalid_output():
+    calls = []
+
+    def llm_route(input: dict) -> dict:
+        calls.append(input)
+        return {"next": multi_agent.TRAVEL_AGENT_NAME}
+
+    chain = RunnableLambda(llm_route)
+    valid = "x" * 200
+    state = {
+        "messages": [
+            HumanMessage(content="Plan three days in Paris."),
+            HumanMessage(content=valid, name=multi_agent.TRAVEL_AGENT_NAME),
+            HumanMessage(content="short", name=multi_agent.LANGUAGE_ASSISTANT_NAME),
+        ],
+        "next": multi_agent.LANGUAGE_ASSISTANT_NAME,
+        "team_members": [],
+    }
+
+    assert multi_agent.team_supervisor_node(state, chain) == {
+        "next": multi_agent.TRAVEL_AGENT_NAME
+    }
+    assert len(calls) == 1
+
+    state["messages"].append(
+        HumanMessage(content=valid, name=multi_agent.LANGUAGE_ASSISTANT_NAME)
+    )
+    route = multi_agent.team_supervisor_node(state, chain)
+
+    assert route == {"next": multi_agent.VISUALIZER_NAME}
+    assert len(calls) == 1
+
+    parallel_state = {
+        **state,
+        "messages": state["messages"][:3],
+        "team_members": [multi_agent.LANGUAGE_ASSISTANT_NAME],
+    }
+    asyncio.run(multi_agent.parallel_team_supervisor_node(parallel_state, chain))
+    assert len(calls) == 2
@@ -0,0 +1,85 @@
+from langchain_core.messages import HumanMessage
+
+from multi_agent_router import (
+    FINISH,
+    MIN_OUTPUT_CHARACTERS,
+    completed_members,
+    is_valid_output,
+    pre_route,
+)
+
+
+MEMBERS = ["travel_agent", "language_assistant", "visualizer"]
+IMAGE_MEMBER = "visualizer"
+VALID = "x" * MIN_OUTPUT_CHARACTERS
+
+
+def message(name: str | None, content: str) -> HumanMessage:
+    return HumanMessage(content=content, name=name)
+
+
+def test_is_valid_output_needs_enough_text_or_an_existing_image(tmp_path):
+    image = tmp_path / "paris.png"
+    image.write_bytes(b"png")
+
+    assert is_valid_output(message("travel_agent", VALID), IMAGE_MEMBER)
+    assert not is_valid_output(message("travel_agent", "short"), IMAGE_MEMBER)
+    assert is_valid_output(message(IMAGE_MEMBER, f"Saved to ({image})."), IMAGE_MEMBER)
+    assert not is_valid_output(message(IMAGE_MEMBER, f"{tmp_path}/missing.png"), IMAGE_MEMBER)
+    assert not is_valid_output(message(IMAGE_MEMBER, VALID), IMAGE_MEMBER)
+
+
+def test_completed_members_judges_each_member_by_its_latest_output():
+    messages = [
+        message(None, "Paris"),
+        message("travel_agent", "short"),
+        message("travel_agent", VALID),
+        message("language_assistant", VALID),
+        message("language_assistant", "short"),
+    ]
+
+    assert completed_members(messages, MEMBERS, IMAGE_MEMBER) == {"travel_agent"}
+
+
+def test_pre_route_sends_the_first_pending_member_then_finishes(tmp_path):
+    image = tmp_path / "paris.png"
+    image.write_bytes(b"png")
+    messages = [message(None, "Paris")]
+
+    assert pre_route(messages, MEMBERS, IMAGE_MEMBER) == "travel_agent"
+    messages.append(message("travel_agent", VALID))
+    assert pre_route(messages, MEMBERS, IMAGE_MEMBER) == "language_assistant"
+    messages += [message("language_assistant", VALID), message(IMAGE_MEMBER, str(image))]
+    assert pre_route(messages, MEMBERS, IMAGE_MEMBER) == FINISH
+
+
+def test_pre_route_leaves_an_invalid_last_output_to_the_llm():
+    messages = [message(None, "Paris"), message("travel_agent", "short")]
+
+    assert pre_route(messages, MEMBERS, IMAGE_MEMBER) is None
+
+
+def test_pre_route_only_checks_the_last_turn():
+    messages = [
+        message(None, "Paris"),
+        message("travel_agent", VALID),
+        message("language_assistant", "short"),
+        message("language_assistant", VALID),
+    ]
+
+    assert pre_route(messages, MEMBERS, IMAGE_MEMBER) == IMAGE_MEMBER
+
+
+def test_pre_route_checks_every_message_of_a_parallel_turn():
+    first_turn = [
+        message(None, "Paris"),
+        message("travel_agent", "short"),
+        message("language_assistant", VALID),
+        message(IMAGE_MEMBER, "no image"),
+    ]
+
+    assert pre_route(first_turn, MEMBERS, IMAGE_MEMBER, parallel=True, turn_size=3) is None
+
+    redo = first_turn + [message("travel_agent", VALID)]
+    assert pre_route(redo, MEMBERS, IMAGE_MEMBER, parallel=True, turn_size=1) == [IMAGE_MEMBER]
+    assert pre_route([message(None, "Paris")], MEMBERS, IMAGE_MEMBER, True, 0) == MEMBERS
@@ -0,0 +1,34 @@
+from tools.packing import estimate_tokens, pack_results
+
+
+def page(url: str, topic: str, sentences: int = 40) -> dict:
+    text = " ".join(f"Sentence {index} is about {topic}." for index in range(sentences))
+    return {"url": url, "content": text}
+
+
+def test_pages_that_do_not_fit_are_reported_as_omitted():
+    results = [
+        page("https://a", "sharks"),
+        page("https://b", "boats"),
+        {"url": "https://c", "error": "Timed out."},
+    ]
+
+    packed = pack_results(results, "sharks", token_budget=300)
+
+    assert [entry["url"] for entry in packed] == ["https://a", "https://b", "https://c"]
+    assert "sharks" in packed[0]["content"]
+    assert packed[1] == {"url": "https://b", "error": "omitted: token budget"}
+    assert packed[2] == results[2]
+    assert sum(estimate_tokens(str(entry)) for entry in packed) <= 300
+
+
+def test_results_without_content_are_still_packed():
+    results = [{"url": "https://a", "content": ""}, {"url": "https://b", "error": "Timed out."}]
+
+    assert pack_results(results, "sharks", token_budget=100) == results
+
+
+def test_everything_fits_in_a_large_budget():
+    results = [page("https://a", "sharks", 3), page("https://b", "boats", 3)]
+
+    assert pack_results(results, "sharks", token_budget=10_000) == results
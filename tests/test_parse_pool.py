@@ -0,0 +1,45 @@
+import asyncio
+import threading
+
+from tools.parse_pool import PARSE_EXECUTOR, ParsePool
+
+
+class RecordingParser:
+    def __init__(self) -> None:
+        self.chunks: list[tuple[str, bool]] = []
+
+    def feed(self, content: str) -> None:
+        self.chunks.append((content, threading.current_thread() is threading.main_thread()))
+
+
+def test_streamed_pages_are_parsed_in_threads_by_default():
+    assert PARSE_EXECUTOR == "thread"
+
+
+def test_feed_goes_inline_by_page_size_not_chunk_size():
+    pool = ParsePool(kind="thread", inline_max_characters=1000)
+    parser = RecordingParser()
+
+    async def main():
+        await pool.feed(parser, "small page")
+        await pool.feed(parser, "small chunk of a big page", page_characters=5000)
+        await pool.feed(parser, "", page_characters=5000)
+
+    asyncio.run(main())
+    pool.shutdown()
+
+    assert parser.chunks == [("small page", True), ("small chunk of a big page", False)]
+
+
+def test_process_pools_feed_in_threads_and_run_in_processes():
+    pool = ParsePool(kind="process", max_workers=1, inline_max_characters=0)
+    parser = RecordingParser()
+
+    async def main():
+        await pool.feed(parser, "chunk")
+        return await pool.run(str.upper, "page")
+
+    assert asyncio.run(main()) == "PAGE"
+    assert parser.chunks == [("chunk", False)]
+    assert pool._feed_executor is not None and pool._executor is not None
+    pool.shutdown()
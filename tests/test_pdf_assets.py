@@ -0,0 +1,41 @@
+import tools.pdf_assets
+from tools.pdf_assets import DataUriCache, font_face_rules
+
+
+def test_vendored_fonts_are_embedded(tmp_path):
+    (tmp_path / "Roboto-BoldItalic.ttf").write_bytes(b"font")
+
+    rules = font_face_rules(tmp_path)
+
+    assert "base64,Zm9udA==" in rules
+    assert "font-weight: 700; font-style: italic;" in rules
+    assert "@import" not in rules
+
+
+def test_no_font_is_fetched_by_default_without_vendored_fonts(tmp_path):
+    assert tools.pdf_assets.PDF_FONT_URL == ""
+    assert font_face_rules(tmp_path) == ""
+
+
+def test_a_configured_font_stylesheet_is_imported_without_vendored_fonts(monkeypatch, tmp_path):
+    url = "https://fonts.googleapis.com/css2?family=Roboto&display=swap"
+    monkeypatch.setattr(tools.pdf_assets, "PDF_FONT_URL", url)
+
+    assert font_face_rules(tmp_path) == f"@import url('{url}');"
+
+
+def test_image_uris_are_cached_within_a_byte_budget(tmp_path):
+    paths = []
+    for name in ("a", "b", "c"):
+        path = tmp_path / f"{name}.png"
+        path.write_bytes(b"x" * 300)
+        paths.append(path)
+    cache = DataUriCache(max_bytes=1000)
+
+    uris = [cache.get(path, 1.0) for path in paths]
+
+    assert cache.total_bytes <= 1000
+    assert list(cache._entries) == [(paths[1], 1.0), (paths[2], 1.0)]
+    paths[2].write_bytes(b"changed")
+    assert cache.get(paths[2], 1.0) == uris[2]  # Still cached.
+    assert cache.get(paths[2], 2.0) != uris[2]  # A new modification time is a miss.
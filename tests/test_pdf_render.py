@@ -0,0 +1,65 @@
+import sys
+import time
+
+import pytest
+
+from tools.pdf_render import PdfRenderError, WkhtmltopdfPoolRenderer
+
+
+# Stands in for wkhtmltopdf --read-args-from-stdin: one "<html> <pdf>" job per line,
+# progress on stderr and "Done" when a document is written. A page containing
+# "hang" keeps reporting progress without ever finishing.
+FAKE_WKHTMLTOPDF = """\
+import sys, time
+
+for job in sys.stdin:
+    html_path, pdf_path = job.split()
+    html = open(html_path, encoding="utf-8").read()
+    while "hang" in html:
+        print("[====>     ] 50%", file=sys.stderr, flush=True)
+        time.sleep(0.05)
+    open(pdf_path, "w").write("%PDF " + html)
+    print("Done", file=sys.stderr, flush=True)
+"""
+
+
+@pytest.fixture
+def fake_binary(tmp_path):
+    script = tmp_path / "wkhtmltopdf.py"
+    script.write_text(FAKE_WKHTMLTOPDF)
+    binary = tmp_path / "wkhtmltopdf"
+    binary.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{script}"\n')
+    binary.chmod(0o755)
+    return str(binary)
+
+
+def test_pool_renders_documents_with_a_stand_in_binary(fake_binary, tmp_path):
+    renderer = WkhtmltopdfPoolRenderer(fake_binary, options={}, workers=2, timeout=5)
+    try:
+        futures = [
+            renderer.submit(f"<p>{index}</p>", tmp_path / f"{index}.pdf")
+            for index in range(4)
+        ]
+        paths = [future.result(timeout=10) for future in futures]
+    finally:
+        renderer.shutdown()
+
+    assert [path.read_text() for path in paths] == [
+        f"%PDF <p>{index}</p>" for index in range(4)
+    ]
+
+
+def test_a_hanging_page_times_out_overall_and_the_worker_restarts(fake_binary, tmp_path):
+    renderer = WkhtmltopdfPoolRenderer(fake_binary, options={}, workers=1, timeout=0.5)
+    try:
+        start_time = time.monotonic()
+        with pytest.raises(PdfRenderError, match="timed out"):
+            renderer.render("<p>hang</p>", tmp_path / "hang.pdf")
+        elapsed = time.monotonic() - start_time
+        renderer.render("<p>next</p>", tmp_path / "next.pdf")
+    finally:
+        renderer.shutdown()
+
+    # Progress lines arrive every 0.05 seconds, a per-line timeout would never fire.
+    assert elapsed < 2
+    assert (tmp_path / "next.pdf").read_text() == "%PDF <p>next</p>"
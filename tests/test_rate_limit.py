@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+from langchain_core.load import dumps
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_openai import ChatOpenAI
+
+import llm
+from tools.rate_limit import Priority, RateLimiter
+
+
+def test_waiters_are_admitted_by_priority_then_arrival():
+    # Ten requests a second with room for one, so every admission waits 0.1 seconds.
+    limiter = RateLimiter(600, burst_seconds=0.1)
+    limiter.acquire()
+    admitted = []
+
+    async def call(name: str, priority: Priority) -> None:
+        await limiter.aacquire(priority=priority)
+        admitted.append(name)
+
+    async def main():
+        calls = [
+            ("batch 1", Priority.BATCH),
+            ("interactive 1", Priority.INTERACTIVE),
+            ("batch 2", Priority.BATCH),
+            ("supervisor", Priority.SUPERVISOR),
+            ("interactive 2", Priority.INTERACTIVE),
+        ]
+        tasks = []
+        for name, priority in calls:
+            tasks.append(asyncio.create_task(call(name, priority)))
+            await asyncio.sleep(0)  # Every call queues before the first admission.
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+
+    assert admitted == ["supervisor", "interactive 1", "interactive 2", "batch 1", "batch 2"]
+    assert not limiter._waiters
+
+
+def test_calls_larger_than_the_bucket_and_underestimates_leave_debt():
+    limiter = RateLimiter(0, tokens_per_minute=6000, burst_seconds=1)  # 100 tokens/s.
+
+    limiter.acquire(300)  # Waits for a full bucket only, not for 300 tokens.
+    assert limiter.tokens.level == pytest.approx(-200, abs=1)
+
+    limiter.settle(estimated_tokens=300, used_tokens=350)
+    assert limiter.tokens.level == pytest.approx(-250, abs=1)
+    limiter.settle(estimated_tokens=300, used_tokens=100)
+    assert limiter.tokens.level == pytest.approx(-50, abs=1)
+    assert limiter.tokens.seconds_until(50) == pytest.approx(1.0, abs=0.05)
+
+
+class FakeResponse:
+    def model_dump(self) -> dict:
+        return {
+            "choices": [
+                {
+                    "message": {"role": "assistant", "content": "Bonjour"},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {"prompt_tokens": 900, "completion_tokens": 100, "total_tokens": 1000},
+        }
+
+
+class FakeCompletions:
+    def create(self, **kwargs) -> FakeResponse:
+        return FakeResponse()
+
+
+class FakeAsyncCompletions:
+    async def create(self, **kwargs) -> FakeResponse:
+        return FakeResponse()
+
+
+def test_calls_settle_the_tokens_the_api_reports(monkeypatch):
+    limiter = RateLimiter(0, tokens_per_minute=6000, burst_seconds=100)
+    monkeypatch.setattr(llm, "get_rate_limiter", lambda *args: limiter)
+    model = llm.rate_limited_chat_openai()(api_key="test", max_tokens=100)
+    object.__setattr__(model, "client", FakeCompletions())
+    object.__setattr__(model, "async_client", FakeAsyncCompletions())
+    messages = [HumanMessage(content="Hello " * 100)]
+    full = limiter.tokens.level
+
+    assert model.invoke(messages).content == "Bonjour"
+    assert asyncio.run(model.ainvoke(messages)).content == "Bonjour"
+
+    assert full - limiter.tokens.level == pytest.approx(2000, abs=5)
+
+
+def test_estimates_count_the_prompt_tools_and_completion():
+    messages = [
+        HumanMessage(content="x" * 400),
+        AIMessage(content="", additional_kwargs={"function_call": {"name": "route"}}),
+    ]
+    tools = [{"type": "function", "function": {"name": "search"}}]
+
+    estimate = llm.estimate_call_tokens(messages, None, tools=tools)
+
+    assert 100 < estimate - llm.COMPLETION_TOKENS_ESTIMATE < 140
+    assert estimate > llm.estimate_call_tokens(messages, None)  # The tools count too.
+    assert llm.estimate_call_tokens(messages, 10) == (
+        llm.estimate_call_tokens(messages, None) - llm.COMPLETION_TOKENS_ESTIMATE + 10
+    )
+
+
+def test_rate_limited_model_shares_llm_cache_keys_with_chat_openai():
+    limited = llm.rate_limited_chat_openai()(model=llm.LLM_MODEL, api_key="test")
+    plain = ChatOpenAI(model=llm.LLM_MODEL, api_key="test")
+
+    assert dumps(limited) == dumps(plain)
+    assert limited._get_llm_string(stop=None) == plain._get_llm_string(stop=None)
@@ -0,0 +1,82 @@
+import asyncio
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+import server
+import tools.weather
+import web_research
+from benchmarks import graphs
+from benchmarks.stub_server import serve
+
+
+async def hold_slot(run_queue: server.RunQueue, seconds: float) -> None:
+    async with run_queue.slot():
+        await asyncio.sleep(seconds)
+
+
+def test_queued_runs_time_out_with_a_503_and_full_queues_get_a_429():
+    async def main():
+        run_queue = server.RunQueue(workers=1, queue_size=1, queue_timeout=0.05)
+        running = asyncio.create_task(hold_slot(run_queue, 0.2))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(hold_slot(run_queue, 0))
+        await asyncio.sleep(0)
+        with pytest.raises(web.HTTPTooManyRequests):
+            await hold_slot(run_queue, 0)
+        with pytest.raises(web.HTTPServiceUnavailable):
+            await queued
+        await running
+        return run_queue
+
+    run_queue = asyncio.run(main())
+    assert (run_queue.running, run_queue.waiting) == (0, 0)
+    assert run_queue._semaphore._value == 1
+
+
+def test_requests_cancelled_as_a_worker_frees_up_give_the_permit_back():
+    async def main():
+        run_queue = server.RunQueue(workers=1, queue_size=10, queue_timeout=5)
+        running = run_queue.slot()
+        await running.__aenter__()
+        waiters = [asyncio.create_task(hold_slot(run_queue, 0)) for _ in range(3)]
+        await asyncio.sleep(0)
+        await running.__aexit__(None, None, None)
+        await asyncio.sleep(0)  # The first waiter's acquire completes, it hasn't resumed.
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.wait_for(hold_slot(run_queue, 0), 1)
+        return run_queue, [waiter.cancelled() for waiter in waiters]
+
+    run_queue, cancelled = asyncio.run(main())
+    assert cancelled == [True, True, True]
+    assert (run_queue.running, run_queue.waiting) == (0, 0)
+    assert run_queue._semaphore._value == 1
+
+
+def test_runs_stream_server_sent_events(monkeypatch, tmp_path):
+    monkeypatch.setattr(web_research, "OUTPUT_DIRECTORY", tmp_path)
+
+    async def main():
+        async with serve(graphs.stub_app(0.0)) as base_url:
+            monkeypatch.setattr(tools.weather, "WEATHER_API_URL", f"{base_url}/v1/current.json")
+            graph, _, _ = graphs.build_graph("weather", base_url, tmp_path, 0.0, 0.0)
+            app = server.create_app({"weather": server.GraphEntry(graph, server.weather_input)})
+            # The app closes the session pool on cleanup.
+            async with serve(app) as url, aiohttp.ClientSession() as session:
+                async with session.post(f"{url}/runs/weather", json={"input": "Seoul"}) as response:
+                    body = await response.text()
+                async with session.post(f"{url}/runs/weather", json={}) as response:
+                    bad_request = response.status
+                async with session.post(f"{url}/runs/nope", json={"input": "x"}) as response:
+                    not_found = response.status
+        return body, bad_request, not_found
+
+    body, bad_request, not_found = asyncio.run(main())
+
+    events = [block.split("\n")[0] for block in body.strip().split("\n\n")]
+    assert events[0] == "event: thread" and events[-1] == "event: end"
+    assert "event: node" in events
+    assert (bad_request, not_found) == (400, 404)
@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+import web_research
+from benchmarks.fakes import FakeChatModel, fake_search_tool
+from benchmarks.graphs import stub_app
+from benchmarks.stub_server import serve
+from checkpointer import thread_config
+from streaming import IncrementalFileWriter, ainvoke_streaming
+from tools.fetch import SESSION_POOL
+from tools.web import research
+
+
+class EndlessAgent:
+    """Streams a token but never the end of its own run."""
+
+    def get_name(self) -> str:
+        return "EndlessAgent"
+
+    async def astream_events(self, input, config, **kwargs):
+        yield {"event": "on_chain_start", "run_id": "root", "data": {}}
+        yield {"event": "on_chain_end", "run_id": "child", "data": {"output": {}}}
+
+
+def test_ainvoke_streaming_raises_without_the_root_output():
+    with pytest.raises(RuntimeError, match="without the agent's output"):
+        asyncio.run(ainvoke_streaming(EndlessAgent(), {}, "Researcher", print))
+
+
+def test_incremental_file_writer_batches_writes_off_the_event_loop(tmp_path):
+    path = tmp_path / "article.md.part"
+    writer = IncrementalFileWriter(path, flush_interval=60)
+    threads = []
+    write_text = writer._write_text
+
+    def record_thread(text):
+        threads.append(threading.current_thread())
+        write_text(text)
+
+    writer._write_text = record_thread
+
+    async def main():
+        writer.write("first ")
+        for _ in range(100):
+            writer.write("token ")
+        deadline = time.monotonic() + 5
+        while not (path.is_file() and path.read_text()) and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        first = path.read_text()
+        await writer.aclose()
+        return first
+
+    first = asyncio.run(main())
+
+    assert first == "first "
+    assert path.read_text() == "first " + "token " * 100
+    # The first token right away, the rest in one write when the writer closes.
+    assert len(threads) == 2
+    assert threading.main_thread() not in threads
+
+
+def test_the_article_is_drafted_to_a_part_file_and_moved_when_saved(monkeypatch, tmp_path):
+    monkeypatch.setattr(web_research, "OUTPUT_DIRECTORY", tmp_path)
+    thread_id = "article"
+    draft = tmp_path / f"{thread_id}.md.part"
+    article = tmp_path / f"{thread_id}.md"
+
+    async def main():
+        async with serve(stub_app(0.0)) as base_url:
+            page_urls = [f"{base_url}/page/0"]
+            llm = FakeChatModel(
+                latency=0.0,
+                streaming=True,
+                token_latency=0.001,
+                tool_arguments={
+                    "tavily_search_results_json": lambda: {"query": "Jaws"},
+                    "research": lambda: {"research_urls": page_urls, "query": "Jaws"},
+                },
+            )
+            graph = web_research.build_research_graph(
+                llm=llm,
+                search_tool=fake_search_tool(lambda: page_urls, 0.0),
+                research_tool=research,
+            )
+            seen = []
+
+            async def watch():
+                while True:
+                    seen.append((draft.is_file(), article.is_file()))
+                    await asyncio.sleep(0.002)
+
+            watcher = asyncio.create_task(watch())
+            try:
+                output = await graph.ainvoke(
+                    {"messages": [HumanMessage(content="Jaws")]}, thread_config(thread_id)
+                )
+            finally:
+                watcher.cancel()
+                await SESSION_POOL.close()
+        return output, seen
+
+    output, seen = asyncio.run(main())
+
+    article_text = output["messages"][-2].content
+    assert article.read_text(encoding="utf-8") == article_text
+    assert not draft.exists()
+    assert (True, False) in seen
+    # The article path only appears once the draft is complete.
+    assert all(not draft_seen for draft_seen, article_seen in seen if article_seen)
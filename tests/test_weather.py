@@ -0,0 +1,115 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+from aiohttp import web
+
+import tools.weather
+from benchmarks.stub_server import serve
+from tools.fetch import SESSION_POOL
+from tools.weather import WeatherCache, _aget_weather, _get_weather
+
+
+SEOUL = {
+    "location": {"name": "Seoul", "region": "", "country": "South Korea"},
+    "current": {"temp_c": 21.0, "condition": {"text": "Sunny"}},
+}
+
+
+def test_cache_evicts_the_least_recently_used_location():
+    cache = WeatherCache(ttl=60, max_entries=2)
+    for city in ("Paris", "Seoul"):
+        cache.put(city, {"location": {"name": city}})
+    assert cache.get("paris") is not None
+    cache.put("Lima", {"location": {"name": "Lima"}})
+
+    assert cache.get("Seoul") is None
+    assert cache.get("Paris") is not None and cache.get("Lima") is not None
+    assert len(cache._entries) == 2 and len(cache._aliases) == 2
+
+
+def test_expired_locations_are_dropped_on_get():
+    cache = WeatherCache(ttl=-1)
+    cache.put("Seoul", SEOUL)
+
+    assert cache.get("Seoul") is None
+    assert not cache._entries and not cache._aliases
+
+
+def test_both_paths_query_the_api_once_per_location(monkeypatch):
+    requests = []
+
+    async def current(request: web.Request) -> web.Response:
+        requests.append(request.query["q"])
+        location = {**SEOUL["location"], "name": request.query["q"].split(",")[0]}
+        return web.json_response({**SEOUL, "location": location})
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/v1/current.json", current)
+        async with serve(app) as base_url:
+            url = f"{base_url}/v1/current.json"
+            monkeypatch.setattr(tools.weather, "WEATHER_API_URL", url)
+            try:
+                return [
+                    await _aget_weather("Seoul"),
+                    await asyncio.to_thread(_get_weather, "seoul, South Korea"),
+                    await asyncio.to_thread(_get_weather, "Busan"),
+                    await _aget_weather("busan"),
+                ]
+            finally:
+                await SESSION_POOL.close()
+
+    monkeypatch.setattr(tools.weather, "WEATHER_CACHE", WeatherCache(ttl=60))
+    seoul, seoul_again, busan, busan_again = asyncio.run(main())
+
+    assert json.loads(seoul) == SEOUL
+    assert seoul_again == seoul
+    assert json.loads(busan)["location"]["name"] == "Busan" and busan_again == busan
+    assert requests == ["Seoul", "Busan"]
+
+
+def test_the_cache_is_safe_to_share_between_threads():
+    cache = WeatherCache(ttl=60, max_entries=8)
+    cities = [f"City {index}" for index in range(32)]
+
+    def use_cache(offset: int) -> None:
+        for _ in range(200):
+            for city in cities[offset::4]:
+                cache.put(city, {"location": {"name": city}})
+                cache.get(city.lower())
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for future in [executor.submit(use_cache, offset % 4) for offset in range(8)]:
+            future.result()
+
+    assert len(cache._entries) <= 8 and len(cache._aliases) <= 8
+
+
+def test_both_paths_give_up_after_the_request_timeout(monkeypatch):
+    async def current(request: web.Request) -> web.Response:
+        await asyncio.sleep(2)
+        return web.json_response(SEOUL)
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/v1/current.json", current)
+        async with serve(app) as base_url:
+            monkeypatch.setattr(tools.weather, "WEATHER_API_URL", f"{base_url}/v1/current.json")
+            try:
+                with pytest.raises(asyncio.TimeoutError):
+                    await _aget_weather("Seoul")
+                with pytest.raises(requests.Timeout):
+                    await asyncio.to_thread(_get_weather, "Seoul")
+            finally:
+                await SESSION_POOL.close()
+
+    monkeypatch.setattr(tools.weather, "WEATHER_CACHE", WeatherCache(ttl=60))
+    monkeypatch.setattr(tools.weather, "REQUEST_TIMEOUT", 0.2)
+    start_time = time.perf_counter()
+    asyncio.run(main())
+
+    assert time.perf_counter() - start_time < 1.5
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import socket
+import time
+from collections import Counter
+
+from aiohttp import web
+
+import tools.web
+from benchmarks.stub_server import serve
+from tools.fetch import SESSION_POOL
+from tools.html_text import extract_text
+from tools.parse_pool import ParsePool
+from tools.web_cache import WebPageCache
+
+
+SHORT_PAGE = "<html><body><p>Short page.</p></body></html>"
+LONG_PAGE = "<html><body>" + "<p>Long page paragraph.</p>" * 20_000 + "</body></html>"
+
+
+async def fetch_pages(*names: str) -> list[str]:
+    async def page(request: web.Request) -> web.Response:
+        body = SHORT_PAGE if request.match_info["name"] == "short" else LONG_PAGE
+        return web.Response(text=body, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/{name}", page)
+    async with serve(app) as base_url:
+        try:
+            return [await tools.web.get_webpage_content(f"{base_url}/{name}") for name in names]
+        finally:
+            await SESSION_POOL.close()
+
+
+def test_streaming_text_matches_extract_text_and_is_fed_in_a_thread(monkeypatch):
+    pool = ParsePool(kind="process", inline_max_characters=0)
+    monkeypatch.setattr(tools.web, "PARSE_POOL", pool)
+    monkeypatch.setattr(tools.web, "CACHE_ENABLED", False)
+
+    short_text, long_text = asyncio.run(fetch_pages("short", "long"))
+    fed_in_threads = pool._feed_executor is not None
+    pool.shutdown()
+
+    assert short_text == extract_text(SHORT_PAGE)
+    assert long_text == extract_text(LONG_PAGE)
+    assert fed_in_threads and pool._executor is None
+
+
+def test_only_complete_pages_keep_their_html_in_the_cache(monkeypatch, tmp_path):
+    cache = WebPageCache(tmp_path)
+    monkeypatch.setattr(tools.web, "WEB_CACHE", cache)
+    monkeypatch.setattr(tools.web, "CACHE_ENABLED", True)
+
+    asyncio.run(fetch_pages("short", "long"))
+
+    # The long page has more text than MAX_CHARACTERS, so the read stops early.
+    assert len(list(tmp_path.glob("*.json"))) == 2
+    assert [path.read_text() for path in tmp_path.glob("*.html")] == [SHORT_PAGE]
+
+
+def unused_port_url() -> str:
+    with socket.socket() as listener:
+        listener.bind(("127.0.0.1", 0))
+        port = listener.getsockname()[1]
+    return f"http://127.0.0.1:{port}/refused"
+
+
+async def research_pages(*names: str, extra_urls: tuple[str, ...] = ()) -> tuple[dict, Counter]:
+    """Run the research tool against stub pages, returning the results by page name."""
+    requests: Counter = Counter()
+
+    async def page(request: web.Request) -> web.Response:
+        name = request.match_info["name"]
+        requests[name] += 1
+        if name == "dead" or (name == "slow_once" and requests[name] == 1):
+            await asyncio.sleep(3)
+        if name == "pdf":
+            return web.Response(body=b"%PDF-1.4", content_type="application/pdf")
+        return web.Response(text=SHORT_PAGE, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/{name}", page)
+    async with serve(app) as base_url:
+        urls = [f"{base_url}/{name}" for name in names] + list(extra_urls)
+        try:
+            output = await tools.web.research.ainvoke({"research_urls": urls})
+        finally:
+            await SESSION_POOL.close()
+    return {result["url"].rsplit("/", 1)[1]: result for result in json.loads(output)}, requests
+
+
+def use_deadlines(monkeypatch, url_timeout: float, hedge_delay: float, budget: float) -> None:
+    monkeypatch.setattr(tools.web, "CACHE_ENABLED", False)
+    monkeypatch.setattr(tools.web, "PACKING", False)
+    monkeypatch.setattr(tools.web, "URL_TIMEOUT", url_timeout)
+    monkeypatch.setattr(tools.web, "HEDGE_DELAY", hedge_delay)
+    monkeypatch.setattr(tools.web, "RESEARCH_BUDGET", budget)
+
+
+def test_research_reports_each_failed_url_and_hedges_slow_ones(monkeypatch):
+    use_deadlines(monkeypatch, url_timeout=0.5, hedge_delay=0.1, budget=2.0)
+
+    start_time = time.perf_counter()
+    results, requests = asyncio.run(
+        research_pages("fast", "slow_once", "dead", "pdf", extra_urls=(unused_port_url(),))
+    )
+    elapsed = time.perf_counter() - start_time
+
+    assert results["fast"]["content"] == extract_text(SHORT_PAGE)
+    # The hedged request answered while the first one was still waiting.
+    assert results["slow_once"]["content"] == extract_text(SHORT_PAGE)
+    assert requests["slow_once"] == 2 and requests["fast"] == 1
+    assert results["dead"] == {
+        "url": results["dead"]["url"],
+        "error": "Timed out after 0.5 seconds.",
+    }
+    assert results["pdf"]["error"].startswith("UnsupportedContentError")
+    assert "ClientConnectorError" in results["refused"]["error"]
+    assert elapsed < 2.0
+
+
+def test_research_returns_partial_results_when_the_budget_runs_out(monkeypatch):
+    use_deadlines(monkeypatch, url_timeout=10.0, hedge_delay=0.0, budget=0.3)
+
+    start_time = time.perf_counter()
+    results, requests = asyncio.run(research_pages("fast", "dead"))
+    elapsed = time.perf_counter() - start_time
+
+    assert "content" in results["fast"]
+    assert results["dead"]["error"] == "Timed out, research budget of 0.3 seconds exceeded."
+    assert requests["dead"] == 1  # No hedging with a zero HEDGE_DELAY.
+    assert elapsed < 2.0
@@ -0,0 +1,55 @@
+import asyncio
+import json
+import os
+
+from tools.web_cache import WebPageCache
+
+
+def test_put_then_get_is_a_hit(tmp_path):
+    cache = WebPageCache(tmp_path)
+    cache.put("https://Example.com:443/a?b=2&a=1", "<p>hi</p>", "hi", extractor="streaming")
+
+    page = cache.get("https://example.com/a?a=1&b=2", "streaming")
+
+    assert page is not None and page.text == "hi"
+    assert cache.stats.hits == 1
+
+
+def test_other_extractor_or_format_is_a_miss(tmp_path):
+    cache = WebPageCache(tmp_path)
+    cache.put("https://example.com/", "<p>hi</p>", "hi", extractor="streaming-16000")
+
+    assert cache.get("https://example.com/", "soup-16000") is None
+
+    meta_path = next(tmp_path.glob("*.json"))
+    entry = json.loads(meta_path.read_text())
+    del entry["version"]  # Written before the entries had a version.
+    meta_path.write_text(json.dumps(entry))
+    assert cache.get("https://example.com/", "streaming-16000") is None
+    assert cache.stats.misses == 2
+
+
+def test_async_methods_match_the_sync_ones(tmp_path):
+    cache = WebPageCache(tmp_path)
+
+    async def main():
+        await cache.aput("https://example.com/", "<p>hi</p>", "hi", etag='"1"')
+        page = await cache.aget("https://example.com/")
+        await cache.amark_revalidated(page)
+        return page
+
+    page = asyncio.run(main())
+    assert page.etag == '"1"'
+    assert cache.stats.hits == 1 and cache.stats.revalidations == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = WebPageCache(tmp_path, max_bytes=1000)
+    cache.put("https://example.com/1", "x" * 400, "x")
+    for meta_path in tmp_path.glob("*.json"):
+        os.utime(meta_path, (0, 0))
+    cache.put("https://example.com/2", "y" * 400, "y")
+
+    assert cache.get("https://example.com/1") is None
+    assert cache.get("https://example.com/2") is not None
+    assert cache.stats.evictions == 1
@@ -1,3 +1,17 @@
-from .image import generate_image
-from .weather import get_weather
-from .pdf import markdown_to_pdf_file
+import importlib
+
+# The tools are loaded on first access, so importing a light submodule such as
+# tools.fetch doesn't pull in openai, pdfkit or bs4.
+_TOOL_MODULES = {
+    "generate_image": ".image",
+    "get_weather": ".weather",
+    "markdown_to_pdf_file": ".pdf",
+}
+
+__all__ = list(_TOOL_MODULES)
+
+
+def __getattr__(name: str):
+    if name not in _TOOL_MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_TOOL_MODULES[name], __name__), name)
@@ -0,0 +1,86 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import aiohttp
+from decouple import config
+
+
+MAX_CONNECTIONS = config("WEB_MAX_CONNECTIONS", default=100, cast=int)
+MAX_CONNECTIONS_PER_HOST = config("WEB_MAX_CONNECTIONS_PER_HOST", default=8, cast=int)
+MAX_CONCURRENT_REQUESTS = config("WEB_MAX_CONCURRENT_REQUESTS", default=32, cast=int)
+DNS_CACHE_TTL = config("WEB_DNS_CACHE_TTL", default=300, cast=int)
+CONNECT_TIMEOUT = config("WEB_CONNECT_TIMEOUT", default=10.0, cast=float)
+REQUEST_TIMEOUT = config("WEB_REQUEST_TIMEOUT", default=30.0, cast=float)
+
+
+class SessionPool:
+    """A long-lived, pooled aiohttp session shared by every fetch tool.
+
+    Connections are kept alive and reused across calls and graph runs. As aiohttp
+    sessions are bound to the event loop that created them, a fresh session is
+    opened whenever the pool is used from a different loop (e.g. a new asyncio.run).
+    """
+
+    def __init__(
+        self,
+        max_connections: int = MAX_CONNECTIONS,
+        max_connections_per_host: int = MAX_CONNECTIONS_PER_HOST,
+        max_concurrent_requests: int = MAX_CONCURRENT_REQUESTS,
+        dns_cache_ttl: int = DNS_CACHE_TTL,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        request_timeout: float = REQUEST_TIMEOUT,
+    ) -> None:
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.max_concurrent_requests = max_concurrent_requests
+        self.dns_cache_ttl = dns_cache_ttl
+        self.timeout = aiohttp.ClientTimeout(
+            total=request_timeout, sock_connect=connect_timeout
+        )
+        self._session: aiohttp.ClientSession | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.max_connections,
+            limit_per_host=self.max_connections_per_host,
+            ttl_dns_cache=self.dns_cache_ttl,
+            use_dns_cache=True,
+        )
+        return aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            if self._session is not None and not self._session.closed:
+                # The owning loop is gone, so the connections can't be closed cleanly.
+                self._session.detach()
+            self._session = self._create_session()
+            self._semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+            self._loop = loop
+        return self._session
+
+    @asynccontextmanager
+    async def request(
+        self, method: str, url: str, **kwargs
+    ) -> AsyncIterator[aiohttp.ClientResponse]:
+        session = await self.get_session()
+        assert self._semaphore is not None
+        async with self._semaphore:
+            async with session.request(method, url, **kwargs) as response:
+                yield response
+
+    def get(self, url: str, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._semaphore = None
+        self._loop = None
+
+
+SESSION_POOL = SessionPool()
@@ -0,0 +1,78 @@
+from html.parser import HTMLParser
+
+from decouple import config
+
+
+# Research results are packed into a token budget, so pages may be kept longer.
+MAX_CHARACTERS = config("WEB_PAGE_MAX_CHARACTERS", default=16_000, cast=int)
+SKIPPED_TAGS = frozenset(["nav", "footer", "aside", "script", "style", "img", "header"])
+VOID_TAGS = frozenset(
+    ["area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta"]
+    + ["param", "source", "track", "wbr"]
+)
+FEED_CHUNK_SIZE = 16 * 1024
+
+
+class TextExtractor(HTMLParser):
+    """Single pass HTML to text extractor.
+
+    Skips the SKIPPED_TAGS subtrees, collapses whitespace as text arrives and stops
+    parsing as soon as max_characters of text have been collected. Produces the same
+    text as soup.get_text() followed by a whitespace split/join on well-formed pages.
+    Can be fed incrementally, chunk by chunk.
+    """
+
+    def __init__(self, max_characters: int = MAX_CHARACTERS) -> None:
+        super().__init__(convert_charrefs=True)
+        self.max_characters = max_characters
+        self.done = False
+        self._parts: list[str] = []
+        self._length = 0
+        self._skip_depth = 0
+        self._pending_space = False
+
+    def feed(self, data: str) -> None:
+        for start in range(0, len(data), FEED_CHUNK_SIZE):
+            if self.done:
+                return
+            super().feed(data[start : start + FEED_CHUNK_SIZE])
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        if tag in SKIPPED_TAGS and tag not in VOID_TAGS:
+            self._skip_depth += 1
+
+    def handle_startendtag(self, tag: str, attrs) -> None:
+        pass
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in SKIPPED_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data: str) -> None:
+        if self._skip_depth or self.done or not data:
+            return
+        words = data.split()
+        if not words:
+            self._pending_space = True
+            return
+        if self._parts and (self._pending_space or data[0].isspace()):
+            self._append(" ")
+        self._append(" ".join(words))
+        self._pending_space = data[-1].isspace()
+
+    def _append(self, text: str) -> None:
+        self._parts.append(text)
+        self._length += len(text)
+        if self._length >= self.max_characters:
+            self.done = True
+
+    def get_text(self) -> str:
+        return "".join(self._parts)[: self.max_characters]
+
+
+def extract_text(html_content: str, max_characters: int = MAX_CHARACTERS) -> str:
+    extractor = TextExtractor(max_characters)
+    extractor.feed(html_content)
+    if not extractor.done:
+        extractor.close()
+    return extractor.get_text()
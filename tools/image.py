@@ -1,27 +1,91 @@
+import asyncio
+import base64
+import functools
+import os
 import uuid
 from pathlib import Path
 
 import requests
 from decouple import config
-from langchain.tools import tool
-from openai import OpenAI
+from langchain_core.tools import StructuredTool
 from pydantic import BaseModel, Field
 
+from .fetch import SESSION_POOL
+from .image_store import ImageStore, image_key
+from .rate_limit import get_rate_limiter
+
 
 IMAGE_DIRECTORY = Path(__file__).parent.parent / "images"
-CLIENT = OpenAI(api_key=str(config("OPENAI_API_KEY")))
+IMAGE_STORE = ImageStore(IMAGE_DIRECTORY)
+
+IMAGE_MODEL = "dall-e-3"
+IMAGE_SIZE = "1024x1024"
+IMAGE_QUALITY = "standard"  # standard or hd
+
+# b64_json returns the image in the API response itself, saving a second download.
+IMAGE_RESPONSE_FORMAT = config("IMAGE_RESPONSE_FORMAT", default="b64_json")
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+@functools.lru_cache(maxsize=None)
+def get_client():
+    from openai import OpenAI
+
+    return OpenAI(api_key=str(config("OPENAI_API_KEY")))
 
 
-def image_downloader(image_url: str | None) -> str:
+@functools.lru_cache(maxsize=None)
+def get_async_client():
+    from openai import AsyncOpenAI
+
+    return AsyncOpenAI(api_key=str(config("OPENAI_API_KEY")))
+
+
+def new_image_path() -> Path:
+    unique_id: uuid.UUID = uuid.uuid4()
+    return IMAGE_DIRECTORY / f"{unique_id}.png"
+
+
+def image_downloader(image_url: str | None, image_path: Path | None = None) -> str:
     if image_url is None:
         return "No image URL returned from API."
-    response = requests.get(image_url)
-    if response.status_code != 200:
-        return "Could not download image from URL."
-    unique_id: uuid.UUID = uuid.uuid4()
-    image_path = IMAGE_DIRECTORY / f"{unique_id}.png"
-    with open(image_path, "wb") as file:
-        file.write(response.content)
+    with requests.get(image_url, stream=True) as response:
+        if response.status_code != 200:
+            return "Could not download image from URL."
+        image_path = image_path or new_image_path()
+        temporary_path = image_path.with_suffix(".part")
+        with open(temporary_path, "wb") as file:
+            for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                file.write(chunk)
+    os.replace(temporary_path, image_path)
+    return str(image_path)
+
+
+async def async_image_downloader(
+    image_url: str | None, image_path: Path | None = None
+) -> str:
+    if image_url is None:
+        return "No image URL returned from API."
+    async with SESSION_POOL.get(image_url) as response:
+        if response.status != 200:
+            return "Could not download image from URL."
+        image_path = image_path or new_image_path()
+        temporary_path = image_path.with_suffix(".part")
+        with open(temporary_path, "wb") as file:
+            async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                file.write(chunk)
+    os.replace(temporary_path, image_path)
+    return str(image_path)
+
+
+def save_b64_image(b64_json: str | None, image_path: Path | None = None) -> str:
+    if b64_json is None:
+        return "No image data returned from API."
+    image_path = image_path or new_image_path()
+    temporary_path = image_path.with_suffix(".part")
+    with open(temporary_path, "wb") as file:
+        file.write(base64.b64decode(b64_json))
+    os.replace(temporary_path, image_path)
     return str(image_path)
 
 
@@ -31,18 +95,69 @@ class GenerateImageInput(BaseModel):
     )
 
 
-@tool("generate_image", args_schema=GenerateImageInput)
-def generate_image(image_description: str) -> str:
-    """Generate an image based on a detailed description."""
-    response = CLIENT.images.generate(
-        model="dall-e-3",
+def create_image(image_description: str, image_path: Path) -> str:
+    get_rate_limiter("openai", IMAGE_MODEL).acquire()
+    response = get_client().images.generate(
+        model=IMAGE_MODEL,
+        prompt=image_description,
+        size=IMAGE_SIZE,
+        quality=IMAGE_QUALITY,
+        n=1,
+        response_format=IMAGE_RESPONSE_FORMAT,
+    )
+    if IMAGE_RESPONSE_FORMAT == "b64_json":
+        return save_b64_image(response.data[0].b64_json, image_path)
+    image_url = response.data[0].url
+    return image_downloader(image_url, image_path)
+
+
+async def acreate_image(image_description: str, image_path: Path) -> str:
+    await get_rate_limiter("openai", IMAGE_MODEL).aacquire()
+    response = await get_async_client().images.generate(
+        model=IMAGE_MODEL,
         prompt=image_description,
-        size="1024x1024",
-        quality="standard",  # standard or hd
+        size=IMAGE_SIZE,
+        quality=IMAGE_QUALITY,
         n=1,
+        response_format=IMAGE_RESPONSE_FORMAT,
     )
+    if IMAGE_RESPONSE_FORMAT == "b64_json":
+        return await asyncio.to_thread(
+            save_b64_image, response.data[0].b64_json, image_path
+        )
     image_url = response.data[0].url
-    return image_downloader(image_url)
+    return await async_image_downloader(image_url, image_path)
+
+
+def _generate_image(image_description: str) -> str:
+    """Generate an image based on a detailed description."""
+    key = image_key(image_description, IMAGE_MODEL, IMAGE_SIZE, IMAGE_QUALITY)
+    return IMAGE_STORE.get_or_create(
+        key, lambda image_path: create_image(image_description, image_path)
+    )
+
+
+async def _agenerate_image(image_description: str) -> str:
+    """Generate an image based on a detailed description."""
+    key = image_key(image_description, IMAGE_MODEL, IMAGE_SIZE, IMAGE_QUALITY)
+    return await IMAGE_STORE.aget_or_create(
+        key, lambda image_path: acreate_image(image_description, image_path)
+    )
+
+
+generate_image = StructuredTool.from_function(
+    func=_generate_image,
+    coroutine=_agenerate_image,
+    name="generate_image",
+    args_schema=GenerateImageInput,
+)
+
+
+async def generate_images(image_descriptions: list[str]) -> list[str]:
+    """Generate several images concurrently, returning their paths in order."""
+    return await asyncio.gather(
+        *(_agenerate_image(description) for description in image_descriptions)
+    )
 
 
 if __name__ == "__main__":
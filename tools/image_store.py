@@ -0,0 +1,150 @@
+import asyncio
+import hashlib
+import os
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Awaitable, Callable
+
+from decouple import config
+
+
+IMAGE_STORE_MAX_BYTES = config(
+    "IMAGE_STORE_MAX_BYTES", default=500 * 1024 * 1024, cast=int
+)
+
+
+def normalize_prompt(prompt: str) -> str:
+    return " ".join(prompt.casefold().split()).rstrip(".!")
+
+
+def image_key(prompt: str, model: str, size: str, quality: str) -> str:
+    content = "\x00".join([normalize_prompt(prompt), model, size, quality])
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class GenerationAbandoned(Exception):
+    """The caller generating an image stopped before it was done."""
+
+
+class ImageStore:
+    """Content-addressed store of generated images, keyed by prompt and settings.
+
+    Concurrent requests for the same key (from threads or event loops) are
+    coalesced so only one generation runs, and the least recently used images are
+    evicted once the directory grows beyond max_bytes. If the generating caller is
+    cancelled, one of the waiting callers takes the generation over.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int = IMAGE_STORE_MAX_BYTES) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._in_flight: dict[str, Future] = {}
+
+    def path_for(self, key: str) -> Path:
+        return self.directory / f"{key}.png"
+
+    def get(self, key: str) -> str | None:
+        image_path = self.path_for(key)
+        try:
+            os.utime(image_path)
+        except OSError:
+            return None
+        self.hits += 1
+        return str(image_path)
+
+    def _claim(self, key: str) -> tuple[Future, bool]:
+        """Return the in-flight future for the key and whether the caller owns it."""
+        with self._lock:
+            if key in self._in_flight:
+                self.coalesced += 1
+                return self._in_flight[key], False
+            future: Future = Future()
+            # The previous owner may have settled since the caller's get().
+            image_path = self.get(key)
+            if image_path is not None:
+                future.set_result(image_path)
+                return future, False
+            self._in_flight[key] = future
+            self.misses += 1
+            return future, True
+
+    def _settle(self, key: str, future: Future, result=None, error=None) -> None:
+        with self._lock:
+            del self._in_flight[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def get_or_create(self, key: str, create: Callable[[Path], str]) -> str:
+        """Return the stored image path, or run create(path) once for all callers."""
+        while True:
+            image_path = self.get(key)
+            if image_path is not None:
+                return image_path
+            future, owner = self._claim(key)
+            if owner:
+                try:
+                    result = create(self.path_for(key))
+                except Exception as error:
+                    self._settle(key, future, error=error)
+                    raise
+                except BaseException:
+                    self._settle(key, future, error=GenerationAbandoned(key))
+                    raise
+                self._settle(key, future, result=result)
+                self.evict(keep=key)
+            try:
+                return future.result()
+            except GenerationAbandoned:
+                continue
+
+    async def aget_or_create(
+        self, key: str, create: Callable[[Path], Awaitable[str]]
+    ) -> str:
+        while True:
+            image_path = self.get(key)
+            if image_path is not None:
+                return image_path
+            future, owner = self._claim(key)
+            if owner:
+                try:
+                    result = await create(self.path_for(key))
+                except Exception as error:
+                    self._settle(key, future, error=error)
+                    raise
+                except BaseException:
+                    # Waiters weren't cancelled, so they retry instead of seeing it.
+                    self._settle(key, future, error=GenerationAbandoned(key))
+                    raise
+                self._settle(key, future, result=result)
+                await asyncio.to_thread(self.evict, key)
+            try:
+                # Shielded, so a cancelled waiter doesn't cancel the shared future.
+                return await asyncio.shield(asyncio.wrap_future(future))
+            except GenerationAbandoned:
+                continue
+
+    def evict(self, keep: str | None = None) -> None:
+        images = []
+        for path in self.directory.glob("*.png"):
+            try:
+                images.append((path.stat(), path))
+            except FileNotFoundError:
+                continue  # Evicted by another thread meanwhile.
+        images.sort(key=lambda image: image[0].st_mtime)
+        total_bytes = sum(stat.st_size for stat, _ in images)
+        for stat, path in images:
+            if total_bytes <= self.max_bytes:
+                break
+            if path.stem == keep:
+                continue
+            path.unlink(missing_ok=True)
+            total_bytes -= stat.st_size
+            self.evictions += 1
@@ -0,0 +1,172 @@
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+from decouple import config
+
+
+TOKEN_BUDGET = config("WEB_RESEARCH_TOKEN_BUDGET", default=6_000, cast=int)
+# Rough size of a token in English text, used by every token estimate here.
+CHARACTERS_PER_TOKEN = 4
+PASSAGE_CHARACTERS = 800
+SHINGLE_SIZE = 5
+DUPLICATE_THRESHOLD = 0.8
+# Rough token cost of the JSON wrapping around every page that makes the cut.
+ENTRY_OVERHEAD_TOKENS = 10
+
+WORD_PATTERN = re.compile(r"\w+")
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+
+
+@dataclass
+class Passage:
+    url: str
+    position: int
+    text: str
+    score: float = 0.0
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARACTERS_PER_TOKEN)
+
+
+def split_passages(url: str, text: str) -> list[Passage]:
+    """Split page text into passages of about PASSAGE_CHARACTERS on sentence ends."""
+    pieces = []
+    for sentence in SENTENCE_BOUNDARY.split(text):
+        for start in range(0, len(sentence), PASSAGE_CHARACTERS):
+            pieces.append(sentence[start : start + PASSAGE_CHARACTERS])
+
+    passages: list[Passage] = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + len(piece) + 1 > PASSAGE_CHARACTERS:
+            passages.append(Passage(url, len(passages), current))
+            current = ""
+        current = f"{current} {piece}" if current else piece
+    if current:
+        passages.append(Passage(url, len(passages), current))
+    return passages
+
+
+def tokenize(text: str) -> list[str]:
+    return WORD_PATTERN.findall(text.lower())
+
+
+def shingles(text: str) -> set[tuple[str, ...]]:
+    words = tokenize(text)
+    if len(words) < SHINGLE_SIZE:
+        return {tuple(words)}
+    return {tuple(words[i : i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def score_passages(passages: list[Passage], query: str) -> None:
+    """Score passages with BM25 against the query, or by page position without one."""
+    query_terms = set(tokenize(query))
+    if not query_terms:
+        for passage in passages:
+            passage.score = -passage.position
+        return
+
+    k1, b = 1.5, 0.75
+    documents = [Counter(tokenize(passage.text)) for passage in passages]
+    average_length = sum(sum(doc.values()) for doc in documents) / len(documents) or 1
+    document_frequency = Counter(term for doc in documents for term in query_terms & doc.keys())
+    for passage, doc in zip(passages, documents):
+        length = sum(doc.values())
+        score = 0.0
+        for term in query_terms:
+            if term not in doc:
+                continue
+            idf = math.log(
+                1
+                + (len(documents) - document_frequency[term] + 0.5)
+                / (document_frequency[term] + 0.5)
+            )
+            frequency = doc[term]
+            score += idf * frequency * (k1 + 1) / (
+                frequency + k1 * (1 - b + b * length / average_length)
+            )
+        passage.score = score
+
+
+def deduplicate(passages: list[Passage]) -> list[Passage]:
+    """Drop passages that are near-identical (by shingle Jaccard) to an earlier one."""
+    kept: list[Passage] = []
+    kept_shingles: list[set[tuple[str, ...]]] = []
+    for passage in passages:
+        passage_shingles = shingles(passage.text)
+        if any(
+            len(passage_shingles & other) / len(passage_shingles | other)
+            >= DUPLICATE_THRESHOLD
+            for other in kept_shingles
+        ):
+            continue
+        kept.append(passage)
+        kept_shingles.append(passage_shingles)
+    return kept
+
+
+def omitted_entry(url: str) -> dict:
+    return {"url": url, "error": "omitted: token budget"}
+
+
+def pack_results(results: list[dict], query: str, token_budget: int = TOKEN_BUDGET) -> list[dict]:
+    """Fit research results into a token budget.
+
+    Pages are split into passages, near-duplicates across pages are removed, and the
+    passages most relevant to the query are selected greedily until the budget is
+    full. Selected passages are returned per URL in their original order, error
+    entries are kept as they are and a page with no passage left gets an
+    "omitted: token budget" error entry.
+    """
+    errors = [result for result in results if "error" in result]
+    pages = [result for result in results if result.get("content")]
+    # Every page may end up as an omission note, so those are paid for up front.
+    budget = token_budget - sum(
+        estimate_tokens(str(entry))
+        for entry in errors + [omitted_entry(page["url"]) for page in pages]
+    )
+
+    passages = [
+        passage for page in pages for passage in split_passages(page["url"], page["content"])
+    ]
+    if passages:
+        score_passages(passages, query)
+    ranked = deduplicate(sorted(passages, key=lambda passage: -passage.score))
+
+    selected: dict[str, list[Passage]] = {}
+    for passage in ranked:
+        cost = estimate_tokens(passage.text)
+        if passage.url not in selected:
+            cost += (
+                estimate_tokens(passage.url)
+                + ENTRY_OVERHEAD_TOKENS
+                - estimate_tokens(str(omitted_entry(passage.url)))
+            )
+        if cost > budget:
+            continue
+        budget -= cost
+        selected.setdefault(passage.url, []).append(passage)
+
+    packed = []
+    for result in results:
+        if "error" in result:
+            packed.append(result)
+        elif result["url"] in selected:
+            page_passages = sorted(selected.pop(result["url"]), key=lambda p: p.position)
+            packed.append({"url": result["url"], "content": join_passages(page_passages)})
+        elif result.get("content"):
+            packed.append(omitted_entry(result["url"]))
+        else:
+            packed.append(result)
+    return packed
+
+
+def join_passages(passages: list[Passage]) -> str:
+    text = passages[0].text
+    for previous, passage in zip(passages, passages[1:]):
+        separator = " " if passage.position == previous.position + 1 else " [...] "
+        text += separator + passage.text
+    return text
@@ -0,0 +1,98 @@
+import asyncio
+import atexit
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable
+
+from decouple import config
+
+
+# thread, process or inline. Streamed pages are always parsed in threads, a process
+# pool only takes the whole-page parsing of the soup extractor or WEB_STREAMING=False.
+PARSE_EXECUTOR = config("WEB_PARSE_EXECUTOR", default="thread")
+PARSE_WORKERS = config("WEB_PARSE_WORKERS", default=os.cpu_count() or 1, cast=int)
+# Pages smaller than this are parsed on the event loop, dispatching them costs more.
+PARSE_INLINE_MAX_CHARACTERS = config(
+    "WEB_PARSE_INLINE_MAX_CHARACTERS", default=50_000, cast=int
+)
+
+
+class ParsePool:
+    """Runs CPU-bound parsing off the event loop in a process or thread pool.
+
+    The executor is created on first use and shut down at interpreter exit. With
+    the process pool, the parsing function must be importable at module level.
+    Incremental parsers keep their state in this process, so feed() always uses
+    a thread, and the process pool only applies to run().
+    """
+
+    def __init__(
+        self,
+        kind: str = PARSE_EXECUTOR,
+        max_workers: int = PARSE_WORKERS,
+        inline_max_characters: int = PARSE_INLINE_MAX_CHARACTERS,
+    ) -> None:
+        if kind not in ("process", "thread", "inline"):
+            raise ValueError(f"Unknown parse executor kind: {kind}")
+        self.kind = kind
+        self.max_workers = max_workers
+        self.inline_max_characters = inline_max_characters
+        self._executor: Executor | None = None
+        self._feed_executor: ThreadPoolExecutor | None = None
+
+    def get_executor(self) -> Executor | None:
+        if self.kind == "inline":
+            return None
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="parse"
+                )
+            atexit.register(self.shutdown)
+        return self._executor
+
+    async def run(self, func: Callable[[str], Any], content: str) -> Any:
+        executor = self.get_executor()
+        if executor is None or len(content) < self.inline_max_characters:
+            return func(content)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, func, content)
+
+    async def feed(self, parser: Any, content: str, page_characters: int = 0) -> None:
+        """Feed the next chunk to an incremental parser, such as a TextExtractor.
+
+        Chunks of one parser must be fed one at a time, in order. Whether they are
+        fed inline depends on page_characters, the expected size of the whole page,
+        as chunks arrive in whatever sizes the network delivers.
+        """
+        if not content:
+            return
+        page_characters = max(page_characters, len(content))
+        if self.kind == "inline" or page_characters < self.inline_max_characters:
+            parser.feed(content)
+            return
+        if self.kind == "thread":
+            executor = self.get_executor()
+        else:
+            if self._feed_executor is None:
+                self._feed_executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="feed"
+                )
+                atexit.register(self.shutdown)
+            executor = self._feed_executor
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(executor, parser.feed, content)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the workers. With wait=False, queued jobs are cancelled."""
+        for executor in (self._executor, self._feed_executor):
+            if executor is not None:
+                executor.shutdown(wait=wait, cancel_futures=not wait)
+        self._executor = None
+        self._feed_executor = None
+        atexit.unregister(self.shutdown)
+
+
+PARSE_POOL = ParsePool()
@@ -2,14 +2,13 @@ import os
 import uuid
 from pathlib import Path
 
-import pdfkit
-from langchain.tools import tool
+from langchain_core.tools import tool
 from markdown import markdown
 from pydantic import BaseModel, Field
 
+from .pdf_assets import compile_template, inline_images
+from .pdf_render import PdfRenderError, get_renderer
 
-PATH_WKHTMLTOPDF = r"C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe"
-PDFKIT_CONFIG = pdfkit.configuration(wkhtmltopdf=PATH_WKHTMLTOPDF)
 
 OUTPUT_DIRECTORY = Path(__file__).parent.parent / "output"
 
@@ -21,26 +20,10 @@ class MarkdownToPDFInput(BaseModel):
 
 
 def generate_html_text(markdown_text: str) -> str:
-    """Convert markdown text to HTML text."""
+    """Convert markdown text to a self-contained HTML document."""
     markdown_text = markdown_text.replace("file:///", "").replace("file://", "")
-    html_text = markdown(markdown_text)
-    html_text = f"""
-    <html>
-    <head>
-        <style>
-            @import url('https://fonts.googleapis.com/css2?family=Roboto&display=swap');
-            body {{
-                font-family: 'Roboto', sans-serif;
-                line-height: 150%;
-            }}
-        </style>
-    </head>
-    <body>
-    {html_text}
-    </body>
-    </html>
-    """
-    return html_text
+    head, tail = compile_template()
+    return head + inline_images(markdown(markdown_text)) + tail
 
 
 @tool("markdown_to_pdf_file", args_schema=MarkdownToPDFInput)
@@ -50,18 +33,12 @@ def markdown_to_pdf_file(markdown_text: str) -> str:
     unique_id: uuid.UUID = uuid.uuid4()
     pdf_path = OUTPUT_DIRECTORY / f"{unique_id}.pdf"
 
-    options = {
-        "no-stop-slow-scripts": True,
-        "print-media-type": True,
-        "encoding": "UTF-8",
-        "enable-local-file-access": "",
-    }
+    try:
+        get_renderer().render(html_text, pdf_path)
+    except (PdfRenderError, OSError) as error:
+        return f"Could not generate PDF: {error}"
 
-    pdfkit.from_string(
-        html_text, str(pdf_path), configuration=PDFKIT_CONFIG, options=options
-    )
-
-    if os.path.exists(pdf_path):
+    if os.path.exists(pdf_path) and os.path.getsize(pdf_path) > 0:
         return str(pdf_path)
     else:
         return "Could not generate PDF, please check your input and try again."
@@ -0,0 +1,150 @@
+import base64
+import functools
+import mimetypes
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from decouple import config
+
+
+ROOT_DIRECTORY = Path(__file__).parent.parent
+FONT_DIRECTORY = ROOT_DIRECTORY / "assets" / "fonts"
+IMAGE_DIRECTORY = ROOT_DIRECTORY / "images"
+
+PDF_FONT_FAMILY = config("PDF_FONT_FAMILY", default="Roboto")
+# Stylesheet imported when no font is vendored, e.g.
+# https://fonts.googleapis.com/css2?family=Roboto&display=swap. Empty keeps
+# rendering offline, with the fallback fonts.
+PDF_FONT_URL = config("PDF_FONT_URL", default="")
+# Used for any glyph the font lacks, or for everything if it can't be loaded.
+FALLBACK_FONT_STACK = "'Helvetica Neue', Helvetica, Arial, 'DejaVu Sans', sans-serif"
+FONT_FORMATS = {".ttf": "truetype", ".otf": "opentype", ".woff": "woff"}
+
+# Inlined images are kept as data URIs for the next document, up to this many bytes.
+PDF_IMAGE_CACHE_MAX_BYTES = config(
+    "PDF_IMAGE_CACHE_MAX_BYTES", default=32 * 1024 * 1024, cast=int
+)
+
+IMAGE_SOURCE = re.compile(r'(<img\b[^>]*?\bsrc=")([^"]+)(")', re.IGNORECASE)
+REMOTE_SCHEMES = ("http://", "https://", "data:")
+
+
+def data_uri(path: Path) -> str:
+    mime_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    encoded = base64.b64encode(path.read_bytes()).decode("ascii")
+    return f"data:{mime_type};base64,{encoded}"
+
+
+def font_face_rules(font_directory: Path = FONT_DIRECTORY) -> str:
+    """@font-face rules embedding every font file in font_directory.
+
+    Weight and style come from the file name, e.g. Roboto-BoldItalic.ttf. Without
+    any font file, the PDF_FONT_URL stylesheet is imported instead, if one is set.
+    """
+    rules = []
+    font_paths = sorted(font_directory.iterdir()) if font_directory.is_dir() else []
+    for path in font_paths:
+        font_format = FONT_FORMATS.get(path.suffix.lower())
+        if font_format is None:
+            continue
+        name = path.stem.lower()
+        weight = 700 if "bold" in name else 400
+        style = "italic" if "italic" in name else "normal"
+        rules.append(
+            f"@font-face {{ font-family: '{PDF_FONT_FAMILY}'; "
+            f"src: url('{data_uri(path)}') format('{font_format}'); "
+            f"font-weight: {weight}; font-style: {style}; }}"
+        )
+    if not rules and PDF_FONT_URL:
+        return f"@import url('{PDF_FONT_URL}');"
+    return "\n".join(rules)
+
+
+@functools.lru_cache(maxsize=None)
+def compile_template() -> tuple[str, str]:
+    """The HTML before and after the document body, with fonts and CSS inlined.
+
+    Built once per process so rendering a document only needs the markdown
+    conversion. Nothing is fetched over the network unless PDF_FONT_URL is set.
+    """
+    head = f"""
+    <html>
+    <head>
+        <meta charset="utf-8">
+        <style>
+            {font_face_rules()}
+            body {{
+                font-family: '{PDF_FONT_FAMILY}', {FALLBACK_FONT_STACK};
+                line-height: 150%;
+            }}
+            img {{
+                max-width: 100%;
+            }}
+        </style>
+    </head>
+    <body>
+    """
+    tail = """
+    </body>
+    </html>
+    """
+    return head, tail
+
+
+def resolve_image(source: str) -> Path | None:
+    """Find a local image by its path, relative to the repository or in images/."""
+    path = Path(source)
+    for candidate in [path, ROOT_DIRECTORY / path, IMAGE_DIRECTORY / path.name]:
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+class DataUriCache:
+    """Data URIs of local images by path and modification time, bounded in bytes."""
+
+    def __init__(self, max_bytes: int = PDF_IMAGE_CACHE_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: OrderedDict[tuple[Path, float], str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: Path, modified_time: float) -> str:
+        key = (path, modified_time)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        uri = data_uri(path)
+        if len(uri) > self.max_bytes:
+            return uri
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = uri
+                self.total_bytes += len(uri)
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.total_bytes -= len(evicted)
+        return uri
+
+
+IMAGE_URI_CACHE = DataUriCache()
+
+
+def image_uri(source: str) -> str:
+    """A data URI for a local image, or the source unchanged if it isn't local."""
+    if source.startswith(REMOTE_SCHEMES):
+        return source
+    path = resolve_image(source)
+    if path is None:
+        return source
+    return IMAGE_URI_CACHE.get(path.resolve(), path.stat().st_mtime)
+
+
+def inline_images(html_text: str) -> str:
+    return IMAGE_SOURCE.sub(
+        lambda match: match.group(1) + image_uri(match.group(2)) + match.group(3),
+        html_text,
+    )
@@ -0,0 +1,225 @@
+import atexit
+import functools
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from pathlib import Path
+
+from decouple import config
+
+
+WINDOWS_WKHTMLTOPDF_PATH = r"C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe"
+WKHTMLTOPDF_PATH = config("WKHTMLTOPDF_PATH", default="")
+# pdfkit, or the experimental pool, which keeps wkhtmltopdf processes running between
+# documents. Its job protocol has only been tested against a stand-in script, run
+# benchmarks/pdf_render.py with a real wkhtmltopdf before relying on it.
+PDF_RENDERER = config("PDF_RENDERER", default="pdfkit")
+PDF_RENDER_WORKERS = config("PDF_RENDER_WORKERS", default=2, cast=int)
+PDF_RENDER_TIMEOUT = config("PDF_RENDER_TIMEOUT", default=60.0, cast=float)
+
+PDF_OPTIONS = {
+    "no-stop-slow-scripts": True,
+    "print-media-type": True,
+    "encoding": "UTF-8",
+    "enable-local-file-access": "",
+}
+
+
+class PdfRenderError(Exception):
+    pass
+
+
+def find_wkhtmltopdf() -> str | None:
+    """Locate wkhtmltopdf: WKHTMLTOPDF_PATH, then the PATH, then the Windows default."""
+    for candidate in [WKHTMLTOPDF_PATH, shutil.which("wkhtmltopdf"), WINDOWS_WKHTMLTOPDF_PATH]:
+        if candidate and Path(candidate).is_file():
+            return candidate
+    return None
+
+
+def options_to_arguments(options: dict) -> list[str]:
+    arguments = []
+    for option, value in options.items():
+        arguments.append(f"--{option}")
+        if value not in (True, "", None):
+            arguments.append(str(value))
+    return arguments
+
+
+def quote_argument(argument: str) -> str:
+    return f'"{argument}"' if " " in argument else argument
+
+
+class PdfkitRenderer:
+    """Renders every document with a new wkhtmltopdf process through pdfkit."""
+
+    def __init__(self, binary: str, options: dict = PDF_OPTIONS) -> None:
+        import pdfkit
+
+        self._pdfkit = pdfkit
+        self.configuration = pdfkit.configuration(wkhtmltopdf=binary)
+        self.options = options
+
+    def render(self, html_text: str, pdf_path: Path) -> None:
+        self._pdfkit.from_string(
+            html_text, str(pdf_path), configuration=self.configuration, options=self.options
+        )
+
+    def shutdown(self) -> None:
+        pass
+
+
+class WkhtmltopdfWorker:
+    """A wkhtmltopdf process fed one job per line with --read-args-from-stdin.
+
+    Assumes wkhtmltopdf reports "Done" on stderr after every finished document and
+    "Exit with code" after a failed one, which is unverified against a real binary.
+    If a job fails, isn't done within the timeout or the process dies, the process
+    is killed and restarted for the next job.
+    """
+
+    def __init__(self, binary: str, options: dict) -> None:
+        self.command = [binary, *options_to_arguments(options), "--read-args-from-stdin"]
+        self._process: subprocess.Popen | None = None
+        self._lines: queue.Queue = queue.Queue()
+
+    def _start(self) -> subprocess.Popen:
+        self._lines = queue.Queue()
+        process = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+        )
+        threading.Thread(
+            target=self._read_stderr, args=(process, self._lines), daemon=True
+        ).start()
+        return process
+
+    @staticmethod
+    def _read_stderr(process: subprocess.Popen, lines: queue.Queue) -> None:
+        for line in process.stderr:  # type: ignore
+            # Progress bars redraw with carriage returns, keep the final state only.
+            lines.put(line.split("\r")[-1].strip())
+        lines.put(None)
+
+    def render(self, html_path: Path, pdf_path: Path, timeout: float) -> None:
+        if self._process is None or self._process.poll() is not None:
+            self._process = self._start()
+        job = f"{quote_argument(str(html_path))} {quote_argument(str(pdf_path))}\n"
+        # Progress lines keep arriving while a page hangs, so the timeout is overall.
+        deadline = time.monotonic() + timeout
+        try:
+            self._process.stdin.write(job)  # type: ignore
+            self._process.stdin.flush()  # type: ignore
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise queue.Empty
+                line = self._lines.get(timeout=remaining)
+                if line is None:
+                    raise PdfRenderError("wkhtmltopdf exited while rendering.")
+                if line == "Done":
+                    return
+                if line.startswith("Exit with code"):
+                    raise PdfRenderError(line)
+        except (queue.Empty, OSError, PdfRenderError) as error:
+            self.stop()
+            if isinstance(error, queue.Empty):
+                raise PdfRenderError(f"Rendering timed out after {timeout} seconds.")
+            if isinstance(error, OSError):
+                raise PdfRenderError(f"wkhtmltopdf is not running: {error}")
+            raise
+
+    def stop(self) -> None:
+        if self._process is not None:
+            self._process.kill()
+            self._process.wait()
+            self._process = None
+
+
+class WkhtmltopdfPoolRenderer:
+    """Experimental: wkhtmltopdf workers kept running between documents, consuming
+    a shared job queue. See WkhtmltopdfWorker for what is still unverified."""
+
+    def __init__(
+        self,
+        binary: str,
+        options: dict = PDF_OPTIONS,
+        workers: int = PDF_RENDER_WORKERS,
+        timeout: float = PDF_RENDER_TIMEOUT,
+    ) -> None:
+        self.binary = binary
+        self.options = options
+        self.workers = workers
+        self.timeout = timeout
+        self._jobs: queue.Queue = queue.Queue()
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._temporary_directory = Path(tempfile.mkdtemp(prefix="pdf_render_"))
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            for _ in range(self.workers):
+                thread = threading.Thread(target=self._work, daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self) -> None:
+        worker = WkhtmltopdfWorker(self.binary, self.options)
+        while (job := self._jobs.get()) is not None:
+            html_text, pdf_path, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            html_path = self._temporary_directory / f"{uuid.uuid4()}.html"
+            try:
+                html_path.write_text(html_text, encoding="utf-8")
+                worker.render(html_path, pdf_path, self.timeout)
+                future.set_result(pdf_path)
+            except Exception as error:
+                future.set_exception(error)
+            finally:
+                html_path.unlink(missing_ok=True)
+        worker.stop()
+
+    def submit(self, html_text: str, pdf_path: Path) -> Future:
+        self._ensure_started()
+        future: Future = Future()
+        self._jobs.put((html_text, pdf_path, future))
+        return future
+
+    def render(self, html_text: str, pdf_path: Path) -> None:
+        self.submit(html_text, pdf_path).result()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            for _ in self._threads:
+                self._jobs.put(None)
+            for thread in self._threads:
+                thread.join()
+            self._threads = []
+        shutil.rmtree(self._temporary_directory, ignore_errors=True)
+
+
+@functools.lru_cache(maxsize=None)
+def get_renderer(kind: str = PDF_RENDERER) -> PdfkitRenderer | WkhtmltopdfPoolRenderer:
+    """The shared renderer of the given kind, started on first use."""
+    binary = find_wkhtmltopdf()
+    if binary is None:
+        raise PdfRenderError("wkhtmltopdf was not found, set WKHTMLTOPDF_PATH.")
+    renderer: PdfkitRenderer | WkhtmltopdfPoolRenderer
+    if kind == "pdfkit":
+        renderer = PdfkitRenderer(binary)
+    else:
+        renderer = WkhtmltopdfPoolRenderer(binary)
+    atexit.register(renderer.shutdown)
+    return renderer
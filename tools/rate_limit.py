@@ -0,0 +1,169 @@
+import asyncio
+import bisect
+import enum
+import functools
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from decouple import config
+
+
+RATE_LIMITS_ENABLED = config("RATE_LIMITS_ENABLED", default=True, cast=bool)
+# Requests and tokens per minute for each (provider, model), 0 for no limit. The
+# model "" holds the provider's default. Set them to your account's usage tier.
+RATE_LIMITS = {
+    ("openai", ""): (
+        config("OPENAI_REQUESTS_PER_MINUTE", default=3500, cast=int),
+        config("OPENAI_TOKENS_PER_MINUTE", default=60_000, cast=int),
+    ),
+    ("openai", "dall-e-3"): (config("IMAGE_REQUESTS_PER_MINUTE", default=5, cast=int), 0),
+    ("tavily", ""): (config("TAVILY_REQUESTS_PER_MINUTE", default=100, cast=int), 0),
+}
+# Providers may enforce a minute's quota over shorter windows, so the buckets only
+# hold this many seconds' worth of it.
+RATE_LIMIT_BURST_SECONDS = config("RATE_LIMIT_BURST_SECONDS", default=6.0, cast=float)
+# Waiters re-check at least this often, e.g. after a waiter ahead of them gave up.
+MAX_POLL_INTERVAL = 1.0
+
+
+class Priority(enum.IntEnum):
+    SUPERVISOR = 0
+    INTERACTIVE = 1
+    BATCH = 2
+
+
+REQUEST_PRIORITY: ContextVar[Priority] = ContextVar(
+    "request_priority", default=Priority.INTERACTIVE
+)
+
+
+@contextmanager
+def request_priority(priority: Priority) -> Iterator[None]:
+    """Rate-limited calls made in this block, and in tasks it starts, use priority."""
+    token = REQUEST_PRIORITY.set(priority)
+    try:
+        yield
+    finally:
+        REQUEST_PRIORITY.reset(token)
+
+
+class TokenBucket:
+    def __init__(
+        self, per_minute: float, burst_seconds: float = RATE_LIMIT_BURST_SECONDS
+    ) -> None:
+        self.rate = per_minute / 60
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def seconds_until(self, amount: float) -> float:
+        return max(0.0, (amount - self.level) / self.rate)
+
+
+class RateLimiter:
+    """Request and token buckets shared by every caller of one provider and model.
+
+    Callers wait in priority order: a call is admitted once the buckets hold
+    enough for it and for every waiter of a higher priority, or of the same
+    priority that came earlier. A call larger than a bucket only waits for a full
+    bucket and leaves the rest as debt, so the long-run rate still holds. Works
+    from threads and from any event loop.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int,
+        tokens_per_minute: int = 0,
+        burst_seconds: float = RATE_LIMIT_BURST_SECONDS,
+    ) -> None:
+        self.requests = None
+        self.tokens = None
+        if requests_per_minute:
+            self.requests = TokenBucket(requests_per_minute, burst_seconds)
+        if tokens_per_minute:
+            self.tokens = TokenBucket(tokens_per_minute, burst_seconds)
+        self.waited_seconds = 0.0
+        self._lock = threading.Lock()
+        self._sequence = itertools.count()
+        self._waiters: list[tuple[int, int, int]] = []
+
+    def _enqueue(self, tokens: int, priority: Priority | None) -> tuple[int, int, int]:
+        priority = REQUEST_PRIORITY.get() if priority is None else priority
+        waiter = (priority, next(self._sequence), tokens)
+        with self._lock:
+            bisect.insort(self._waiters, waiter)
+        return waiter
+
+    def _finish(self, waiter: tuple[int, int, int], waited_seconds: float) -> None:
+        with self._lock:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            self.waited_seconds += waited_seconds
+
+    def _poll(self, waiter: tuple[int, int, int]) -> float:
+        """Admit the waiter and return 0, or return the seconds it should wait."""
+        with self._lock:
+            position = self._waiters.index(waiter)
+            ahead = self._waiters[:position]
+            wait = 0.0
+            if self.requests is not None:
+                self.requests.refill(time.monotonic())
+                wait = self.requests.seconds_until(len(ahead) + 1)
+            if self.tokens is not None:
+                self.tokens.refill(time.monotonic())
+                needed = sum(tokens for _, _, tokens in ahead)
+                needed += min(waiter[2], self.tokens.capacity)
+                wait = max(wait, self.tokens.seconds_until(needed))
+            if wait > 0:
+                return wait
+            del self._waiters[position]
+            if self.requests is not None:
+                self.requests.level -= 1
+            if self.tokens is not None:
+                self.tokens.level -= waiter[2]
+            return 0.0
+
+    def acquire(self, tokens: int = 0, priority: Priority | None = None) -> None:
+        """Block until one request of about `tokens` tokens may be sent."""
+        waiter = self._enqueue(tokens, priority)
+        start_time = time.monotonic()
+        try:
+            while (wait := self._poll(waiter)) > 0:
+                time.sleep(min(wait, MAX_POLL_INTERVAL))
+        finally:
+            self._finish(waiter, time.monotonic() - start_time)
+
+    async def aacquire(self, tokens: int = 0, priority: Priority | None = None) -> None:
+        """Wait until one request of about `tokens` tokens may be sent."""
+        waiter = self._enqueue(tokens, priority)
+        start_time = time.monotonic()
+        try:
+            while (wait := self._poll(waiter)) > 0:
+                await asyncio.sleep(min(wait, MAX_POLL_INTERVAL))
+        finally:
+            self._finish(waiter, time.monotonic() - start_time)
+
+    def settle(self, estimated_tokens: int, used_tokens: int) -> None:
+        """Correct the token bucket once a call reports the tokens it really used."""
+        if self.tokens is not None:
+            with self._lock:
+                self.tokens.level -= used_tokens - estimated_tokens
+
+
+@functools.lru_cache(maxsize=None)
+def get_rate_limiter(provider: str, model: str = "") -> RateLimiter:
+    """The limiter shared by every call to a provider and model in this process."""
+    if not RATE_LIMITS_ENABLED:
+        return RateLimiter(0)
+    requests_per_minute, tokens_per_minute = RATE_LIMITS.get(
+        (provider, model), RATE_LIMITS[(provider, "")]
+    )
+    return RateLimiter(requests_per_minute, tokens_per_minute)
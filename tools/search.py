@@ -0,0 +1,23 @@
+from typing import Optional
+
+from langchain_community.tools.tavily_search import TavilySearchResults
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForToolRun,
+    CallbackManagerForToolRun,
+)
+
+from .rate_limit import get_rate_limiter
+
+
+class RateLimitedTavilySearchResults(TavilySearchResults):
+    """Tavily search that waits for the shared Tavily rate limiter before each call."""
+
+    def _run(self, query: str, run_manager: Optional[CallbackManagerForToolRun] = None):
+        get_rate_limiter("tavily").acquire()
+        return super()._run(query, run_manager)
+
+    async def _arun(
+        self, query: str, run_manager: Optional[AsyncCallbackManagerForToolRun] = None
+    ):
+        await get_rate_limiter("tavily").aacquire()
+        return await super()._arun(query, run_manager)
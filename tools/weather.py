@@ -1,34 +1,186 @@
+import functools
+import re
+import threading
+import time
+from collections import OrderedDict
 from json import dumps
 
+import aiohttp
 import requests
 from decouple import config
-from langchain.tools import tool
+from langchain_core.tools import StructuredTool
 from pydantic import BaseModel, Field
 
+from .fetch import SESSION_POOL
+
+
+WEATHER_API_URL = config(
+    "WEATHER_API_URL", default="http://api.weatherapi.com/v1/current.json"
+)
+WEATHER_CACHE_TTL = config("WEATHER_CACHE_TTL", default=5 * 60, cast=int)
+WEATHER_CACHE_MAX_ENTRIES = config("WEATHER_CACHE_MAX_ENTRIES", default=1024, cast=int)
+# Seconds for a whole API request, on the sync and the async path.
+REQUEST_TIMEOUT = 10
+
+US_STATES = {
+    "al": "alabama", "ak": "alaska", "az": "arizona", "ar": "arkansas",
+    "ca": "california", "co": "colorado", "ct": "connecticut", "de": "delaware",
+    "dc": "district of columbia", "fl": "florida", "ga": "georgia", "hi": "hawaii",
+    "id": "idaho", "il": "illinois", "in": "indiana", "ia": "iowa", "ks": "kansas",
+    "ky": "kentucky", "la": "louisiana", "me": "maine", "md": "maryland",
+    "ma": "massachusetts", "mi": "michigan", "mn": "minnesota", "ms": "mississippi",
+    "mo": "missouri", "mt": "montana", "ne": "nebraska", "nv": "nevada",
+    "nh": "new hampshire", "nj": "new jersey", "nm": "new mexico", "ny": "new york",
+    "nc": "north carolina", "nd": "north dakota", "oh": "ohio", "ok": "oklahoma",
+    "or": "oregon", "pa": "pennsylvania", "ri": "rhode island",
+    "sc": "south carolina", "sd": "south dakota", "tn": "tennessee", "tx": "texas",
+    "ut": "utah", "vt": "vermont", "va": "virginia", "wa": "washington",
+    "wv": "west virginia", "wi": "wisconsin", "wy": "wyoming",
+}  # fmt: skip
+PUNCTUATION = re.compile(r"[^\w\s,]")
+
+
+def normalize_location(location: str) -> str:
+    """Normalize a location so e.g. "New York" and "new york, NY" share a cache key.
+
+    Lowercases, drops punctuation, expands US state codes after the city and drops
+    qualifiers that just repeat the previous part.
+    """
+    parts = []
+    for index, part in enumerate(PUNCTUATION.sub(" ", location.casefold()).split(",")):
+        part = " ".join(part.split())
+        if index > 0:
+            part = US_STATES.get(part, part)
+        if part and (not parts or parts[-1] != part):
+            parts.append(part)
+    return ", ".join(parts)
+
+
+class WeatherCache:
+    """Short-lived per-location cache of weatherapi.com responses.
+
+    Besides the normalized query, every response is also stored under the location
+    the API resolved it to, so different spellings converge on one entry. Holds at
+    most max_entries locations and spellings, evicting the least recently used.
+    The sync tool runs in executor threads, so every access takes a lock.
+    """
+
+    def __init__(
+        self, ttl: int = WEATHER_CACHE_TTL, max_entries: int = WEATHER_CACHE_MAX_ENTRIES
+    ) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._aliases: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, location: str) -> str | None:
+        key = normalize_location(location)
+        with self._lock:
+            canonical = self._aliases.get(key, key)
+            entry = self._entries.get(canonical)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[canonical]
+                entry = None
+            if entry is None:
+                self._aliases.pop(key, None)
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(canonical)
+            if key in self._aliases:
+                self._aliases.move_to_end(key)
+            return entry[1]
+
+    def put(self, location: str, data: dict) -> None:
+        key = normalize_location(location)
+        resolved = data.get("location", {})
+        canonical = normalize_location(
+            ", ".join(
+                str(resolved.get(field, "")) for field in ("name", "region", "country")
+            )
+        )
+        canonical = canonical or key
+        response = dumps(data)
+        with self._lock:
+            self._entries[canonical] = (time.monotonic() + self.ttl, response)
+            self._entries.move_to_end(canonical)
+            self._aliases[key] = canonical
+            self._aliases.move_to_end(key)
+            for mapping in (self._entries, self._aliases):
+                while len(mapping) > self.max_entries:
+                    mapping.popitem(last=False)
+
+
+WEATHER_CACHE = WeatherCache()
+
+
+@functools.lru_cache(maxsize=None)
+def get_api_key() -> str:
+    return str(config("WEATHER_API_KEY"))
+
+
+@functools.lru_cache(maxsize=None)
+def get_requests_session() -> requests.Session:
+    return requests.Session()
+
+
+def api_params(location: str) -> dict:
+    return {"key": get_api_key(), "q": location, "aqi": "no", "alerts": "no"}
+
 
 class WeatherInput(BaseModel):
     location: str = Field(description="Must be a valid location in city format.")
 
 
-@tool("get_weather", args_schema=WeatherInput)
-def get_weather(location: str) -> str:
+def _get_weather(location: str) -> str:
     """Get the current weather for a specified location."""
     if not location:
         return (
             "Please provide a location and call the get_current_weather_function again."
         )
-    API_params = {
-        "key": config("WEATHER_API_KEY"),
-        "q": location,
-        "aqi": "no",
-        "alerts": "no",
-    }
-    response: requests.models.Response = requests.get(
-        "http://api.weatherapi.com/v1/current.json", params=API_params
+    cached_response = WEATHER_CACHE.get(location)
+    if cached_response is not None:
+        return cached_response
+    response: requests.models.Response = get_requests_session().get(
+        WEATHER_API_URL, params=api_params(location), timeout=REQUEST_TIMEOUT
     )
-    str_response: str = dumps(response.json())
+    data = response.json()
+    if response.status_code == 200:
+        WEATHER_CACHE.put(location, data)
+    str_response: str = dumps(data)
     return str_response
 
 
+async def _aget_weather(location: str) -> str:
+    """Get the current weather for a specified location."""
+    if not location:
+        return (
+            "Please provide a location and call the get_current_weather_function again."
+        )
+    cached_response = WEATHER_CACHE.get(location)
+    if cached_response is not None:
+        return cached_response
+    async with SESSION_POOL.get(
+        WEATHER_API_URL,
+        params=api_params(location),
+        timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+    ) as response:
+        data = await response.json(content_type=None)
+        if response.status == 200:
+            WEATHER_CACHE.put(location, data)
+    return dumps(data)
+
+
+get_weather = StructuredTool.from_function(
+    func=_get_weather,
+    coroutine=_aget_weather,
+    name="get_weather",
+    args_schema=WeatherInput,
+)
+
+
 if __name__ == "__main__":
     print(get_weather.run("New York"))
@@ -1,48 +1,216 @@
 import asyncio
+import codecs
 import json
 import sys
 
 import aiohttp
-from bs4 import BeautifulSoup
-from langchain.tools import tool
+from decouple import Csv, config
+from langchain_core.tools import tool
 from pydantic import BaseModel, Field
 
+from .fetch import SESSION_POOL
+from .html_text import MAX_CHARACTERS, SKIPPED_TAGS, TextExtractor, extract_text
+from .packing import TOKEN_BUDGET, pack_results
+from .parse_pool import PARSE_POOL
+from .web_cache import CACHE_ENABLED, WEB_CACHE
+
 
 if sys.platform.startswith("win"):
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
+HTML_EXTRACTOR = config("WEB_HTML_EXTRACTOR", default="streaming")  # streaming or soup
+STREAMING = config("WEB_STREAMING", default=True, cast=bool)
+STREAM_CHUNK_SIZE = 64 * 1024
+MAX_BYTES = config("WEB_MAX_BYTES", default=5 * 1024 * 1024, cast=int)
+URL_TIMEOUT = config("WEB_URL_TIMEOUT", default=10.0, cast=float)
+HEDGE_DELAY = config("WEB_HEDGE_DELAY", default=3.0, cast=float)  # 0 disables hedging
+RESEARCH_BUDGET = config("WEB_RESEARCH_BUDGET", default=25.0, cast=float)
+PACKING = config("WEB_RESEARCH_PACKING", default=True, cast=bool)
+# Cached text extracted another way, or to another length, is a cache miss.
+CACHE_EXTRACTOR = f"{HTML_EXTRACTOR}-{MAX_CHARACTERS}"
+ALLOWED_CONTENT_TYPES = config(
+    "WEB_ALLOWED_CONTENT_TYPES",
+    default="text/html,application/xhtml+xml,text/plain",
+    cast=Csv(post_process=frozenset),
+)
+
+
+def parse_html_soup(html_content: str) -> str:
+    from bs4 import BeautifulSoup
 
-def parse_html(html_content: str) -> str:
     soup = BeautifulSoup(html_content, "html.parser")
-    for tag in ["nav", "footer", "aside", "script", "style", "img", "header"]:
+    for tag in SKIPPED_TAGS:
         for match in soup.find_all(tag):
             match.decompose()
 
     text_content = soup.get_text()
     text_content = " ".join(text_content.split())
-    return text_content[:8_000]
+    return text_content[:MAX_CHARACTERS]
 
 
-async def get_webpage_content(url: str) -> str:
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            html_content = await response.text()
+def parse_html(html_content: str) -> str:
+    if HTML_EXTRACTOR == "soup":
+        return parse_html_soup(html_content)
+    return extract_text(html_content, MAX_CHARACTERS)
+
+
+class UnsupportedContentError(Exception):
+    pass
+
+
+async def read_streaming(
+    response: aiohttp.ClientResponse,
+) -> tuple[str, str | None, bool]:
+    """Read the body in chunks, feeding the streaming extractor as text arrives.
+
+    Stops and aborts the connection once MAX_BYTES have been read or, with the
+    streaming extractor, once enough text has been collected. The extractor runs
+    in PARSE_POOL so big pages don't hold up the event loop, a page's size being
+    its Content-Length or, without one, what has been read so far. Returns the
+    HTML read so far, the extracted text (None if the page still needs
+    parse_html) and whether the whole body was read.
+    """
+    try:
+        decoder = codecs.getincrementaldecoder(response.charset or "utf-8")("replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")("replace")
+    extractor = TextExtractor(MAX_CHARACTERS) if HTML_EXTRACTOR == "streaming" else None
+
+    html_parts = []
+    bytes_read = 0
+    complete = False
+    async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+        bytes_read += len(chunk)
+        html_parts.append(decoder.decode(chunk))
+        if extractor is not None:
+            page_size = max(response.content_length or 0, bytes_read)
+            await PARSE_POOL.feed(extractor, html_parts[-1], page_size)
+        if bytes_read >= MAX_BYTES or (extractor is not None and extractor.done):
+            response.close()
+            break
+    else:
+        complete = True
+        html_parts.append(decoder.decode(b"", final=True))
+        if extractor is not None:
+            await PARSE_POOL.feed(extractor, html_parts[-1], bytes_read)
+            extractor.close()
+
+    text_content = extractor.get_text() if extractor is not None else None
+    return "".join(html_parts), text_content, complete
+
 
-    text_content = parse_html(html_content)
+async def get_webpage_content(url: str) -> str:
+    cached_page = await WEB_CACHE.aget(url, CACHE_EXTRACTOR) if CACHE_ENABLED else None
+    if cached_page is not None and cached_page.is_fresh(WEB_CACHE.ttl):
+        print(f"URL: {url} - served from cache.")
+        return cached_page.text
+
+    headers = WEB_CACHE.revalidation_headers(cached_page)
+    async with SESSION_POOL.get(url, headers=headers) as response:
+        if cached_page is not None and response.status == 304:
+            await WEB_CACHE.amark_revalidated(cached_page)
+            print(f"URL: {url} - revalidated from cache.")
+            return cached_page.text
+        if response.content_type not in ALLOWED_CONTENT_TYPES:
+            response.close()
+            raise UnsupportedContentError(
+                f"Unsupported content type {response.content_type}."
+            )
+        if STREAMING:
+            html_content, text_content, complete = await read_streaming(response)
+        else:
+            html_content, text_content, complete = await response.text(), None, True
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        status = response.status
+
+    if text_content is None:
+        text_content = await PARSE_POOL.run(parse_html, html_content)
+    if CACHE_ENABLED and status == 200:
+        # A body cut short is kept as text only, not passed off as the whole page.
+        await WEB_CACHE.aput(
+            url,
+            html_content if complete else None,
+            text_content,
+            etag,
+            last_modified,
+            CACHE_EXTRACTOR,
+        )
     print(f"URL: {url} - fetched successfully.")
     return text_content
 
 
+async def fetch_with_deadline(url: str) -> str:
+    """Fetch a page with a per-attempt timeout.
+
+    If the first attempt hasn't finished after HEDGE_DELAY seconds, a duplicate
+    request is started and whichever succeeds first wins.
+    """
+    attempts = [
+        asyncio.create_task(asyncio.wait_for(get_webpage_content(url), URL_TIMEOUT))
+    ]
+    try:
+        if HEDGE_DELAY > 0:
+            done, _ = await asyncio.wait(attempts, timeout=HEDGE_DELAY)
+            if not done:
+                print(f"URL: {url} - slow, sending hedged request.")
+                attempts.append(
+                    asyncio.create_task(
+                        asyncio.wait_for(get_webpage_content(url), URL_TIMEOUT)
+                    )
+                )
+        pending = set(attempts)
+        while True:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for attempt in done:
+                if attempt.exception() is None:
+                    return attempt.result()
+            if not pending:
+                raise attempts[0].exception()  # type: ignore
+    finally:
+        for attempt in attempts:
+            attempt.cancel()
+
+
+def describe_error(error: BaseException) -> str:
+    if isinstance(error, asyncio.TimeoutError):
+        return f"Timed out after {URL_TIMEOUT} seconds."
+    return f"{type(error).__name__}: {error}"
+
+
 class ResearchInput(BaseModel):
     research_urls: list[str] = Field(description="Must be a list of valid URLs.")
+    query: str = Field(
+        default="",
+        description="The research topic, used to select the most relevant content.",
+    )
 
 
 @tool("research", args_schema=ResearchInput)
-async def research(research_urls: list[str]) -> str:
+async def research(research_urls: list[str], query: str = "") -> str:
     """Get content of provided URLs for research purposes."""
-    tasks = [asyncio.create_task(get_webpage_content(url)) for url in research_urls]
-    contents = await asyncio.gather(*tasks, return_exceptions=True)
-    return json.dumps(contents)
+    if not research_urls:
+        return json.dumps([])
+    tasks = {asyncio.create_task(fetch_with_deadline(url)): url for url in research_urls}
+    _, pending = await asyncio.wait(tasks, timeout=RESEARCH_BUDGET)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
+    results = []
+    for task, url in tasks.items():
+        if task in pending:
+            error = f"Timed out, research budget of {RESEARCH_BUDGET} seconds exceeded."
+            results.append({"url": url, "error": error})
+        elif task.exception() is not None:
+            results.append({"url": url, "error": describe_error(task.exception())})  # type: ignore
+        else:
+            results.append({"url": url, "content": task.result()})
+    if PACKING:
+        results = pack_results(results, query, TOKEN_BUDGET)
+    return json.dumps(results)
 
 
 if __name__ == "__main__":
@@ -56,6 +224,8 @@ if __name__ == "__main__":
 
     async def main():
         result = await research.ainvoke({"research_urls": TEST_URLS})
+        await SESSION_POOL.close()
+        print(WEB_CACHE.stats)
 
         with open("test.json", "w") as f:
             json.dump(result, f)
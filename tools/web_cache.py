@@ -0,0 +1,218 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from decouple import config
+
+
+CACHE_DIRECTORY = Path(__file__).parent.parent / "cache" / "web"
+CACHE_ENABLED = config("WEB_CACHE_ENABLED", default=True, cast=bool)
+CACHE_TTL = config("WEB_CACHE_TTL", default=24 * 60 * 60, cast=int)
+CACHE_MAX_BYTES = config("WEB_CACHE_MAX_BYTES", default=256 * 1024 * 1024, cast=int)
+# Bump when the entry layout changes, entries of another version are misses.
+CACHE_FORMAT_VERSION = 2
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """Normalize a URL so trivially different spellings share one cache entry."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path or "/"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    stale: int = 0
+    revalidations: int = 0
+    evictions: int = 0
+
+
+@dataclass
+class CachedPage:
+    url: str
+    text: str
+    etag: str | None
+    last_modified: str | None
+    fetched_at: float
+    version: str = ""
+
+    def is_fresh(self, ttl: int) -> bool:
+        return time.time() - self.fetched_at < ttl
+
+
+class WebPageCache:
+    """Content-addressed on-disk cache of fetched HTML and its parsed text.
+
+    Every entry is stored as <sha256 of normalized URL>.html (raw page, left out if
+    only part of it was read) and .json (parsed text and validators). Entries older than the TTL are revalidated with
+    ETag/Last-Modified, and the least recently used entries are evicted once the
+    directory grows beyond max_bytes. Entries written by another format version or
+    text extractor are misses. The a* methods do the disk I/O in a thread.
+    """
+
+    def __init__(
+        self,
+        directory: Path = CACHE_DIRECTORY,
+        ttl: int = CACHE_TTL,
+        max_bytes: int = CACHE_MAX_BYTES,
+    ) -> None:
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._total_bytes: int | None = None
+        self._lock = threading.Lock()
+
+    def _key(self, url: str) -> str:
+        return hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        return self.directory / f"{key}.html", self.directory / f"{key}.json"
+
+    @staticmethod
+    def _version(extractor: str) -> str:
+        return f"{CACHE_FORMAT_VERSION}/{extractor}"
+
+    def get(self, url: str, extractor: str = "") -> CachedPage | None:
+        """Return the cached page (fresh or stale) or None, updating the counters.
+
+        extractor names the text extractor and its settings, an entry whose text
+        was extracted differently is a miss.
+        """
+        _, meta_path = self._paths(self._key(url))
+        try:
+            with open(meta_path, "r", encoding="utf-8") as file:
+                page = CachedPage(**json.load(file))
+        except (OSError, ValueError, TypeError):
+            page = None
+        if page is None or page.version != self._version(extractor):
+            self.stats.misses += 1
+            return None
+
+        if page.is_fresh(self.ttl):
+            self.stats.hits += 1
+            self._touch(meta_path)
+        else:
+            self.stats.stale += 1
+        return page
+
+    def revalidation_headers(self, page: CachedPage | None) -> dict[str, str]:
+        headers = {}
+        if page is not None:
+            if page.etag:
+                headers["If-None-Match"] = page.etag
+            if page.last_modified:
+                headers["If-Modified-Since"] = page.last_modified
+        return headers
+
+    def mark_revalidated(self, page: CachedPage) -> None:
+        """Reset the TTL of a stale entry after the server answered 304."""
+        self.stats.revalidations += 1
+        page.fetched_at = time.time()
+        _, meta_path = self._paths(self._key(page.url))
+        with self._lock:
+            self._write(meta_path, json.dumps(asdict(page)))
+
+    def put(
+        self,
+        url: str,
+        html: str | None,
+        text: str,
+        etag: str | None = None,
+        last_modified: str | None = None,
+        extractor: str = "",
+    ) -> None:
+        html_path, meta_path = self._paths(self._key(url))
+        page = CachedPage(
+            url, text, etag, last_modified, time.time(), self._version(extractor)
+        )
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            self._total_bytes = self.total_bytes() - self._size(html_path, meta_path)
+            if html is None:
+                html_path.unlink(missing_ok=True)
+            else:
+                self._write(html_path, html)
+            self._write(meta_path, json.dumps(asdict(page)))
+            self._total_bytes += self._size(html_path, meta_path)
+            self._evict()
+
+    async def aget(self, url: str, extractor: str = "") -> CachedPage | None:
+        return await asyncio.to_thread(self.get, url, extractor)
+
+    async def amark_revalidated(self, page: CachedPage) -> None:
+        await asyncio.to_thread(self.mark_revalidated, page)
+
+    async def aput(
+        self,
+        url: str,
+        html: str | None,
+        text: str,
+        etag: str | None = None,
+        last_modified: str | None = None,
+        extractor: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put, url, html, text, etag, last_modified, extractor)
+
+    def total_bytes(self) -> int:
+        if self._total_bytes is None:
+            self._total_bytes = self._size(*self.directory.glob("*.*"))
+        return self._total_bytes
+
+    def clear(self) -> None:
+        with self._lock:
+            for path in self.directory.glob("*.*"):
+                path.unlink(missing_ok=True)
+            self._total_bytes = 0
+
+    def _evict(self) -> None:
+        if self.total_bytes() <= self.max_bytes:
+            return
+        # The .json file is touched on every hit, so its mtime is the LRU clock.
+        entries = sorted(
+            self.directory.glob("*.json"), key=lambda path: path.stat().st_mtime
+        )
+        for meta_path in entries:
+            if self.total_bytes() <= self.max_bytes:
+                break
+            html_path = meta_path.with_suffix(".html")
+            self._total_bytes = self.total_bytes() - self._size(html_path, meta_path)
+            html_path.unlink(missing_ok=True)
+            meta_path.unlink(missing_ok=True)
+            self.stats.evictions += 1
+
+    @staticmethod
+    def _size(*paths: Path) -> int:
+        return sum(path.stat().st_size for path in paths if path.exists())
+
+    @staticmethod
+    def _touch(path: Path) -> None:
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _write(path: Path, content: str) -> None:
+        temporary_path = path.with_suffix(path.suffix + ".tmp")
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            file.write(content)
+        os.replace(temporary_path, path)
+
+
+WEB_CACHE = WebPageCache()
@@ -1,76 +1,84 @@
 import asyncio
 import functools
 import operator
+import os
 import uuid
-from typing import Annotated, Sequence, TypedDict
+from pathlib import Path
+from typing import Annotated, Optional, Sequence, TypedDict
 
-from langchain.agents import AgentExecutor, create_openai_tools_agent
-from langchain_community.tools.tavily_search import TavilySearchResults
+from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.messages import BaseMessage, HumanMessage
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_openai import ChatOpenAI
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph import END, StateGraph
 
+from agents import create_agent
+from checkpointer import get_checkpointer, prepare_run, thread_id_argument
+from llm import get_llm
+from message_compaction import compact_messages
+from metrics import export_metrics, metrics_callbacks
 from setup_environment import set_environment_variables
+from streaming import IncrementalFileWriter, agent_config, ainvoke_streaming, stream_graph
+from tools.fetch import SESSION_POOL
 from tools.pdf import OUTPUT_DIRECTORY
 from tools.web import research
 from web_research_prompts import RESEARCHER_SYSTEM_PROMPT, TAVILY_AGENT_SYSTEM_PROMPT
 
 
-set_environment_variables("Web_Search_Graph")
-
-TAVILY_TOOL = TavilySearchResults(max_results=6)
-LLM = ChatOpenAI(model="gpt-3.5-turbo-0125")
+TAVILY_MAX_RESULTS = 6
 
 TAVILY_AGENT_NAME = "tavily_agent"
 RESEARCH_AGENT_NAME = "search_evaluator_agent"
 SAVE_FILE_NODE_NAME = "save_file"
 
 
-def create_agent(llm: ChatOpenAI, tools: list, system_prompt: str):
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", system_prompt),
-            MessagesPlaceholder(variable_name="messages"),
-            MessagesPlaceholder(variable_name="agent_scratchpad"),
-        ]
-    )
-    agent = create_openai_tools_agent(llm, tools, prompt)
-    executor = AgentExecutor(agent=agent, tools=tools)  # type: ignore
-    return executor
-
-
 class AgentState(TypedDict):
     messages: Annotated[Sequence[BaseMessage], operator.add]
 
 
-def agent_node(state: AgentState, agent, name):
-    result = agent.invoke(state)
-    return {"messages": [HumanMessage(content=result["output"], name=name)]}
+def article_path(config: RunnableConfig) -> Optional[Path]:
+    """Where the article of a run on a thread is written, None without a thread."""
+    thread_id = config.get("configurable", {}).get("thread_id")
+    return Path(OUTPUT_DIRECTORY) / f"{thread_id}.md" if thread_id else None
 
 
-async def async_agent_node(state: AgentState, agent, name):
-    result = await agent.ainvoke(state)
-    return {"messages": [HumanMessage(content=result["output"], name=name)]}
+def draft_path(path: Path) -> Path:
+    """The file an article is written to until it is complete."""
+    return path.with_name(f"{path.name}.part")
 
 
-tavily_agent = create_agent(LLM, [TAVILY_TOOL], TAVILY_AGENT_SYSTEM_PROMPT)
-tavily_agent_node = functools.partial(
-    agent_node, agent=tavily_agent, name=TAVILY_AGENT_NAME
-)
+def agent_node(state: AgentState, agent, name):
+    result = agent.invoke({"messages": compact_messages(state["messages"])}, agent_config(name))
+    return {"messages": [HumanMessage(content=result["output"], name=name)]}
 
 
-research_agent = create_agent(LLM, [research], RESEARCHER_SYSTEM_PROMPT)
-research_agent_node = functools.partial(
-    async_agent_node, agent=research_agent, name=RESEARCH_AGENT_NAME
-)
+async def async_agent_node(
+    state: AgentState, agent, name, config: RunnableConfig, draft_article: bool = False
+):
+    input = {"messages": compact_messages(state["messages"])}
+    path = article_path(config)
+    if draft_article and path is not None:
+        # The draft file fills up while the article is generated, save_file_node
+        # then writes the final text and moves it to the article path.
+        writer = IncrementalFileWriter(draft_path(path))
+        try:
+            result = await ainvoke_streaming(agent, input, name, writer.write)
+        finally:
+            await writer.aclose()
+    else:
+        result = await agent.ainvoke(input, agent_config(name))
+    return {"messages": [HumanMessage(content=result["output"], name=name)]}
 
 
-def save_file_node(state: AgentState):
+def save_file_node(state: AgentState, config: RunnableConfig):
     markdown_content = str(state["messages"][-1].content)
-    filename = f"{OUTPUT_DIRECTORY}/{uuid.uuid4()}.md"
-    with open(filename, "w", encoding="utf-8") as file:
+    filename = article_path(config) or Path(OUTPUT_DIRECTORY) / f"{uuid.uuid4()}.md"
+    # Readers of the article path only ever see a complete article.
+    draft = draft_path(filename)
+    with open(draft, "w", encoding="utf-8") as file:
         file.write(markdown_content)
+    os.replace(draft, filename)
     return {
         "messages": [
             HumanMessage(
@@ -81,28 +89,73 @@ def save_file_node(state: AgentState):
     }
 
 
-workflow = StateGraph(AgentState)
-workflow.add_node(TAVILY_AGENT_NAME, tavily_agent_node)
-workflow.add_node(RESEARCH_AGENT_NAME, research_agent_node)
-workflow.add_node(SAVE_FILE_NODE_NAME, save_file_node)
-
-workflow.add_edge(TAVILY_AGENT_NAME, RESEARCH_AGENT_NAME)
-workflow.add_edge(RESEARCH_AGENT_NAME, SAVE_FILE_NODE_NAME)
-workflow.add_edge(SAVE_FILE_NODE_NAME, END)
-
-workflow.set_entry_point(TAVILY_AGENT_NAME)
-research_graph = workflow.compile()
+def build_research_graph(
+    llm: BaseChatModel | None = None,
+    search_tool: BaseTool | None = None,
+    research_tool: BaseTool = research,
+    checkpointer: BaseCheckpointSaver | None = None,
+):
+    """Compile the research graph, using the real model and tools by default."""
+    from tools.search import RateLimitedTavilySearchResults
 
+    llm = llm or get_llm()
+    search_tool = search_tool or RateLimitedTavilySearchResults(
+        max_results=TAVILY_MAX_RESULTS
+    )
+    tavily_agent = create_agent(llm, [search_tool], TAVILY_AGENT_SYSTEM_PROMPT)
+    research_agent = create_agent(llm, [research_tool], RESEARCHER_SYSTEM_PROMPT)
 
-async def run_research_graph(input):
-    async for output in research_graph.astream(input):
-        for node_name, output_value in output.items():
-            print("---")
-            print(f"Output from node '{node_name}':")
-            print(output_value)
+    workflow = StateGraph(AgentState)
+    workflow.add_node(
+        TAVILY_AGENT_NAME,
+        functools.partial(agent_node, agent=tavily_agent, name=TAVILY_AGENT_NAME),
+    )
+    workflow.add_node(
+        RESEARCH_AGENT_NAME,
+        functools.partial(
+            async_agent_node,
+            agent=research_agent,
+            name=RESEARCH_AGENT_NAME,
+            draft_article=True,
+        ),
+    )
+    workflow.add_node(SAVE_FILE_NODE_NAME, save_file_node)
+
+    workflow.add_edge(TAVILY_AGENT_NAME, RESEARCH_AGENT_NAME)
+    workflow.add_edge(RESEARCH_AGENT_NAME, SAVE_FILE_NODE_NAME)
+    workflow.add_edge(SAVE_FILE_NODE_NAME, END)
+
+    workflow.set_entry_point(TAVILY_AGENT_NAME)
+    return workflow.compile(checkpointer=checkpointer)
+
+
+@functools.lru_cache(maxsize=None)
+def get_research_graph():
+    """The research graph with the real model and tools, built on first use."""
+    return build_research_graph(checkpointer=get_checkpointer())
+
+
+async def run_research_graph(research_graph, input, thread_id: str | None = None):
+    input, run_config = prepare_run(research_graph, input, thread_id)
+    print(f"Thread ID: {run_config['configurable']['thread_id']}")
+    run_config["callbacks"] = metrics_callbacks()
+    async for event in stream_graph(research_graph, input, run_config):
+        if event.kind == "token":
+            if event.name == RESEARCH_AGENT_NAME:
+                print(event.data, end="", flush=True)
+            continue
+        print("\n---")
+        print(f"Output from node '{event.name}':")
+        print(event.data)
         print("\n---\n")
+    await SESSION_POOL.close()
+    export_metrics()
 
 
 test_input = {"messages": [HumanMessage(content="Jaws")]}
 
-asyncio.run(run_research_graph(test_input))
+if __name__ == "__main__":
+    set_environment_variables("Web_Search_Graph")
+    research_graph = get_research_graph()
+    thread_id = thread_id_argument()
+    asyncio.run(run_research_graph(research_graph, test_input, thread_id))